@@ -1,25 +1,239 @@
 # core/data_management/character_manager.py
 
+import weakref
+from collections.abc import MutableMapping
+
+from core.data_management.character_store import CharacterStore, MAX_HEALTH
+
+# Store for characters created without one, e.g. in scripts and tests
+_default_store = CharacterStore()
+
+
+def _release(store, row, generation):
+    """
+    Removes a character from a store unless its row was already removed.
+    """
+    if store.generations[row] == generation and store.alive_rows[row]:
+        store.remove(row)
+
+
+class TraitsView(MutableMapping):
+    """
+    A character's traits as a live {trait: True} mapping backed by its store: setting a trait to
+    True or False, or deleting it, changes the store. Values must be bools.
+    """
+
+    __slots__ = ('_character',)
+
+    def __init__(self, character):
+        self._character = character
+
+    def __getitem__(self, trait):
+        if not self._character.has_trait(trait):
+            raise KeyError(trait)
+        return True
+
+    def __setitem__(self, trait, present):
+        character = self._character
+        character.store.set_trait(character._live_row(), trait, present)
+
+    def __delitem__(self, trait):
+        self[trait]  # Raises KeyError for traits the character does not have
+        self[trait] = False
+
+    def __iter__(self):
+        character = self._character
+        return iter(character.store.traits_of(character._live_row()))
+
+    def __len__(self):
+        character = self._character
+        return len(character.store.traits_of(character._live_row()))
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class RelationshipsView(MutableMapping):
+    """
+    A character's relationships as a live {other character name: value} mapping backed by its
+    store's RelationshipStore. Setting a value for a name no character in the store has adds a
+    character with that name, as `adjust_relationship` does.
+    """
+
+    __slots__ = ('_character',)
+
+    def __init__(self, character):
+        self._character = character
+
+    def __getitem__(self, name):
+        character = self._character
+        relationships = character.store.relationships
+        row = character._live_row()
+        try:
+            other = character.store.row_of(name)
+        except KeyError:
+            raise KeyError(name) from None
+        if not relationships.has(row, other):
+            raise KeyError(name)
+        return relationships.get(row, other)
+
+    def __setitem__(self, name, value):
+        character = self._character
+        character.store.relationships.set(character._live_row(), character._row_of_other(name), value)
+
+    def __delitem__(self, name):
+        character = self._character
+        try:
+            character.store.relationships.remove(character._live_row(), character.store.row_of(name))
+        except KeyError:
+            raise KeyError(name) from None
+
+    def __iter__(self):
+        character = self._character
+        others, _ = character.store.relationships.outgoing(character._live_row())
+        return iter([character.store.names[other] for other in others.tolist()])
+
+    def __len__(self):
+        character = self._character
+        return len(character.store.relationships.outgoing(character._live_row())[0])
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
 class Character:
     """
     Represents a character in the game, with attributes and methods for interaction and state management.
+
+    A Character is a lightweight handle on one row of a CharacterStore, which holds the state of
+    every character in columns; reading or setting an attribute reads or writes the store. Once the
+    character is removed from the store, its handles raise KeyError, even if the row is reused.
+
+    Characters created without a store live in a shared default store until the handle that created
+    them is garbage collected; other handles on them (e.g., from `from_row`) then stop working.
     """
-    
-    def __init__(self, name, traits, location=None):
+
+    __slots__ = ('store', 'row', 'generation', '__weakref__')
+
+    def __init__(self, name, traits, location=None, store=None):
         """
         Initializes a Character with a name, traits, and optional starting location.
         
         Args:
             name (str): The name of the character.
-            traits (dict): A dictionary of character traits (e.g., 'brave', 'cunning').
-            location (Location, optional): The starting location of the character.
+            traits (dict): A dictionary of character traits (e.g., 'brave', 'cunning'), or a list of trait names.
+            location (Location or str, optional): The starting location of the character; only its
+                name is kept.
+            store (CharacterStore, optional): The store to add the character to. A shared default store if
+                omitted, from which the character is removed when this handle is garbage collected.
+        """
+        self.store = _default_store if store is None else store
+        self.row = self.store.add(name, traits, location)
+        self.generation = int(self.store.generations[self.row])
+        if store is None:
+            finalizer = weakref.finalize(self, _release, self.store, self.row, self.generation)
+            finalizer.atexit = False
+
+    @classmethod
+    def from_row(cls, store, row):
+        """
+        Returns a handle on a character already in a store.
+        """
+        character = cls.__new__(cls)
+        character.store = store
+        character.row = row
+        character.generation = int(store.generations[row])
+        return character
+
+    def _live_row(self):
         """
-        self.name = name
-        self.traits = traits
-        self.location = location
-        self.health = 100  # Default health value
-        self.mood = 'neutral'  # Default mood state
-        self.relationships = {}  # Track relationships with other characters
+        Returns the handle's row, checking that it still holds the character the handle refers to.
+
+        Raises:
+            KeyError: If the character was removed from the store.
+        """
+        if self.store.generations[self.row] != self.generation:
+            raise KeyError(f"The character in row {self.row} was removed.")
+        return self.row
+
+    @property
+    def id(self):
+        return self._live_row()
+
+    @property
+    def name(self):
+        return self.store.names[self._live_row()]
+
+    @property
+    def traits(self):
+        """
+        The character's traits as a live {trait: True} mapping (see TraitsView); assign a dict or
+        list to replace them all.
+        """
+        self._live_row()
+        return TraitsView(self)
+
+    @traits.setter
+    def traits(self, traits):
+        self.store.set_traits(self._live_row(), traits)
+
+    def has_trait(self, trait):
+        return self.store.has_trait(self._live_row(), trait)
+
+    @property
+    def location(self):
+        """
+        The name of the character's location, or None. Either a Location object or a name may be
+        assigned; the store keeps only the name.
+        """
+        location_id = self.store.location_ids[self._live_row()]
+        return None if location_id < 0 else self.store.locations[location_id]
+
+    @location.setter
+    def location(self, location):
+        self.store.set_location(self._live_row(), location)
+
+    @property
+    def health(self):
+        return int(self.store.health[self._live_row()])
+
+    @health.setter
+    def health(self, health):
+        self.store.health[self._live_row()] = min(max(health, 0), MAX_HEALTH)
+
+    @property
+    def mood(self):
+        return self.store.moods[self.store.mood_codes[self._live_row()]]
+
+    @mood.setter
+    def mood(self, mood):
+        self.store.mood_codes[self._live_row()] = self.store.mood_code(mood)
+
+    @property
+    def relationships(self):
+        """
+        The character's relationships as a live {other character name: value} mapping (see
+        RelationshipsView); changes made through it are stored.
+        """
+        self._live_row()
+        return RelationshipsView(self)
+
+    def _row_of_other(self, name):
+        """
+        Returns the row of the character with a name in this character's store, adding a character
+        with that name if there is none, so relationships can name characters not loaded yet.
+        """
+        try:
+            return self.store.row_of(name)
+        except KeyError:
+            return self.store.add(name)
+
+    def __eq__(self, other):
+        return (isinstance(other, Character) and self.store is other.store and self.row == other.row
+                and self.generation == other.generation)
+
+    def __hash__(self):
+        return hash((id(self.store), self.row, self.generation))
 
     def interact_with(self, other_character):
         """
@@ -29,7 +243,7 @@ class Character:
             other_character (Character): The other character to interact with.
         """
         # Example interaction logic
-        if self.traits.get('friendly'):
+        if self.has_trait('friendly'):
             print(f"{self.name} greets {other_character.name} warmly.")
         else:
             print(f"{self.name} is suspicious of {other_character.name}.")
@@ -56,22 +270,24 @@ class Character:
         Args:
             amount (int): The amount to adjust health by (can be positive or negative).
         """
-        self.health += amount
-        if self.health > 100:
-            self.health = 100
-        elif self.health <= 0:
+        health = self.health + amount
+        if health > MAX_HEALTH:
+            self.health = MAX_HEALTH
+        elif health <= 0:
             self.health = 0
             print(f"{self.name} has perished.")
+        else:
+            self.health = health
 
     def change_location(self, new_location):
         """
         Changes the character's current location.
         
         Args:
-            new_location (Location): The new location where the character will be.
+            new_location (Location or str): The new location where the character will be.
         """
         self.location = new_location
-        print(f"{self.name} has moved to {new_location.name}.")
+        print(f"{self.name} has moved to {self.location}.")
 
     def adjust_relationship(self, other_character_name, change):
         """
@@ -79,43 +295,103 @@ class Character:
         
         Args:
             other_character_name (str): The name of the other character.
-            change (int): The amount to adjust the relationship value by.
+            change (int): The amount to adjust the relationship value by. A character with the name
+                is added to the store if it has none.
         """
-        if other_character_name not in self.relationships:
-            self.relationships[other_character_name] = 0
-        self.relationships[other_character_name] += change
+        other = self._row_of_other(other_character_name)
+        value = self.store.relationships.adjust(self._live_row(), other, change)
 
         # Print updated relationship status for debugging
-        print(f"{self.name}'s relationship with {other_character_name} is now {self.relationships[other_character_name]}.")
+        print(f"{self.name}'s relationship with {other_character_name} is now {value:g}.")
+
+    def allies(self, k=5):
+        """
+        Returns the k characters this character likes most as (name, value) pairs, strongest first.
+        """
+        return [(self.store.names[other], value) for other, value in self.store.relationships.top_allies(self._live_row(), k)]
+
+    def enemies(self, k=5):
+        """
+        Returns the k characters this character dislikes most as (name, value) pairs, strongest first.
+        """
+        return [(self.store.names[other], value) for other, value in self.store.relationships.top_enemies(self._live_row(), k)]
 
     def __repr__(self):
         return f"<Character(name={self.name}, health={self.health}, mood={self.mood}, location={self.location})>"
 
-# Example usage of the Character class with events
+class CharacterManager:
+    """
+    Manages the game's characters, loaded from character data, and answers "who is where" queries
+    from the store's location index rather than by scanning every character.
+    """
+
+    def __init__(self, character_data=None, store=None, main_character=None):
+        """
+        Initializes the CharacterManager.
+
+        Args:
+            character_data (dict, optional): Character entries keyed by ID, each with a 'name' and
+                optionally 'traits' and 'location' (as in data/characters.yaml).
+            store (CharacterStore, optional): The store to keep characters in. A new store if omitted.
+            main_character (str, optional): ID of the player character. The first entry if omitted.
+        """
+        self.store = CharacterStore() if store is None else store
+        self.characters = {}  # Character ID -> Character
+        for character_id, data in (character_data or {}).items():
+            self.add_character(character_id, data.get("name", character_id), data.get("traits", {}), data.get("location"))
+        self.main_character_id = main_character if main_character is not None else next(iter(self.characters), None)
+
+    def add_character(self, character_id, name, traits, location=None):
+        """
+        Adds a character and returns it.
+        """
+        character = self.characters[character_id] = Character(name, traits, location, store=self.store)
+        return character
+
+    def get_character(self, character_id):
+        return self.characters.get(character_id)
+
+    def get_main_character(self):
+        """
+        Returns the player character, or None if there are no characters.
+        """
+        return self.characters.get(self.main_character_id)
+
+    def get_characters_in_location(self, location):
+        """
+        Returns the characters at a location, in order of arrival.
+
+        Args:
+            location (Location or str): The location or its name.
+
+        Returns:
+            list: Character handles, looked up in O(k) for k characters at the location.
+        """
+        return [Character.from_row(self.store, row) for row in self.store.rows_at(location)]
 
-# Instantiate the EventManager
-event_manager = EventManager()
 
-# Create characters
-alice = Character(name="Alice", traits={"friendly": True})
-bob = Character(name="Bob", traits={"hostile": True})
+# Example usage of the Character class with events
+if __name__ == "__main__":
+    # Create characters
+    alice = Character(name="Alice", traits={"friendly": True})
+    bob = Character(name="Bob", traits={"hostile": True})
 
-# Characters interacting
-alice.interact_with(bob)  # Alice greets Bob warmly.
-bob.interact_with(alice)  # Bob is suspicious of Alice.
+    # Characters interacting
+    alice.interact_with(bob)  # Alice greets Bob warmly.
+    bob.interact_with(alice)  # Bob is suspicious of Alice.
 
-# Update character states based on events
-alice.update_state('festival')
-bob.update_state('natural_disaster')
+    # Update character states based on events
+    alice.update_state('festival')
+    bob.update_state('natural_disaster')
 
-# Update character health
-alice.update_health(-20)  # Alice loses 20 health points.
-bob.update_health(-50)    # Bob loses 50 health points.
+    # Update character health
+    alice.update_health(-20)  # Alice loses 20 health points.
+    bob.update_health(-50)    # Bob loses 50 health points.
 
-# Adjust relationships
-alice.adjust_relationship("Bob", 10)  # Alice's relationship with Bob improves.
-bob.adjust_relationship("Alice", -5)  # Bob's relationship with Alice worsens.
+    # Adjust relationships
+    alice.adjust_relationship("Bob", 10)  # Alice's relationship with Bob improves.
+    bob.adjust_relationship("Alice", -5)  # Bob's relationship with Alice worsens.
 
-# Change locations (assuming locations are defined elsewhere)
-# alice.change_location(some_location)
-# bob.change_location(another_location)
+    # Change locations (assuming locations are defined elsewhere)
+    # alice.change_location(some_location)
+    # bob.change_location(another_location)
@@ -0,0 +1,394 @@
+# character_store.py
+
+from collections.abc import Mapping
+
+import numpy as np
+
+from core.data_management.relationship_store import RelationshipStore
+
+NO_LOCATION = -1
+MAX_HEALTH = 100
+
+# Mood codes 0..2 are always registered; other moods get codes on first use
+DEFAULT_MOODS = ('neutral', 'anxious', 'joyful')
+
+# Mood each world event puts characters in, as in Character.update_state
+EVENT_MOODS = {
+    'natural_disaster': 'anxious',
+    'festival': 'joyful'
+}
+
+
+class CharacterStore:
+    """
+    Column storage for characters, sized for thousands of NPCs.
+
+    Each character is a row ID. Health, mood code, location ID and trait bits live in numpy arrays,
+    so a character costs a few dozen bytes rather than a Python object with its own dicts, and a
+    change to many characters is a single array operation. Moods, locations and trait names are
+    interned in small tables, the way MapSchema interns terrain kinds. Rows of removed characters
+    are reused; each row has a generation, advanced when its character is removed, so handles on a
+    removed character can tell that the row no longer holds it.
+    """
+
+    def __init__(self, capacity=256):
+        """
+        Initializes the CharacterStore.
+
+        Args:
+            capacity (int): Number of rows to allocate up front; the arrays grow as needed.
+        """
+        self.names = []
+        self.health = np.zeros(capacity, dtype=np.int16)
+        self.mood_codes = np.zeros(capacity, dtype=np.uint8)
+        self.location_ids = np.full(capacity, NO_LOCATION, dtype=np.int32)
+        self.trait_bits = np.zeros((capacity, 1), dtype=np.uint64)  # Bit b of word w is trait 64 * w + b
+        self.alive_rows = np.zeros(capacity, dtype=bool)  # Rows holding a character
+        self.generations = np.zeros(capacity, dtype=np.uint32)  # Number of characters removed from each row
+        self.moods = list(DEFAULT_MOODS)
+        self._mood_codes = {mood: code for code, mood in enumerate(self.moods)}
+        self.locations = []  # Location ID -> location name
+        self._location_ids = {}  # Location name -> location ID
+        self._residents = {}  # Location ID -> {row: None}, in arrival order
+        self.trait_names = []  # Trait number -> name
+        self._trait_numbers = {}
+        self.relationships = RelationshipStore()
+        self._rows_by_name = {}  # Name -> {row: None}, in order of addition
+        self._free_rows = []
+
+    def __len__(self):
+        return int(np.count_nonzero(self.alive_rows))
+
+    @property
+    def capacity(self):
+        return len(self.health)
+
+    def _grow(self, capacity):
+        extra = capacity - self.capacity
+        self.health = np.concatenate((self.health, np.zeros(extra, dtype=self.health.dtype)))
+        self.mood_codes = np.concatenate((self.mood_codes, np.zeros(extra, dtype=np.uint8)))
+        self.location_ids = np.concatenate((self.location_ids, np.full(extra, NO_LOCATION, dtype=np.int32)))
+        self.trait_bits = np.concatenate(
+            (self.trait_bits, np.zeros((extra, self.trait_bits.shape[1]), dtype=np.uint64))
+        )
+        self.alive_rows = np.concatenate((self.alive_rows, np.zeros(extra, dtype=bool)))
+        self.generations = np.concatenate((self.generations, np.zeros(extra, dtype=np.uint32)))
+
+    def mood_code(self, mood):
+        """
+        Returns the code of a mood, registering it on first use.
+
+        Raises:
+            ValueError: If 256 different moods are already registered.
+        """
+        code = self._mood_codes.get(mood)
+        if code is None:
+            if len(self.moods) > np.iinfo(np.uint8).max:
+                raise ValueError("Too many different moods.")
+            code = self._mood_codes[mood] = len(self.moods)
+            self.moods.append(mood)
+        return code
+
+    def location_id(self, location):
+        """
+        Returns the ID of a location (a Location object or a name), registering it on first use.
+        Locations are interned by name, so `locations` holds names whichever form was given first.
+        None has the ID NO_LOCATION.
+        """
+        if location is None:
+            return NO_LOCATION
+        name = getattr(location, 'name', location)
+        location_id = self._location_ids.get(name)
+        if location_id is None:
+            location_id = self._location_ids[name] = len(self.locations)
+            self.locations.append(name)
+        return location_id
+
+    def find_location_id(self, location):
+        """
+        Returns the ID of a location (a Location object or a name), or None if it was never used.
+        """
+        return self._location_ids.get(getattr(location, 'name', location))
+
+    def set_location(self, row, location):
+        """
+        Moves a character to a location (a Location object, a name or None), keeping the
+        location-to-characters index up to date.
+        """
+        old_id = int(self.location_ids[row])
+        new_id = self.location_id(location)
+        if old_id == new_id:
+            return
+        if old_id != NO_LOCATION:
+            del self._residents[old_id][row]
+        if new_id != NO_LOCATION:
+            self._residents.setdefault(new_id, {})[row] = None
+        self.location_ids[row] = new_id
+
+    def rows_at(self, location):
+        """
+        Returns the row IDs of the characters at a location, in order of arrival, in O(k) for k
+        characters there.
+        """
+        location_id = self.find_location_id(location)
+        if location_id is None:
+            return []
+        return list(self._residents.get(location_id, ()))
+
+    def trait_number(self, trait):
+        """
+        Returns the bit number of a trait, registering it on first use.
+        """
+        number = self._trait_numbers.get(trait)
+        if number is None:
+            number = self._trait_numbers[trait] = len(self.trait_names)
+            self.trait_names.append(trait)
+            if number // 64 >= self.trait_bits.shape[1]:
+                self.trait_bits = np.concatenate(
+                    (self.trait_bits, np.zeros((self.capacity, 1), dtype=np.uint64)), axis=1
+                )
+        return number
+
+    @staticmethod
+    def _trait_list(traits):
+        """
+        Returns the names of the traits to set from a dict of trait names to booleans (traits mapped
+        to True are set) or a list of names.
+
+        Raises:
+            TypeError: If a dict value is not a bool.
+        """
+        if not isinstance(traits, Mapping):
+            return list(traits)
+        for trait, value in traits.items():
+            if not isinstance(value, (bool, np.bool_)):
+                raise TypeError(f"Trait '{trait}' must be True or False, not {value!r}.")
+        return [trait for trait, value in traits.items() if value]
+
+    def set_traits(self, row, traits):
+        """
+        Sets a character's traits from a dict of trait names to booleans (traits mapped to True are
+        set) or a list of names.
+
+        Raises:
+            TypeError: If a dict value is not a bool.
+        """
+        traits = self._trait_list(traits)
+        self.trait_bits[row] = 0
+        for trait in traits:
+            number = self.trait_number(trait)
+            self.trait_bits[row, number // 64] |= np.uint64(1 << (number % 64))
+
+    def set_trait(self, row, trait, present=True):
+        """
+        Sets or clears one of a character's traits.
+
+        Raises:
+            TypeError: If present is not a bool.
+        """
+        if not isinstance(present, (bool, np.bool_)):
+            raise TypeError(f"Trait '{trait}' must be True or False, not {present!r}.")
+        if present:
+            number = self.trait_number(trait)
+            self.trait_bits[row, number // 64] |= np.uint64(1 << (number % 64))
+        elif trait in self._trait_numbers:
+            number = self._trait_numbers[trait]
+            self.trait_bits[row, number // 64] &= ~np.uint64(1 << (number % 64))
+
+    def has_trait(self, row, trait):
+        number = self._trait_numbers.get(trait)
+        if number is None:
+            return False
+        return bool(self.trait_bits[row, number // 64] & np.uint64(1 << (number % 64)))
+
+    def traits_of(self, row):
+        """
+        Returns a character's traits as a {trait: True} dict.
+        """
+        return {trait: True for trait in self.trait_names if self.has_trait(row, trait)}
+
+    def trait_mask(self, trait):
+        """
+        Returns a boolean array marking the rows of living characters with a trait.
+        """
+        number = self._trait_numbers.get(trait)
+        if number is None:
+            return np.zeros(self.capacity, dtype=bool)
+        return (self.trait_bits[:, number // 64] & np.uint64(1 << (number % 64))).astype(bool) & self.alive_rows
+
+    def add(self, name, traits=None, location=None, health=MAX_HEALTH, mood='neutral'):
+        """
+        Adds a character and returns its row ID. Health is clamped to [0, MAX_HEALTH].
+
+        Raises:
+            TypeError: If traits is a dict with a value that is not a bool.
+        """
+        traits = self._trait_list(traits or ())
+        mood_code = self.mood_code(mood)
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self.names[row] = name
+        else:
+            row = len(self.names)
+            if row == self.capacity:
+                self._grow(max(2 * self.capacity, 1))
+            self.names.append(name)
+        self._rows_by_name.setdefault(name, {})[row] = None
+        self.health[row] = min(max(health, 0), MAX_HEALTH)
+        self.mood_codes[row] = mood_code
+        self.location_ids[row] = NO_LOCATION
+        self.set_location(row, location)
+        self.set_traits(row, traits)
+        self.alive_rows[row] = True
+        return row
+
+    def remove(self, row):
+        """
+        Removes a character. Its row ID may be reused by a later `add`; the row's generation is
+        advanced so that handles on the removed character stop working.
+
+        Raises:
+            KeyError: If the row holds no character.
+        """
+        if not (0 <= row < len(self.names)) or not self.alive_rows[row]:
+            raise KeyError(f"No character in row {row}.")
+        self.alive_rows[row] = False
+        self.generations[row] += 1
+        self.set_location(row, None)
+        name = self.names[row]
+        rows = self._rows_by_name[name]
+        del rows[row]
+        if not rows:
+            del self._rows_by_name[name]
+        self.names[row] = None
+        self.relationships.remove_character(row)
+        self._free_rows.append(row)
+
+    def row_of(self, name):
+        """
+        Returns the row ID of the character with a name (the earliest added still present, if
+        several share it).
+
+        Raises:
+            KeyError: If no character has the name.
+        """
+        rows = self._rows_by_name.get(name)
+        if not rows:
+            raise KeyError(f"No character named '{name}'.")
+        return next(iter(rows))
+
+    def rows(self):
+        """
+        Returns the row IDs of all stored characters.
+        """
+        return np.flatnonzero(self.alive_rows)
+
+    def select(self, location=None, trait=None, mood=None, predicate=None):
+        """
+        Returns a boolean mask of the characters matching every given condition.
+
+        Args:
+            location (Location or str, optional): Only characters at this location.
+            trait (str, optional): Only characters with this trait.
+            mood (str, optional): Only characters in this mood.
+            predicate (callable, optional): Called with the store; returns a boolean mask over rows,
+                e.g. `lambda store: store.health < 50`.
+
+        Returns:
+            np.ndarray: A boolean array with one entry per row.
+        """
+        mask = self.alive_rows.copy()
+        if location is not None:
+            location_id = self.find_location_id(location)
+            mask &= self.location_ids == (NO_LOCATION - 1 if location_id is None else location_id)
+        if trait is not None:
+            mask &= self.trait_mask(trait)
+        if mood is not None:
+            mood_code = self._mood_codes.get(mood)
+            mask &= self.mood_codes == (-1 if mood_code is None else mood_code)
+        if predicate is not None:
+            mask &= np.asarray(predicate(self), dtype=bool)
+        return mask
+
+    def _target_rows(self, where, values=None):
+        """
+        Returns the row IDs of the living characters selected by a boolean mask or sequence of rows;
+        all characters if None. Rows of removed characters in a sequence are skipped.
+
+        With `values` given (one per selected row, or a single value), returns (rows, values) with
+        the values of skipped rows left out too.
+        """
+        if where is None:
+            rows = self.rows()
+        else:
+            where = np.asarray(where)
+            if where.dtype == bool:
+                rows = np.flatnonzero(where & self.alive_rows[:len(where)])
+            else:
+                rows = where.astype(np.int64).reshape(-1)
+                alive = self.alive_rows[rows]
+                if not alive.all():
+                    rows = rows[alive]
+                    values = values if values is None or np.ndim(values) == 0 else np.asarray(values)[alive]
+        return rows if values is None else (rows, values)
+
+    def update_health(self, delta, where=None, thresholds=(0,)):
+        """
+        Adds a health delta to many characters at once, clamping health to [0, MAX_HEALTH].
+
+        Args:
+            delta (int or np.ndarray): The change, one value for all or one per selected character.
+            where (np.ndarray, optional): A mask from `select` or an array of row IDs; removed characters
+                are skipped. All characters if omitted.
+            thresholds (tuple): Health levels to watch; 0 reports the characters who perished.
+
+        Returns:
+            dict: For each threshold, the row IDs whose health fell from above it to at or below it.
+        """
+        rows, delta = self._target_rows(where, delta)
+        before = self.health[rows].astype(np.int32)
+        after = np.clip(before + np.asarray(delta, dtype=np.int32), 0, MAX_HEALTH)
+        self.health[rows] = after
+        return {threshold: rows[(before > threshold) & (after <= threshold)] for threshold in thresholds}
+
+    def set_mood(self, mood, where=None):
+        """
+        Puts many characters in a mood at once.
+
+        Returns:
+            np.ndarray: The row IDs whose mood changed.
+        """
+        rows = self._target_rows(where)
+        code = self.mood_code(mood)
+        changed = rows[self.mood_codes[rows] != code]
+        self.mood_codes[changed] = code
+        return changed
+
+    def apply_event(self, event_name, where=None, health_delta=0):
+        """
+        Applies a world event (e.g., 'natural_disaster') to many characters in one call: sets the
+        mood the event causes and applies its health delta.
+
+        Args:
+            event_name (str): The event; events without a mood in EVENT_MOODS leave moods unchanged.
+            where (np.ndarray, optional): A mask from `select` or an array of row IDs. All characters if omitted.
+            health_delta (int): Health change caused by the event.
+
+        Returns:
+            np.ndarray: The row IDs of the characters who perished.
+        """
+        rows = self._target_rows(where)
+        mood = EVENT_MOODS.get(event_name)
+        if mood is not None:
+            self.set_mood(mood, rows)
+        if not health_delta:
+            return rows[:0]
+        return self.update_health(health_delta, rows)[0]
+
+    def nbytes(self):
+        """
+        Returns the bytes used by the column arrays.
+        """
+        return sum(column.nbytes for column in (
+            self.health, self.mood_codes, self.location_ids, self.trait_bits, self.alive_rows, self.generations
+        ))
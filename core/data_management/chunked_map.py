@@ -0,0 +1,155 @@
+# chunked_map.py
+
+import random
+from collections import OrderedDict
+
+import numpy as np
+
+from core.data_management.map_manager import MapElements, TerrainKindTable, terrain_grid
+
+
+class ChunkedMap(TerrainKindTable, MapElements):
+    """
+    An effectively unbounded map whose terrain is generated lazily, one square chunk at a time.
+
+    Each chunk's terrain is derived deterministically from (seed, chunk_x, chunk_y), so a chunk can be
+    dropped and regenerated identically later. Generated chunks are kept in an LRU cache capped by
+    memory; terrain changed with `add_terrain` is recorded separately, per chunk, and replayed when an
+    evicted chunk is regenerated. Startup generates nothing, and memory stays bounded no matter how far
+    the player travels.
+    """
+
+    def __init__(self, name, seed=None, chunk_size=64, memory_limit=16 * 1024 * 1024, noise_scale=16.0):
+        """
+        Initializes the ChunkedMap.
+
+        Args:
+            name (str): Name of the map.
+            seed (int, optional): Seed for the terrain. A random seed is drawn if omitted.
+            chunk_size (int): Width and height of a chunk in cells.
+            memory_limit (int): Maximum bytes of chunk terrain held in the cache (at least one chunk).
+            noise_scale (float): Size in cells of the largest terrain features.
+        """
+        TerrainKindTable.__init__(self)
+        MapElements.__init__(self)
+        self.name = name
+        self.seed = random.getrandbits(63) if seed is None else seed
+        self.chunk_size = chunk_size
+        self.noise_scale = noise_scale
+        self.max_chunks = max(1, memory_limit // (chunk_size * chunk_size))
+        self._chunks = OrderedDict()  # (chunk_x, chunk_y) -> uint8 codes, least recently used first
+        self._edits = {}  # (chunk_x, chunk_y) -> {(local_y, local_x): code}
+        self.metadata['seed'] = self.seed
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def chunk_of(self, x, y):
+        """
+        Returns the coordinates of the chunk containing a cell.
+        """
+        return x // self.chunk_size, y // self.chunk_size
+
+    def get_chunk(self, chunk_x, chunk_y):
+        """
+        Returns a chunk's terrain codes, generating the chunk if it is not cached.
+
+        Args:
+            chunk_x (int): The chunk's column.
+            chunk_y (int): The chunk's row.
+
+        Returns:
+            np.ndarray: A (chunk_size, chunk_size) uint8 array. Treat it as read-only; change terrain
+                with `add_terrain` so the change survives eviction.
+        """
+        key = (chunk_x, chunk_y)
+        chunk = self._chunks.get(key)
+        if chunk is not None:
+            self._chunks.move_to_end(key)
+            self.hits += 1
+            return chunk
+
+        self.misses += 1
+        size = self.chunk_size
+        chunk = terrain_grid(self, chunk_x * size, chunk_y * size, size, size, self.seed, self.noise_scale)
+        edits = self._edits.get(key)
+        if edits:
+            cells = np.array(list(edits.keys()))
+            chunk[cells[:, 0], cells[:, 1]] = np.fromiter(edits.values(), dtype=np.uint8, count=len(edits))
+        self._chunks[key] = chunk
+        while len(self._chunks) > self.max_chunks:
+            self._chunks.popitem(last=False)
+            self.evictions += 1
+        return chunk
+
+    def get_terrain_code(self, x, y):
+        chunk_x, chunk_y = self.chunk_of(x, y)
+        return int(self.get_chunk(chunk_x, chunk_y)[y - chunk_y * self.chunk_size, x - chunk_x * self.chunk_size])
+
+    def get_terrain(self, x, y):
+        """
+        Returns the terrain of a cell as a {'type', 'properties'} dict.
+        """
+        return self.terrain_cell(self.get_terrain_code(x, y))
+
+    def add_terrain(self, x, y, terrain_type, properties):
+        chunk_x, chunk_y = self.chunk_of(x, y)
+        local_y, local_x = y - chunk_y * self.chunk_size, x - chunk_x * self.chunk_size
+        code = self.terrain_code(terrain_type, properties)
+        self.get_chunk(chunk_x, chunk_y)[local_y, local_x] = code
+        self._edits.setdefault((chunk_x, chunk_y), {})[(local_y, local_x)] = code
+
+    def terrain_window(self, x0, y0, width, height):
+        """
+        Returns the terrain codes of a rectangle of the map, generating the chunks it covers as needed.
+
+        Args:
+            x0 (int): The rectangle's left column.
+            y0 (int): The rectangle's top row.
+            width (int): Number of columns.
+            height (int): Number of rows.
+
+        Returns:
+            np.ndarray: A (height, width) uint8 array.
+        """
+        size = self.chunk_size
+        window = np.empty((height, width), dtype=np.uint8)
+        first_x, first_y = self.chunk_of(x0, y0)
+        last_x, last_y = self.chunk_of(x0 + width - 1, y0 + height - 1)
+        for chunk_y in range(first_y, last_y + 1):
+            top = max(y0, chunk_y * size)
+            bottom = min(y0 + height, (chunk_y + 1) * size)
+            for chunk_x in range(first_x, last_x + 1):
+                left = max(x0, chunk_x * size)
+                right = min(x0 + width, (chunk_x + 1) * size)
+                chunk = self.get_chunk(chunk_x, chunk_y)
+                window[top - y0:bottom - y0, left - x0:right - x0] = chunk[
+                    top - chunk_y * size:bottom - chunk_y * size, left - chunk_x * size:right - chunk_x * size
+                ]
+        return window
+
+    def memory_usage(self):
+        """
+        Returns the number of bytes of terrain currently held in the chunk cache.
+        """
+        return sum(chunk.nbytes for chunk in self._chunks.values())
+
+    def stats(self):
+        """
+        Returns chunk cache statistics.
+
+        Returns:
+            dict: Cached chunk count, memory use, hits, misses and evictions.
+        """
+        return {
+            "chunks": len(self._chunks),
+            "max_chunks": self.max_chunks,
+            "memory_bytes": self.memory_usage(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "edited_chunks": len(self._edits)
+        }
+
+    def __repr__(self):
+        return f"<ChunkedMap name={self.name}, seed={self.seed}, chunk_size={self.chunk_size}>"
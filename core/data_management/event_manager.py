@@ -1,18 +1,45 @@
 # core/narrative_generation/event_manager.py
 
+import threading
+from collections import OrderedDict
+
+
 class EventManager:
     """
     Manages game events and their triggers. Allows checking for specific conditions or events that
     may influence the narrative or gameplay.
+
+    Events may declare the world state keys their conditions read. When the world state tracks
+    which keys changed (a TrackedWorldState, or a snapshot or location view of a WorldState), an
+    update only re-evaluates the events depending on keys changed since that world state was last
+    seen, plus events without declared dependencies. Results are remembered per world state (e.g.,
+    per location view), so alternating between a few of them stays incremental. Other world states
+    re-evaluate every event.
+
+    `update_events` returns the events active in the world state it was given, so concurrent
+    updates for different snapshots or locations each get their own result; the remembered results
+    and the registry are guarded by a lock, and conditions and effects run outside it.
     """
 
-    def __init__(self):
+    def __init__(self, max_tracked_states=64):
         """
         Initializes the EventManager with an empty list of events.
+
+        Args:
+            max_tracked_states (int): Number of world states whose results are remembered for
+                incremental updates, least recently updated dropped first.
         """
         self.events = {}
+        self._dependents = {}  # World state key -> names of the events whose conditions read it
+        self._undeclared = {}  # Names of events without declared dependencies, evaluated every update
+        self._active = set()  # Events active in the world state of the latest update
+        self._registrations = []  # Event name of each registration so far; its position is the event's 'order'
+        self.max_tracked_states = max_tracked_states
+        # change_source -> (version, registration count, names of the events active in it)
+        self._tracked = OrderedDict()
+        self._lock = threading.Lock()
 
-    def register_event(self, event_name, conditions, effects):
+    def register_event(self, event_name, conditions, effects, depends_on=None):
         """
         Registers a new event with specified conditions and effects.
 
@@ -20,26 +47,121 @@ class EventManager:
             event_name (str): Name of the event.
             conditions (function): A function that checks if the event conditions are met.
             effects (function): A function that defines the effects of the event if it is triggered.
+            depends_on (iterable, optional): The world state keys the conditions read. If omitted, the
+                event is evaluated on every update.
         """
+        with self._lock:
+            self._register(event_name, conditions, effects, depends_on)
+
+    def _register(self, event_name, conditions, effects, depends_on):
+        if event_name in self.events:
+            self._unindex(event_name)
         self.events[event_name] = {
             'conditions': conditions,
             'effects': effects,
-            'active': False
+            'active': False,
+            'depends_on': None if depends_on is None else tuple(depends_on),
+            'order': len(self._registrations)
         }
+        self._registrations.append(event_name)
+        if depends_on is None:
+            self._undeclared[event_name] = None
+        else:
+            for key in self.events[event_name]['depends_on']:
+                self._dependents.setdefault(key, {})[event_name] = None
+
+    def _unindex(self, event_name):
+        self._undeclared.pop(event_name, None)
+        self._active.discard(event_name)
+        for key in self.events[event_name]['depends_on'] or ():
+            self._dependents[key].pop(event_name, None)
+
+    def unregister_event(self, event_name):
+        """
+        Removes a registered event.
+        """
+        with self._lock:
+            if event_name in self.events:
+                self._unindex(event_name)
+                del self.events[event_name]
+
+    def _events_to_evaluate(self, world_state, source):
+        """
+        Returns the names of the events whose conditions may differ from the results remembered for
+        a world state, and the set of events that were active in it (empty if nothing is remembered).
+        """
+        record = self._tracked.get(source) if source is not None else None
+        changed = None
+        if record is not None:
+            # Works in both directions: an older snapshot gets the keys changed between the two versions
+            changed = world_state.changed_keys_since(record[0])
+        if changed is None:
+            return list(self.events), set()
+
+        version, registered, active = record
+        names = dict(self._undeclared)
+        for key in changed:
+            names.update(self._dependents.get(key, ()))
+        # Events registered (or re-registered) since the world state was last seen
+        for order in range(registered, len(self._registrations)):
+            event_name = self._registrations[order]
+            if event_name in self.events and self.events[event_name]['order'] == order:
+                names[event_name] = None
+        return list(names), {event_name for event_name in active if event_name in self.events}
 
     def update_events(self, world_state):
         """
-        Updates the status of all registered events based on the current world state.
+        Updates the status of the registered events based on the current world state.
+
+        The effects of every active event run on each update, in registration order, including
+        events that were not re-evaluated because their inputs did not change.
 
         Args:
             world_state (dict): The current state of the game world.
+
+        Returns:
+            list: The names of the events active in this world state, in the order they were registered.
         """
-        for event_name, event_data in self.events.items():
-            if event_data['conditions'](world_state):
-                event_data['active'] = True
-                event_data['effects'](world_state)
+        source = getattr(world_state, 'change_source', None)
+        version = getattr(world_state, 'version', None)
+        with self._lock:
+            names, active = self._events_to_evaluate(world_state, source)
+            registered = len(self._registrations)
+            conditions = [(event_name, self.events[event_name]['conditions']) for event_name in names]
+        for event_name, condition in conditions:
+            if condition(world_state):
+                active.add(event_name)
             else:
-                event_data['active'] = False
+                active.discard(event_name)
+
+        with self._lock:
+            # Events unregistered while the conditions ran are left out
+            active = {event_name for event_name in active if event_name in self.events}
+            ordered = sorted(active, key=lambda event_name: self.events[event_name]['order'])
+            effects = [self.events[event_name]['effects'] for event_name in ordered]
+            for event_name in self._active - active:
+                if event_name in self.events:
+                    self.events[event_name]['active'] = False
+            for event_name in active:
+                self.events[event_name]['active'] = True
+            self._active = active
+            if source is not None:
+                self._tracked[source] = (version, registered, set(active))
+                self._tracked.move_to_end(source)
+                while len(self._tracked) > self.max_tracked_states:
+                    self._tracked.popitem(last=False)
+        for effect in effects:
+            effect(world_state)
+        return ordered
+
+    def get_active_events(self):
+        """
+        Returns the names of the events active in the world state of the latest update, in the order
+        they were registered. Callers updating several world states concurrently should use the
+        list `update_events` returns instead.
+        """
+        with self._lock:
+            return sorted(self._active, key=lambda event_name: self.events[event_name]['order'])
 
     def check_event(self, event_name, world_state):
         """
@@ -0,0 +1,177 @@
+# location_graph.py
+
+from collections import OrderedDict
+
+import numpy as np
+
+UNREACHABLE = -1
+
+
+class LocationGraph:
+    """
+    An index of the connections between a world's locations.
+
+    Locations get integer IDs in load order and their connections are stored as CSR arrays: the
+    neighbours of location i are `indices[indptr[i]:indptr[i + 1]]`. Connections are directed, as
+    listed in each location's `connections`; names that match no location are left out of the graph
+    and reported in `invalid_connections`.
+
+    For worlds of up to `all_pairs_limit` locations, hop distances between every pair are computed
+    up front, so distance and reachability queries are array lookups. Larger worlds compute a
+    breadth-first search per source location on demand and keep the most recently used ones.
+    """
+
+    def __init__(self, locations, all_pairs_limit=512, max_cached_sources=1024):
+        """
+        Builds the LocationGraph.
+
+        Args:
+            locations (dict): Location objects (with `connections` lists of names) keyed by name.
+            all_pairs_limit (int): Largest world for which all-pairs distances are precomputed.
+            max_cached_sources (int): Number of per-source searches kept for larger worlds.
+        """
+        self.names = list(locations)
+        self.ids = {name: location_id for location_id, name in enumerate(self.names)}
+        self.invalid_connections = []
+        size = len(self.names)
+
+        targets = []
+        indptr = [0]
+        for name in self.names:
+            neighbours = []
+            for connection in locations[name].connections:
+                target = self.ids.get(connection)
+                if target is None:
+                    self.invalid_connections.append((name, connection))
+                elif target not in neighbours:
+                    neighbours.append(target)
+            targets.extend(neighbours)
+            indptr.append(len(targets))
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.indices = np.array(targets, dtype=np.int64)
+        self._edges = {
+            source * size + int(target)
+            for source in range(size)
+            for target in self.indices[self.indptr[source]:self.indptr[source + 1]]
+        }
+
+        # Reverse CSR, used to walk routes back from their destination
+        order = np.argsort(self.indices, kind='stable')
+        sources = np.repeat(np.arange(size, dtype=np.int64), np.diff(self.indptr))
+        self._reverse_indices = sources[order]
+        self._reverse_indptr = np.concatenate(([0], np.cumsum(np.bincount(self.indices, minlength=size))))
+
+        self.max_cached_sources = max_cached_sources
+        self._searches = OrderedDict()  # Source ID -> hop distances, least recently used first
+        self.distances = None
+        if size <= all_pairs_limit:
+            self.distances = np.array([self._search(source) for source in range(size)], dtype=np.int32)
+            self.distances = self.distances.reshape(size, size)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def _search(self, source):
+        """
+        Returns the hop distance from a location to every location, UNREACHABLE where there is no route.
+        """
+        distances = np.full(len(self.names), UNREACHABLE, dtype=np.int32)
+        distances[source] = 0
+        frontier = np.array([source], dtype=np.int64)
+        level = 0
+        while frontier.size:
+            starts = self.indptr[frontier]
+            counts = self.indptr[frontier + 1] - starts
+            total = int(counts.sum())
+            if not total:
+                break
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            neighbours = self.indices[np.repeat(starts, counts) + offsets]
+            frontier = np.unique(neighbours[distances[neighbours] == UNREACHABLE])
+            level += 1
+            distances[frontier] = level
+        return distances
+
+    def _distances_from(self, source):
+        if self.distances is not None:
+            return self.distances[source]
+        distances = self._searches.get(source)
+        if distances is None:
+            distances = self._searches[source] = self._search(source)
+            while len(self._searches) > self.max_cached_sources:
+                self._searches.popitem(last=False)
+        else:
+            self._searches.move_to_end(source)
+        return distances
+
+    def neighbours(self, name):
+        """
+        Returns the names of the locations directly connected from a location.
+
+        Raises:
+            KeyError: If there is no location with the name.
+        """
+        location_id = self.ids[name]
+        return [self.names[target] for target in self.indices[self.indptr[location_id]:self.indptr[location_id + 1]]]
+
+    def is_connected(self, origin, destination):
+        """
+        Returns whether a location connects directly to another.
+        """
+        origin_id, destination_id = self.ids.get(origin), self.ids.get(destination)
+        if origin_id is None or destination_id is None:
+            return False
+        return origin_id * len(self.names) + destination_id in self._edges
+
+    def distance(self, origin, destination):
+        """
+        Returns the number of moves needed to go from one location to another.
+
+        Returns:
+            int: The hop count, or None if the destination cannot be reached.
+
+        Raises:
+            KeyError: If either location does not exist.
+        """
+        hops = int(self._distances_from(self.ids[origin])[self.ids[destination]])
+        return None if hops == UNREACHABLE else hops
+
+    def is_reachable(self, origin, destination):
+        """
+        Returns whether there is a route from one location to another.
+        """
+        if origin not in self.ids or destination not in self.ids:
+            return False
+        return self.distance(origin, destination) is not None
+
+    def reachable_from(self, origin):
+        """
+        Returns the names of all locations reachable from a location, nearest first.
+        """
+        distances = self._distances_from(self.ids[origin])
+        reachable = np.flatnonzero(distances != UNREACHABLE)
+        return [self.names[location_id] for location_id in reachable[np.argsort(distances[reachable], kind='stable')]]
+
+    def route(self, origin, destination):
+        """
+        Returns a shortest route between two locations.
+
+        Returns:
+            list: Location names from origin to destination inclusive, or None if there is no route.
+
+        Raises:
+            KeyError: If either location does not exist.
+        """
+        distances = self._distances_from(self.ids[origin])
+        current = self.ids[destination]
+        if distances[current] == UNREACHABLE:
+            return None
+        route = [current]
+        while distances[current] > 0:
+            sources = self._reverse_indices[self._reverse_indptr[current]:self._reverse_indptr[current + 1]]
+            current = int(sources[distances[sources] == distances[current] - 1][0])
+            route.append(current)
+        return [self.names[location_id] for location_id in reversed(route)]
@@ -2,47 +2,330 @@
 
 import random
 
-class MapSchema:
-    def __init__(self, name, width, height):
-        self.name = name
-        self.width = width
-        self.height = height
-        self.terrain = [[None for _ in range(width)] for _ in range(height)]
+import numpy as np
+
+from core.data_management.spatial_index import SpatialHash
+from core.data_management.terrain_noise import value_noise
+
+# Code 0 in a terrain grid marks a cell without terrain
+EMPTY_TERRAIN = 0
+MAX_TERRAIN_KINDS = 255
+
+# Change journal record types
+CHANGE_ADD = 'add'
+CHANGE_MOVE = 'move'
+CHANGE_REMOVE = 'remove'
+CHANGE_TERRAIN = 'terrain'
+CHANGE_TERRAIN_RESET = 'terrain_reset'
+
+
+class TerrainRow:
+    """
+    One row of a map's terrain, indexable by x like the rows of the former list-of-lists grid.
+    """
+
+    __slots__ = ("_map", "_y")
+
+    def __init__(self, map_schema, y):
+        self._map = map_schema
+        self._y = y
+
+    def __getitem__(self, x):
+        if isinstance(x, slice):
+            return [self._map.get_terrain(column, self._y) for column in range(*x.indices(self._map.width))]
+        if x < 0:
+            x += self._map.width
+        return self._map.get_terrain(x, self._y)
+
+    def __setitem__(self, x, cell):
+        if x < 0:
+            x += self._map.width
+        if cell is None:
+            self._map.clear_terrain(x, self._y)
+        else:
+            self._map.add_terrain(x, self._y, cell['type'], cell['properties'])
+
+    def __len__(self):
+        return self._map.width
+
+    def __iter__(self):
+        for x in range(self._map.width):
+            yield self._map.get_terrain(x, self._y)
+
+
+class TerrainView:
+    """
+    Read/write view of a map's terrain grid that keeps the `terrain[y][x]` access of the former
+    list-of-lists representation. Cells are returned as {'type', 'properties'} dicts, or None for
+    cells without terrain.
+    """
+
+    __slots__ = ("_map",)
+
+    def __init__(self, map_schema):
+        self._map = map_schema
+
+    def __getitem__(self, y):
+        if isinstance(y, slice):
+            return [TerrainRow(self._map, row) for row in range(*y.indices(self._map.height))]
+        if y < 0:
+            y += self._map.height
+        if not 0 <= y < self._map.height:
+            raise IndexError("Terrain row out of range.")
+        return TerrainRow(self._map, y)
+
+    def __len__(self):
+        return self._map.height
+
+    def __iter__(self):
+        for y in range(self._map.height):
+            yield TerrainRow(self._map, y)
+
+
+class TerrainKindTable:
+    """
+    Registry of the terrain kinds used by a map: each distinct terrain type and properties pair gets
+    a uint8 code, and per-code lookup tables hold its movement cost and visibility.
+    """
+
+    def __init__(self):
+        # Per-code tables. Code 0 (EMPTY_TERRAIN) has no type and costs nothing.
+        self.terrain_kinds = [None]  # Code -> (terrain type, properties)
+        self.movement_cost_table = np.zeros(1, dtype=np.float32)
+        self.visibility_table = np.zeros(1, dtype=np.float32)
+        self._kind_codes = {}  # (terrain type, properties key) -> code
+
+    @staticmethod
+    def _properties_key(properties):
+        try:
+            key = tuple(sorted(properties.items()))
+            hash(key)
+            return key
+        except TypeError:
+            # Properties holding unhashable values (e.g., lists) are compared by their text
+            return repr(sorted(properties.items(), key=lambda item: item[0]))
+
+    def terrain_code(self, terrain_type, properties):
+        """
+        Returns the code of a terrain kind, registering the kind if it is new.
+
+        Args:
+            terrain_type (str): The terrain type (e.g., "forest").
+            properties (dict): The terrain properties, e.g. movement_cost and visibility.
+
+        Returns:
+            int: The terrain code.
+
+        Raises:
+            ValueError: If the map already holds the maximum number of terrain kinds.
+        """
+        key = (terrain_type, self._properties_key(properties))
+        code = self._kind_codes.get(key)
+        if code is None:
+            code = len(self.terrain_kinds)
+            if code > MAX_TERRAIN_KINDS:
+                raise ValueError(f"A map supports at most {MAX_TERRAIN_KINDS} terrain kinds.")
+            self.terrain_kinds.append((terrain_type, properties))
+            self.movement_cost_table = np.append(
+                self.movement_cost_table, np.float32(properties.get('movement_cost', 0))
+            )
+            self.visibility_table = np.append(self.visibility_table, np.float32(properties.get('visibility', 0)))
+            self._kind_codes[key] = code
+        return code
+
+    def terrain_cell(self, code):
+        """
+        Returns the {'type', 'properties'} dict for a terrain code, or None for EMPTY_TERRAIN.
+        """
+        kind = self.terrain_kinds[code]
+        if kind is None:
+            return None
+        return {'type': kind[0], 'properties': kind[1]}
+
+    def terrain_type_codes(self, terrain_type):
+        """
+        Returns the codes of every registered kind of a terrain type.
+        """
+        return [code for code, kind in enumerate(self.terrain_kinds) if kind is not None and kind[0] == terrain_type]
+
+
+class MapElements:
+    """
+    The landmarks, dynamic elements and metadata of a map.
+
+    Landmarks and dynamic elements are kept as lists of dicts, as loaded from map data, and each is
+    also entered in a SpatialHash so "what is near this position" queries do not scan every element.
+    Every element dict gets an 'id' used to move or remove it. Removing an element moves the last
+    element of its list into its place, so the lists keep no particular order.
+    """
+
+    def __init__(self, index_cell_size=8):
         self.landmarks = []
         self.dynamic_elements = []
         self.metadata = {}
+        self._layers = {
+            'landmarks': (self.landmarks, SpatialHash(index_cell_size)),
+            'dynamic_elements': (self.dynamic_elements, SpatialHash(index_cell_size))
+        }
+        self._elements_by_id = {}
+        # Element ID -> the element's position in its layer's list
+        self._element_positions = {}
+        self._next_element_id = 0
+        self._max_detection_range = 0
 
-    def add_terrain(self, x, y, terrain_type, properties):
-        if 0 <= x < self.width and 0 <= y < self.height:
-            self.terrain[y][x] = {
-                'type': terrain_type,
-                'properties': properties
-            }
-        else:
-            raise ValueError("Coordinates out of bounds.")
+    def _check_bounds(self, x, y):
+        """
+        Raises ValueError if a position is outside the map. Unbounded maps accept every position.
+        """
+
+    def _record_change(self, change):
+        """
+        Records a change in the map's change journal. Maps without a journal ignore it.
+        """
+
+    def _add_element(self, layer, element):
+        self._check_bounds(element['x'], element['y'])
+        element['id'] = element_id = self._next_element_id
+        self._next_element_id += 1
+        elements, index = self._layers[layer]
+        self._element_positions[element_id] = len(elements)
+        elements.append(element)
+        index.insert(element_id, element['x'], element['y'])
+        self._elements_by_id[element_id] = (layer, element)
+        detection_range = element.get('properties', {}).get('detection_range')
+        if isinstance(detection_range, (int, float)):
+            self._max_detection_range = max(self._max_detection_range, detection_range)
+        self._record_change((CHANGE_ADD, element_id))
+        return element_id
 
     def add_landmark(self, x, y, name, description, importance_level):
-        if 0 <= x < self.width and 0 <= y < self.height:
-            self.landmarks.append({
-                'x': x,
-                'y': y,
-                'name': name,
-                'description': description,
-                'importance_level': importance_level
-            })
-        else:
-            raise ValueError("Coordinates out of bounds.")
+        return self._add_element('landmarks', {
+            'x': x,
+            'y': y,
+            'name': name,
+            'description': description,
+            'importance_level': importance_level
+        })
 
     def add_dynamic_element(self, x, y, element_type, properties):
-        if 0 <= x < self.width and 0 <= y < self.height:
-            self.dynamic_elements.append({
-                'x': x,
-                'y': y,
-                'type': element_type,
-                'properties': properties
-            })
-        else:
-            raise ValueError("Coordinates out of bounds.")
+        return self._add_element('dynamic_elements', {
+            'x': x,
+            'y': y,
+            'type': element_type,
+            'properties': properties
+        })
+
+    def get_element(self, element_id):
+        """
+        Returns the landmark or dynamic element dict with an ID.
+
+        Raises:
+            KeyError: If there is no element with the ID.
+        """
+        return self._elements_by_id[element_id][1]
+
+    def move_element(self, element_id, x, y):
+        """
+        Moves a landmark or dynamic element to a new position.
+
+        Raises:
+            KeyError: If there is no element with the ID.
+            ValueError: If the position is outside the map.
+        """
+        self._check_bounds(x, y)
+        layer, element = self._elements_by_id[element_id]
+        element['x'] = x
+        element['y'] = y
+        self._layers[layer][1].move(element_id, x, y)
+        self._record_change((CHANGE_MOVE, element_id))
+
+    def remove_element(self, element_id):
+        """
+        Removes a landmark or dynamic element.
+
+        Raises:
+            KeyError: If there is no element with the ID.
+        """
+        layer, element = self._elements_by_id.pop(element_id)
+        elements, index = self._layers[layer]
+        index.remove(element_id)
+        position = self._element_positions.pop(element_id)
+        last = elements.pop()
+        if last is not element:
+            elements[position] = last
+            self._element_positions[last['id']] = position
+        self._record_change((CHANGE_REMOVE, element_id))
+
+    def _elements(self, element_ids):
+        lookup = self._elements_by_id
+        return [lookup[element_id][1] for element_id in element_ids]
+
+    def find_near(self, x, y, radius, layer='dynamic_elements'):
+        """
+        Returns the elements within a distance of a position, nearest first.
+
+        Args:
+            x (float): The position's x coordinate.
+            y (float): The position's y coordinate.
+            radius (float): The maximum distance.
+            layer (str): 'dynamic_elements' or 'landmarks'.
+
+        Returns:
+            list: The element dicts.
+        """
+        return self._elements(self._layers[layer][1].query_radius(x, y, radius))
+
+    def find_nearest(self, x, y, k=1, layer='dynamic_elements', max_radius=None):
+        """
+        Returns the k elements nearest to a position, nearest first.
+
+        Args:
+            x (float): The position's x coordinate.
+            y (float): The position's y coordinate.
+            k (int): The number of elements to return.
+            layer (str): 'dynamic_elements' or 'landmarks'.
+            max_radius (float, optional): Ignore elements farther than this.
+
+        Returns:
+            list: Up to k element dicts.
+        """
+        return self._elements(self._layers[layer][1].nearest(x, y, k, max_radius))
+
+    def find_in_rect(self, x0, y0, x1, y1, layer='dynamic_elements'):
+        """
+        Returns the elements inside a rectangle, edges included.
+
+        Args:
+            x0 (float): Left edge.
+            y0 (float): Top edge.
+            x1 (float): Right edge.
+            y1 (float): Bottom edge.
+            layer (str): 'dynamic_elements' or 'landmarks'.
+
+        Returns:
+            list: The element dicts.
+        """
+        return self._elements(self._layers[layer][1].query_rect(x0, y0, x1, y1))
+
+    def find_detecting(self, x, y):
+        """
+        Returns the dynamic elements (e.g., drones or agents) whose detection_range covers a position.
+
+        Args:
+            x (float): The position's x coordinate.
+            y (float): The position's y coordinate.
+
+        Returns:
+            list: The detecting element dicts, nearest first.
+        """
+        detecting = []
+        for element in self.find_near(x, y, self._max_detection_range):
+            detection_range = element.get('properties', {}).get('detection_range')
+            if not isinstance(detection_range, (int, float)):
+                continue
+            if (element['x'] - x) ** 2 + (element['y'] - y) ** 2 <= detection_range ** 2:
+                detecting.append(element)
+        return detecting
 
     def set_metadata(self, key, value):
         self.metadata[key] = value
@@ -50,54 +333,354 @@ class MapSchema:
     def get_metadata(self, key):
         return self.metadata.get(key)
 
+
+class MapSchema(TerrainKindTable, MapElements):
+    """
+    A game map. Terrain is stored as a grid of uint8 codes, one per cell, where each code stands for
+    a terrain kind: a terrain type together with its properties. Per-kind lookup tables hold the
+    movement cost and visibility, so whole-map queries are array operations rather than loops over
+    cell dictionaries.
+
+    Element and terrain changes are recorded in a change journal, each under the next version number,
+    so clients can fetch only what changed since the version they last saw with `changes_since`.
+    """
+
+    def __init__(self, name, width, height, journal_limit=65536):
+        """
+        Initializes the MapSchema.
+
+        Args:
+            name (str): Name of the map.
+            width (int): Width of the map in cells.
+            height (int): Height of the map in cells.
+            journal_limit (int): Maximum number of journal records kept; the oldest half is dropped
+                when it is exceeded.
+        """
+        TerrainKindTable.__init__(self)
+        MapElements.__init__(self)
+        self.name = name
+        self.width = width
+        self.height = height
+        self.terrain_codes = np.zeros((height, width), dtype=np.uint8)
+        self._terrain_listeners = []
+        self.journal_limit = journal_limit
+        self._journal = []  # Record i has version _journal_start + i + 1
+        self._journal_start = 0
+
+    @property
+    def terrain(self):
+        """
+        The terrain grid as a TerrainView, indexed as terrain[y][x].
+        """
+        return TerrainView(self)
+
+    def _check_bounds(self, x, y):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError("Coordinates out of bounds.")
+
+    @property
+    def version(self):
+        """
+        The version of the latest recorded change; 0 before any change.
+        """
+        return self._journal_start + len(self._journal)
+
+    def _record_change(self, change):
+        self._journal.append(change)
+        if len(self._journal) > self.journal_limit:
+            dropped = len(self._journal) // 2
+            del self._journal[:dropped]
+            self._journal_start += dropped
+
+    def changes_since(self, version):
+        """
+        Returns the changes made after a version, compacted to the net effect: an element added and
+        removed since then does not appear, an element moved several times appears once, and each
+        changed cell is listed once with its current code.
+
+        Args:
+            version (int): The version the caller last synchronized to, e.g. 0 for a new client.
+
+        Returns:
+            dict: 'version' is the current version. If 'full' is True, the changes are no longer in
+                the journal and the whole map must be resent. Otherwise 'added' holds copies of the
+                added element dicts with their 'layer', 'moved' (id, x, y) tuples, 'removed' element
+                IDs, 'terrain' (x, y, code) tuples and 'terrain_kinds' the {code: (type, properties)}
+                kinds those codes stand for. 'terrain_reset' is True if the whole terrain grid was
+                replaced, in which case 'terrain' is empty and the grid must be resent.
+
+        Raises:
+            ValueError: If the version is newer than the map's.
+        """
+        if version > self.version:
+            raise ValueError(f"Version {version} is newer than the map's version {self.version}.")
+        if version < self._journal_start:
+            return {"version": self.version, "full": True}
+
+        added = {}
+        moved = {}
+        removed = []
+        cells = {}
+        terrain_reset = False
+        for change in self._journal[version - self._journal_start:]:
+            kind = change[0]
+            if kind == CHANGE_TERRAIN:
+                cells[change[1:]] = None
+            elif kind == CHANGE_MOVE:
+                if change[1] not in added:
+                    moved[change[1]] = None
+            elif kind == CHANGE_ADD:
+                added[change[1]] = None
+            elif kind == CHANGE_REMOVE:
+                if change[1] in added:
+                    del added[change[1]]
+                else:
+                    moved.pop(change[1], None)
+                    removed.append(change[1])
+            elif kind == CHANGE_TERRAIN_RESET:
+                terrain_reset = True
+                cells.clear()
+
+        terrain = [(x, y, int(self.terrain_codes[y, x])) for x, y in cells]
+        added_elements = []
+        for element_id in added:
+            layer, element = self._elements_by_id[element_id]
+            added_elements.append({**element, 'layer': layer})
+        moved_elements = []
+        for element_id in moved:
+            element = self._elements_by_id[element_id][1]
+            moved_elements.append((element_id, element['x'], element['y']))
+        return {
+            "version": self.version,
+            "full": False,
+            "added": added_elements,
+            "moved": moved_elements,
+            "removed": removed,
+            "terrain": terrain,
+            "terrain_kinds": {code: self.terrain_kinds[code] for code in {code for _, _, code in terrain}},
+            "terrain_reset": terrain_reset
+        }
+
+    def add_terrain_listener(self, listener):
+        """
+        Registers a callback run after terrain changes, e.g. to update cached paths.
+
+        Args:
+            listener (callable): Called with a list of changed (x, y) cells, or with None when the
+                whole grid was replaced.
+        """
+        self._terrain_listeners.append(listener)
+
+    def remove_terrain_listener(self, listener):
+        self._terrain_listeners.remove(listener)
+
+    def _set_cell_code(self, x, y, code):
+        if self.terrain_codes[y, x] == code:
+            return
+        self.terrain_codes[y, x] = code
+        self._record_change((CHANGE_TERRAIN, x, y))
+        for listener in self._terrain_listeners:
+            listener([(x, y)])
+
+    def add_terrain(self, x, y, terrain_type, properties):
+        self._check_bounds(x, y)
+        self._set_cell_code(x, y, self.terrain_code(terrain_type, properties))
+
+    def clear_terrain(self, x, y):
+        self._check_bounds(x, y)
+        self._set_cell_code(x, y, EMPTY_TERRAIN)
+
+    def set_terrain_codes(self, codes):
+        """
+        Replaces the whole terrain grid at once.
+
+        Args:
+            codes (np.ndarray): A (height, width) array of codes returned by `terrain_code`.
+
+        Raises:
+            ValueError: If the array has the wrong shape or contains unregistered codes.
+        """
+        codes = np.asarray(codes)
+        if codes.shape != (self.height, self.width):
+            raise ValueError(f"Expected a terrain grid of shape {(self.height, self.width)}, got {codes.shape}.")
+        if codes.size and (codes.min() < 0 or codes.max() >= len(self.terrain_kinds)):
+            raise ValueError("Terrain grid contains unregistered terrain codes.")
+        self.terrain_codes = codes.astype(np.uint8, copy=False)
+        self._record_change((CHANGE_TERRAIN_RESET,))
+        for listener in self._terrain_listeners:
+            listener(None)
+
+    def get_terrain(self, x, y):
+        """
+        Returns the terrain of a cell as a {'type', 'properties'} dict, or None if it has none.
+        """
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError("Coordinates out of bounds.")
+        return self.terrain_cell(self.terrain_codes[y, x])
+
+    def terrain_window(self, x0, y0, width, height):
+        """
+        Returns the terrain codes of a rectangle of the map. Cells outside the map are EMPTY_TERRAIN.
+
+        Args:
+            x0 (int): The rectangle's left column.
+            y0 (int): The rectangle's top row.
+            width (int): Number of columns.
+            height (int): Number of rows.
+
+        Returns:
+            np.ndarray: A (height, width) uint8 array.
+        """
+        window = np.zeros((height, width), dtype=np.uint8)
+        left, top = max(x0, 0), max(y0, 0)
+        right, bottom = min(x0 + width, self.width), min(y0 + height, self.height)
+        if left < right and top < bottom:
+            window[top - y0:bottom - y0, left - x0:right - x0] = self.terrain_codes[top:bottom, left:right]
+        return window
+
+    def movement_cost_grid(self):
+        """
+        Returns the movement cost of every cell as a (height, width) float32 array.
+        """
+        return self.movement_cost_table[self.terrain_codes]
+
+    def visibility_grid(self):
+        """
+        Returns the visibility of every cell as a (height, width) float32 array.
+        """
+        return self.visibility_table[self.terrain_codes]
+
+    def terrain_type_mask(self, terrain_type):
+        """
+        Returns a boolean (height, width) array marking the cells of a terrain type.
+        """
+        return np.isin(self.terrain_codes, self.terrain_type_codes(terrain_type))
+
     def __repr__(self):
         return f"<MapSchema name={self.name}, width={self.width}, height={self.height}>"
 
+# Basic terrain types and their properties used by procedural generation
+TERRAIN_PROPERTIES = {
+    'water': {'movement_cost': 0, 'visibility': 0.9},  # Water is impassable
+    'plain': {'movement_cost': 1, 'visibility': 1.0},
+    'forest': {'movement_cost': 2, 'visibility': 0.7},
+    'mountain': {'movement_cost': 3, 'visibility': 0.4}
+}
+
+# Coherent terrain is chosen by noise value: below 0.38 is water, below 0.55 plain, and so on
+TERRAIN_BANDS = (
+    (0.38, 'water'),
+    (0.55, 'plain'),
+    (0.68, 'forest'),
+    (1.0, 'mountain')
+)
+
+
+def terrain_grid(map_schema, x0, y0, width, height, seed, noise_scale=16.0):
+    """
+    Computes terrain codes for a window of a map from coherent noise over absolute coordinates, so
+    windows computed separately line up seamlessly.
+
+    Args:
+        map_schema (TerrainKindTable): The map whose terrain codes are used (kinds are registered as needed).
+        x0 (int): Absolute x coordinate of the window's left column.
+        y0 (int): Absolute y coordinate of the window's top row.
+        width (int): Number of columns.
+        height (int): Number of rows.
+        seed (int): The noise seed.
+        noise_scale (float): Size in cells of the largest terrain features.
+
+    Returns:
+        np.ndarray: A (height, width) uint8 array of terrain codes.
+    """
+    band_codes = np.array(
+        [map_schema.terrain_code(terrain_type, TERRAIN_PROPERTIES[terrain_type]) for _, terrain_type in TERRAIN_BANDS],
+        dtype=np.uint8
+    )
+    noise = value_noise(x0, y0, width, height, seed, scale=noise_scale)
+    # Each threshold a cell reaches adds the step from one band's code to the next (modulo 256, so
+    # steps down work too), which is cheaper than building band indices and looking codes up
+    codes = np.full((height, width), band_codes[0], dtype=np.uint8)
+    reached = np.empty((height, width), dtype=bool)
+    for (threshold, _), step in zip(TERRAIN_BANDS[:-1], np.diff(band_codes)):
+        np.greater_equal(noise, np.float32(threshold), out=reached)
+        codes += reached.view(np.uint8) * step
+    return codes
+
+
+def _passable_cells(map_schema, rng, count):
+    """
+    Picks up to `count` distinct random cells with passable terrain, falling back to any cell on
+    maps with too little passable ground. A map without cells gets none.
+
+    Returns:
+        tuple: Arrays of x and y coordinates.
+    """
+    cells = map_schema.width * map_schema.height
+    if not cells:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    candidates = rng.integers(0, cells, size=count * 4)
+    passable = map_schema.movement_cost_table[map_schema.terrain_codes.ravel()[candidates]] > 0
+    chosen = candidates[passable]
+    _, first = np.unique(chosen, return_index=True)
+    chosen = chosen[np.sort(first)][:count]
+    if len(chosen) < count:
+        chosen = np.concatenate((chosen, rng.integers(0, cells, size=count - len(chosen))))
+    return chosen % map_schema.width, chosen // map_schema.width
+
+
 # Procedural map generation function
-def generate_map(name, width, height, narrative_context):
+def generate_map(name, width, height, narrative_context, seed=None, noise_scale=16.0):
     """
     Generates a map based on the narrative context and player actions.
-    
+
+    Terrain for the whole map is produced in one vectorized pass. With a noise scale, neighbouring
+    cells form coherent regions (lakes, forests, ranges); without one, each cell is chosen
+    independently.
+
     Args:
         name (str): Name of the map.
         width (int): Width of the map.
         height (int): Height of the map.
         narrative_context (dict): Information about the current narrative phase, player actions, etc.
-    
+        seed (int, optional): Seed for reproducible maps. A random seed is drawn if omitted.
+        noise_scale (float, optional): Size in cells of the largest terrain features, or None for
+            uniformly random terrain.
+
     Returns:
         MapSchema: A dynamically generated map object.
     """
+    if seed is None:
+        seed = random.getrandbits(63)
+    rng = np.random.default_rng(seed)
+
     # Initialize the map schema
     map_schema = MapSchema(name, width, height)
-    
-    # Define some basic terrain types and their properties
-    terrain_types = ['forest', 'mountain', 'water', 'plain']
-    terrain_properties = {
-        'forest': {'movement_cost': 2, 'visibility': 0.7},
-        'mountain': {'movement_cost': 3, 'visibility': 0.4},
-        'water': {'movement_cost': 0, 'visibility': 0.9},  # Water is impassable
-        'plain': {'movement_cost': 1, 'visibility': 1.0}
-    }
-    
+
     # Generate the terrain layout
-    for y in range(height):
-        for x in range(width):
-            terrain_choice = random.choice(terrain_types)
-            map_schema.add_terrain(x, y, terrain_choice, terrain_properties[terrain_choice])
-    
+    if noise_scale:
+        map_schema.set_terrain_codes(terrain_grid(map_schema, 0, 0, width, height, seed, noise_scale))
+    else:
+        codes = np.array(
+            [map_schema.terrain_code(terrain_type, properties) for terrain_type, properties in TERRAIN_PROPERTIES.items()],
+            dtype=np.uint8
+        )
+        map_schema.set_terrain_codes(codes[rng.integers(0, len(codes), size=(height, width))])
+
     # Add landmarks based on narrative context
     if narrative_context.get('phase') == 'exploration':
-        for _ in range(3):  # Add 3 landmarks
-            x, y = random.randint(0, width-1), random.randint(0, height-1)
+        xs, ys = _passable_cells(map_schema, rng, 3)  # Add 3 landmarks
+        for x, y in zip(xs.tolist(), ys.tolist()):
             map_schema.add_landmark(x, y, 'Ancient Ruins', 'Mysterious ruins from an ancient civilization', 'high')
-    
+
     # Add dynamic elements based on player actions
     if narrative_context.get('recent_action') == 'combat':
-        for _ in range(2):  # Add 2 combat-related dynamic elements
-            x, y = random.randint(0, width-1), random.randint(0, height-1)
+        xs, ys = _passable_cells(map_schema, rng, 2)  # Add 2 combat-related dynamic elements
+        for x, y in zip(xs.tolist(), ys.tolist()):
             map_schema.add_dynamic_element(x, y, 'Enemy Camp', {'enemy_type': 'goblins', 'strength': 5})
-    
+
     # Set some metadata
     map_schema.set_metadata('created_by', 'Map Generator v1.0')
-    
+    map_schema.set_metadata('seed', seed)
+
     return map_schema
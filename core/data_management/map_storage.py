@@ -0,0 +1,170 @@
+# map_storage.py
+
+import argparse
+import json
+import struct
+
+import numpy as np
+import yaml
+
+from core.data_management.map_manager import MapSchema
+
+MAGIC = b"RTNAMAP\0"
+FORMAT_VERSION = 1
+
+# magic, format version, reserved, width, height, terrain offset, element count, element table offset,
+# JSON blob offset, JSON blob length
+HEADER = struct.Struct("<8sHHIIQIQQQ")
+_ALIGNMENT = 64
+
+# One row per landmark or dynamic element; the rest of each element is in the JSON blob
+ELEMENT_DTYPE = np.dtype([('x', '<i8'), ('y', '<i8'), ('layer', 'u1')])
+_LAYERS = ('landmarks', 'dynamic_elements')
+
+
+def _aligned(offset):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def save_map(map_schema, path):
+    """
+    Writes a map in the binary map format.
+
+    The file holds a fixed header, the raw uint8 terrain grid (64-byte aligned, so it can be memory
+    mapped), a packed table of element coordinates and a JSON blob with the terrain kinds, element
+    details and metadata.
+
+    Args:
+        map_schema (MapSchema): The map to save.
+        path (str): The file to write.
+    """
+    rows = []
+    records = []
+    for layer_number, layer in enumerate(_LAYERS):
+        for element in getattr(map_schema, layer):
+            rows.append((element['x'], element['y'], layer_number))
+            records.append({key: value for key, value in element.items() if key not in ('x', 'y', 'id')})
+    table = np.array(rows, dtype=ELEMENT_DTYPE)
+
+    blob = json.dumps({
+        "name": map_schema.name,
+        "terrain_kinds": [None if kind is None else list(kind) for kind in map_schema.terrain_kinds],
+        "elements": records,
+        "metadata": map_schema.metadata
+    }).encode("utf-8")
+
+    terrain_offset = _aligned(HEADER.size)
+    table_offset = _aligned(terrain_offset + map_schema.width * map_schema.height)
+    blob_offset = table_offset + table.nbytes
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0, map_schema.width, map_schema.height, terrain_offset,
+        len(table), table_offset, blob_offset, len(blob)
+    )
+    with open(path, 'wb') as file:
+        file.write(header)
+        file.seek(terrain_offset)
+        file.write(np.ascontiguousarray(map_schema.terrain_codes, dtype=np.uint8).tobytes())
+        file.seek(table_offset)
+        file.write(table.tobytes())
+        file.write(blob)
+
+
+def load_map(path, mmap_mode='c'):
+    """
+    Loads a map written by `save_map`.
+
+    The terrain grid is memory mapped rather than read, so loading takes the same time for any map
+    size and processes loading the same file share its pages. With the default copy-on-write mode,
+    terrain changes stay private to the loaded map and are not written back to the file.
+
+    Args:
+        path (str): The file to read.
+        mmap_mode (str): 'c' (copy-on-write), 'r' (read-only) or None to read the terrain into memory.
+
+    Returns:
+        MapSchema: The loaded map.
+
+    Raises:
+        ValueError: If the file is not a map file or uses an unsupported format version.
+    """
+    with open(path, 'rb') as file:
+        header = file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{path} is not a map file.")
+        (magic, version, _, width, height, terrain_offset, element_count,
+         table_offset, blob_offset, blob_length) = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a map file.")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported map format version {version}.")
+        file.seek(table_offset)
+        table = np.frombuffer(file.read(element_count * ELEMENT_DTYPE.itemsize), dtype=ELEMENT_DTYPE)
+        file.seek(blob_offset)
+        details = json.loads(file.read(blob_length).decode("utf-8"))
+
+    map_schema = MapSchema(details["name"], width, height)
+    for kind in details["terrain_kinds"][1:]:
+        map_schema.terrain_code(kind[0], kind[1])
+    if mmap_mode is None:
+        with open(path, 'rb') as file:
+            file.seek(terrain_offset)
+            codes = np.frombuffer(file.read(width * height), dtype=np.uint8).reshape(height, width).copy()
+    else:
+        codes = np.memmap(path, dtype=np.uint8, mode=mmap_mode, offset=terrain_offset, shape=(height, width))
+    # The codes were validated when the map was saved, so the grid is adopted without scanning it
+    map_schema.terrain_codes = codes
+
+    for row, record in zip(table.tolist(), details["elements"]):
+        x, y, layer_number = row
+        map_schema._add_element(_LAYERS[layer_number], {'x': x, 'y': y, **record})
+    map_schema.metadata.update(details["metadata"])
+    return map_schema
+
+
+def map_from_yaml(path):
+    """
+    Builds a MapSchema from a YAML map file in the format of data/map.yaml.
+
+    Args:
+        path (str): The YAML file to read.
+
+    Returns:
+        MapSchema: The map.
+    """
+    with open(path, 'r') as file:
+        data = yaml.safe_load(file)["map"]
+    map_schema = MapSchema(data["name"], data["width"], data["height"])
+    for cell in data.get("terrain", []):
+        map_schema.add_terrain(cell["x"], cell["y"], cell["type"], cell.get("properties", {}))
+    for landmark in data.get("landmarks", []):
+        map_schema._add_element('landmarks', dict(landmark))
+    for element in data.get("dynamic_elements", []):
+        map_schema._add_element('dynamic_elements', dict(element))
+    for key, value in (data.get("metadata") or {}).items():
+        map_schema.set_metadata(key, value)
+    return map_schema
+
+
+def convert_yaml_map(yaml_path, map_path):
+    """
+    Converts a YAML map file into the binary map format.
+
+    Args:
+        yaml_path (str): The YAML file to read (e.g., data/map.yaml).
+        map_path (str): The binary map file to write.
+
+    Returns:
+        MapSchema: The converted map.
+    """
+    map_schema = map_from_yaml(yaml_path)
+    save_map(map_schema, map_path)
+    return map_schema
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a YAML map into the binary map format.")
+    parser.add_argument("yaml_path", help="YAML map file, e.g. data/map.yaml")
+    parser.add_argument("map_path", help="Binary map file to write")
+    arguments = parser.parse_args()
+    converted = convert_yaml_map(arguments.yaml_path, arguments.map_path)
+    print(f"Converted {converted} to {arguments.map_path}.")
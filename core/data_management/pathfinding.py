@@ -0,0 +1,450 @@
+# pathfinding.py
+
+import heapq
+import math
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+
+INF = float('inf')
+
+# (dx, dy, cost factor) for each allowed move
+_ORTHOGONAL_MOVES = ((1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0))
+_DIAGONAL_MOVES = _ORTHOGONAL_MOVES + tuple((dx, dy, math.sqrt(2)) for dx in (1, -1) for dy in (1, -1))
+
+# Tolerance when deciding whether a cell's distance was reached through a given neighbour
+_EPSILON = 1e-9
+
+
+class DistanceField:
+    """
+    The cost of reaching one goal cell from every cell of a map.
+
+    A cell's distance is the summed movement cost of the cells entered on the cheapest way to the
+    goal; unreachable cells are infinite. Fields are owned by a Pathfinder, which repairs them in
+    place when terrain changes.
+    """
+
+    __slots__ = ("goal", "distances", "version", "_pathfinder", "_flow", "_flow_version")
+
+    def __init__(self, pathfinder, goal, distances):
+        self._pathfinder = pathfinder
+        self.goal = goal
+        self.distances = distances  # Flat array('d'), indexed by y * width + x
+        self.version = 0  # Incremented whenever the distances change
+        self._flow = None
+        self._flow_version = -1
+
+    def distance(self, x, y):
+        """
+        Returns the cost of reaching the goal from a cell, or infinity if it cannot be reached.
+        """
+        return self.distances[y * self._pathfinder.width + x]
+
+    def next_step(self, x, y):
+        """
+        Returns the neighbouring cell to move to from (x, y) on a cheapest route to the goal.
+
+        Returns:
+            tuple: The (x, y) of the next cell, or None at the goal or where the goal is unreachable.
+        """
+        pathfinder = self._pathfinder
+        index = y * pathfinder.width + x
+        if index == pathfinder.index(*self.goal) or self.distances[index] == INF:
+            return None
+        best, best_value = None, INF
+        for neighbor, weight in pathfinder.neighbors(index):
+            value = self.distances[neighbor] + weight
+            if value < best_value:
+                best, best_value = neighbor, value
+        return None if best is None else pathfinder.position(best)
+
+    def path_from(self, x, y):
+        """
+        Follows the field from a cell to the goal.
+
+        Returns:
+            list: The (x, y) cells from the start to the goal inclusive, or None if unreachable.
+        """
+        if self.distance(x, y) == INF:
+            return None
+        path = [(x, y)]
+        step = self.next_step(x, y)
+        while step is not None:
+            path.append(step)
+            step = self.next_step(*step)
+        return path
+
+    def as_array(self):
+        """
+        Returns the distances as a (height, width) float64 array.
+        """
+        return np.frombuffer(self.distances, dtype=np.float64).reshape(self._pathfinder.height, self._pathfinder.width)
+
+    def flow(self):
+        """
+        Returns the flow field towards the goal, recomputed only after the distances change.
+
+        Returns:
+            FlowField: The direction to move in from every cell.
+        """
+        if self._flow is None or self._flow_version != self.version:
+            self._flow = FlowField(self._pathfinder, self)
+            self._flow_version = self.version
+        return self._flow
+
+
+class FlowField:
+    """
+    The direction to move in from every cell to reach a goal, so that any number of agents heading
+    for the same goal share one computation and advance with a single array lookup per tick.
+    """
+
+    def __init__(self, pathfinder, field):
+        """
+        Derives the flow directions from a distance field in one vectorized pass.
+
+        Args:
+            pathfinder (Pathfinder): The pathfinder the field belongs to.
+            field (DistanceField): The distances to the goal.
+        """
+        self.goal = field.goal
+        moves = pathfinder.moves
+        self.dx = np.array([dx for dx, _, _ in moves] + [0], dtype=np.int64)
+        self.dy = np.array([dy for _, dy, _ in moves] + [0], dtype=np.int64)
+
+        distances = field.as_array()
+        costs = pathfinder.cost_array()
+        height, width = distances.shape
+        # Pad by one cell of infinity so neighbours off the map are never chosen
+        entry = np.full((height + 2, width + 2), INF)
+        entry[1:-1, 1:-1] = np.where(costs > 0, distances, INF)
+        padded_costs = np.zeros((height + 2, width + 2))
+        padded_costs[1:-1, 1:-1] = costs
+        candidates = np.stack([
+            entry[1 + dy:1 + dy + height, 1 + dx:1 + dx + width]
+            + padded_costs[1 + dy:1 + dy + height, 1 + dx:1 + dx + width] * factor
+            for dx, dy, factor in moves
+        ])
+        directions = np.argmin(candidates, axis=0)
+        stuck = ~np.isfinite(distances) | ~np.isfinite(np.min(candidates, axis=0))
+        stuck[self.goal[1], self.goal[0]] = True
+        directions[stuck] = len(moves)  # The "stay" direction
+        self.directions = directions.astype(np.int8)
+
+    def step(self, xs, ys):
+        """
+        Advances many agents one cell towards the goal.
+
+        Args:
+            xs (np.ndarray): The agents' x coordinates.
+            ys (np.ndarray): The agents' y coordinates.
+
+        Returns:
+            tuple: Arrays of the agents' next x and y coordinates. Agents at the goal or unable to
+                reach it stay where they are.
+        """
+        xs = np.asarray(xs)
+        ys = np.asarray(ys)
+        directions = self.directions[ys, xs]
+        return xs + self.dx[directions], ys + self.dy[directions]
+
+
+class Pathfinder:
+    """
+    Finds routes across a MapSchema using each cell's movement_cost, where a cost of 0 (e.g., water)
+    is impassable.
+
+    Single queries use A*. Distance fields (Dijkstra from the goal over the whole map) are cached per
+    goal for repeated queries and flow fields; when terrain changes, each cached field is repaired
+    around the changed cells instead of being recomputed.
+    """
+
+    def __init__(self, map_schema, diagonal=False, max_cached_fields=32):
+        """
+        Initializes the Pathfinder and subscribes it to the map's terrain changes.
+
+        Args:
+            map_schema (MapSchema): The map to search.
+            diagonal (bool): Whether diagonal moves are allowed (costing sqrt(2) times the cell cost).
+            max_cached_fields (int): Maximum number of distance fields kept, least recently used dropped first.
+        """
+        self.map = map_schema
+        self.width = map_schema.width
+        self.height = map_schema.height
+        self.moves = _DIAGONAL_MOVES if diagonal else _ORTHOGONAL_MOVES
+        self.max_cached_fields = max_cached_fields
+        self._fields = OrderedDict()  # Goal (x, y) -> DistanceField
+        self._load_costs()
+        map_schema.add_terrain_listener(self._on_terrain_changed)
+
+    def close(self):
+        """
+        Stops following the map's terrain changes.
+        """
+        self.map.remove_terrain_listener(self._on_terrain_changed)
+
+    def _load_costs(self):
+        self._costs = array('d', self.map.movement_cost_grid().astype(np.float64).ravel().tobytes())
+        passable = self.map.movement_cost_grid()
+        passable = passable[passable > 0]
+        self._min_cost = float(passable.min()) if passable.size else 1.0
+
+    def cost_array(self):
+        """
+        Returns the movement cost of every cell as a (height, width) float64 array.
+        """
+        return np.frombuffer(self._costs, dtype=np.float64).reshape(self.height, self.width)
+
+    def index(self, x, y):
+        return y * self.width + x
+
+    def position(self, index):
+        return index % self.width, index // self.width
+
+    def neighbors(self, index):
+        """
+        Yields (neighbour index, cost of entering it) for the passable neighbours of a cell.
+        """
+        x, y = index % self.width, index // self.width
+        costs = self._costs
+        for dx, dy, factor in self.moves:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < self.width and 0 <= ny < self.height:
+                neighbor = ny * self.width + nx
+                cost = costs[neighbor]
+                if cost > 0:
+                    yield neighbor, cost * factor
+
+    def _predecessors(self, index):
+        """
+        Yields (neighbour index, cost of moving from it into the cell) for cells that can step into
+        `index`. Empty if the cell itself is impassable.
+        """
+        cost = self._costs[index]
+        if cost <= 0:
+            return
+        x, y = index % self.width, index // self.width
+        for dx, dy, factor in self.moves:
+            nx, ny = x - dx, y - dy
+            if 0 <= nx < self.width and 0 <= ny < self.height:
+                neighbor = ny * self.width + nx
+                if self._costs[neighbor] > 0:
+                    yield neighbor, cost * factor
+
+    def _check(self, x, y):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError("Coordinates out of bounds.")
+
+    def _heuristic(self, index, goal_x, goal_y):
+        x, y = index % self.width, index // self.width
+        dx, dy = abs(x - goal_x), abs(y - goal_y)
+        if len(self.moves) == 4:
+            return (dx + dy) * self._min_cost
+        return (max(dx, dy) + (math.sqrt(2) - 1) * min(dx, dy)) * self._min_cost
+
+    def find_path(self, start, goal):
+        """
+        Finds a cheapest path between two cells. Uses the goal's cached distance field if there is one,
+        A* otherwise.
+
+        Args:
+            start (tuple): The (x, y) start cell.
+            goal (tuple): The (x, y) goal cell.
+
+        Returns:
+            list: The (x, y) cells from start to goal inclusive, or None if the goal cannot be reached.
+
+        Raises:
+            ValueError: If either cell is outside the map.
+        """
+        self._check(*start)
+        self._check(*goal)
+        field = self._fields.get(tuple(goal))
+        if field is not None:
+            self._fields.move_to_end(tuple(goal))
+            return field.path_from(*start)
+
+        start_index, goal_index = self.index(*start), self.index(*goal)
+        if start_index == goal_index:
+            return [tuple(start)]
+        if self._costs[goal_index] <= 0:
+            return None
+        goal_x, goal_y = goal
+        costs = {start_index: 0.0}
+        came_from = {}
+        frontier = [(self._heuristic(start_index, goal_x, goal_y), 0.0, start_index)]
+        while frontier:
+            _, cost, current = heapq.heappop(frontier)
+            if current == goal_index:
+                path = [current]
+                while current in came_from:
+                    current = came_from[current]
+                    path.append(current)
+                return [self.position(index) for index in reversed(path)]
+            if cost > costs[current]:
+                continue
+            for neighbor, weight in self.neighbors(current):
+                new_cost = cost + weight
+                if new_cost < costs.get(neighbor, INF):
+                    costs[neighbor] = new_cost
+                    came_from[neighbor] = current
+                    heapq.heappush(frontier, (new_cost + self._heuristic(neighbor, goal_x, goal_y), new_cost, neighbor))
+        return None
+
+    def distance_field(self, goal):
+        """
+        Returns the distance field for a goal, computing and caching it if needed.
+
+        Args:
+            goal (tuple): The (x, y) goal cell.
+
+        Returns:
+            DistanceField: Costs to the goal from every cell.
+        """
+        goal = tuple(goal)
+        self._check(*goal)
+        field = self._fields.get(goal)
+        if field is not None:
+            self._fields.move_to_end(goal)
+            return field
+
+        distances = array('d', [INF]) * (self.width * self.height)
+        goal_index = self.index(*goal)
+        distances[goal_index] = 0.0
+        field = DistanceField(self, goal, distances)
+        self._propagate(field, [(0.0, goal_index)])
+        self._fields[goal] = field
+        while len(self._fields) > self.max_cached_fields:
+            self._fields.popitem(last=False)
+        return field
+
+    def flow_field(self, goal):
+        """
+        Returns the flow field towards a goal, for moving many agents to it at once.
+
+        Args:
+            goal (tuple): The (x, y) goal cell.
+
+        Returns:
+            FlowField: The direction to move in from every cell.
+        """
+        return self.distance_field(goal).flow()
+
+    def patrol_route(self, waypoints, loop=True):
+        """
+        Joins cheapest paths between consecutive waypoints into one patrol route.
+
+        Args:
+            waypoints (list): The (x, y) cells to visit in order.
+            loop (bool): Whether the route returns from the last waypoint to the first.
+
+        Returns:
+            list: The (x, y) cells of the route, or None if a leg is unreachable.
+        """
+        stops = list(waypoints) + ([waypoints[0]] if loop and len(waypoints) > 1 else [])
+        route = [tuple(stops[0])] if stops else []
+        for start, goal in zip(stops, stops[1:]):
+            leg = self.find_path(start, goal)
+            if leg is None:
+                return None
+            route.extend(leg[1:])
+        return route
+
+    def _propagate(self, field, frontier):
+        """
+        Runs Dijkstra outwards from the given (distance, index) entries, lowering distances in place.
+        """
+        distances = field.distances
+        heapq.heapify(frontier)
+        while frontier:
+            distance, current = heapq.heappop(frontier)
+            if distance > distances[current]:
+                continue
+            for neighbor, weight in self._predecessors(current):
+                new_distance = distance + weight
+                if new_distance < distances[neighbor]:
+                    distances[neighbor] = new_distance
+                    heapq.heappush(frontier, (new_distance, neighbor))
+
+    def _on_terrain_changed(self, cells):
+        if cells is None:
+            self._fields.clear()
+            self._load_costs()
+            return
+        new_costs = self.map.movement_cost_table[[self.map.terrain_codes[y, x] for x, y in cells]]
+        for (x, y), new_cost in zip(cells, new_costs.tolist()):
+            index = self.index(x, y)
+            old_cost = self._costs[index]
+            if old_cost == new_cost:
+                continue
+            for goal, field in list(self._fields.items()):
+                if index == self.index(*goal):
+                    del self._fields[goal]  # Changing the goal itself invalidates its whole field
+                else:
+                    self._repair(field, index, old_cost, new_cost)
+            self._costs[index] = new_cost
+            if new_cost > 0:
+                self._min_cost = min(self._min_cost, new_cost)
+
+    def _repair(self, field, index, old_cost, new_cost):
+        """
+        Updates a distance field after the cost of entering one cell changed (costs not yet updated).
+
+        Cells whose cheapest route entered the changed cell are reset and recomputed from their
+        neighbours; if the cell got cheaper, improvements are propagated outwards from it.
+        """
+        distances = field.distances
+        changed = False
+        if new_cost <= 0 or (old_cost > 0 and new_cost > old_cost):
+            # Collect the cells whose distance may depend on entering the changed cell
+            affected = set()
+            stack = [index] if new_cost <= 0 else []
+            if old_cost > 0 and distances[index] < INF:
+                for neighbor, weight in self._predecessors(index):
+                    if abs(distances[neighbor] - (distances[index] + weight)) <= _EPSILON:
+                        stack.append(neighbor)
+            while stack:
+                current = stack.pop()
+                if current in affected:
+                    continue
+                affected.add(current)
+                if current == index or distances[current] == INF:
+                    continue
+                for neighbor, weight in self._predecessors(current):
+                    if neighbor not in affected and abs(distances[neighbor] - (distances[current] + weight)) <= _EPSILON:
+                        stack.append(neighbor)
+            if affected:
+                changed = True
+                for cell in affected:
+                    distances[cell] = INF
+
+            self._costs[index] = new_cost
+            # Reseed the affected cells from their unaffected neighbours
+            frontier = []
+            for cell in affected:
+                if self._costs[cell] <= 0:
+                    continue
+                best = INF
+                for neighbor, weight in self.neighbors(cell):
+                    if neighbor not in affected:
+                        best = min(best, distances[neighbor] + weight)
+                if best < INF:
+                    distances[cell] = best
+                    frontier.append((best, cell))
+            self._propagate(field, frontier)
+        else:
+            self._costs[index] = new_cost
+            if old_cost <= 0:
+                # The cell became passable: give it a distance from its neighbours first
+                best = INF
+                for neighbor, weight in self.neighbors(index):
+                    best = min(best, distances[neighbor] + weight)
+                distances[index] = best
+            if distances[index] < INF:
+                changed = True
+                self._propagate(field, [(distances[index], index)])
+        self._costs[index] = old_cost  # The caller records the new cost once every field is repaired
+        if changed:
+            field.version += 1
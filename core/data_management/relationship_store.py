@@ -0,0 +1,247 @@
+# relationship_store.py
+
+import numpy as np
+
+_FREE = -1
+
+
+class RelationshipStore:
+    """
+    A sparse matrix of directed relationship values between characters, indexed by row ID.
+
+    Pairs are stored in coordinate (COO) arrays with a dict from (source, target) to slot, so
+    reading or adjusting one pair is O(1) and decay is a single array operation over all pairs.
+    Queries over one character's relationships use CSR (outgoing) and CSC (incoming) orderings of
+    the slots. Value changes do not affect them because the orderings refer to slots, not values.
+    Added pairs are kept in a short pending list and removed pairs are left in the orderings as
+    tombstones, filtered out by queries; the orderings are only rebuilt once enough pairs have
+    changed, so adding or removing a pair costs O(1) amortized rather than a full re-sort.
+
+    Values are float32, where Character kept relationship values as Python ints: integer
+    adjustments stay exact (up to 2**24), and decay produces fractional values.
+    """
+
+    def __init__(self, capacity=1024, rebuild_after=64):
+        """
+        Initializes the RelationshipStore.
+
+        Args:
+            capacity (int): Number of pairs to allocate up front; the arrays grow as needed.
+            rebuild_after (int): Number of pairs added or removed since the orderings were built at
+                which they are rebuilt, raised to an eighth of the stored pairs for large stores.
+        """
+        self._sources = np.full(capacity, _FREE, dtype=np.int32)
+        self._targets = np.full(capacity, _FREE, dtype=np.int32)
+        self._values = np.zeros(capacity, dtype=np.float32)
+        self._slots = {}  # (source, target) -> slot
+        self._free_slots = []
+        self._used = 0  # Slots below this have been handed out
+        self.rebuild_after = rebuild_after
+        self._orderings = None  # ((indptr, slots) by source, (indptr, slots) by target), or None when stale
+        self._pending = []  # Slots added since the orderings were built
+        self._tombstones = []  # Slots freed since the orderings were built; reused once they are rebuilt
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _slot(self, source, target):
+        slot = self._slots.get((source, target))
+        if slot is not None:
+            return slot
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            slot = self._used
+            if slot == len(self._values):
+                extra = max(len(self._values), 1)
+                self._sources = np.concatenate((self._sources, np.full(extra, _FREE, dtype=np.int32)))
+                self._targets = np.concatenate((self._targets, np.full(extra, _FREE, dtype=np.int32)))
+                self._values = np.concatenate((self._values, np.zeros(extra, dtype=np.float32)))
+            self._used += 1
+        self._sources[slot] = source
+        self._targets[slot] = target
+        self._values[slot] = 0.0
+        self._slots[(source, target)] = slot
+        if self._orderings is not None:
+            self._pending.append(slot)
+            self._check_orderings()
+        return slot
+
+    def _free(self, slots):
+        freed = self._free_slots if self._orderings is None else self._tombstones
+        for slot in slots:
+            slot = int(slot)
+            del self._slots[(int(self._sources[slot]), int(self._targets[slot]))]
+            freed.append(slot)
+        self._sources[slots] = _FREE
+        self._targets[slots] = _FREE
+        self._values[slots] = 0.0
+        self._check_orderings()
+
+    def _check_orderings(self):
+        """
+        Marks the orderings stale once enough pairs have been added or removed since they were built.
+        """
+        changed = len(self._pending) + len(self._tombstones)
+        if self._orderings is not None and changed > max(self.rebuild_after, len(self._slots) // 8):
+            self._orderings = None
+            self._pending = []
+            self._free_slots.extend(self._tombstones)
+            self._tombstones = []
+
+    def get(self, source, target):
+        """
+        Returns how source feels about target; 0 if they have no relationship.
+        """
+        slot = self._slots.get((source, target))
+        return 0.0 if slot is None else float(self._values[slot])
+
+    def has(self, source, target):
+        """
+        Returns whether source has a relationship with target.
+        """
+        return (source, target) in self._slots
+
+    def set(self, source, target, value):
+        self._values[self._slot(source, target)] = value
+
+    def adjust(self, source, target, change):
+        """
+        Adds a change to how source feels about target and returns the new value.
+        """
+        slot = self._slot(source, target)
+        self._values[slot] += change
+        return float(self._values[slot])
+
+    def remove(self, source, target):
+        """
+        Removes how source feels about target.
+
+        Raises:
+            KeyError: If source has no relationship with target.
+        """
+        self._free([self._slots[(source, target)]])
+
+    def decay(self, factor=0.9, prune_below=None):
+        """
+        Scales every relationship toward neutral at once, e.g. once per game day.
+
+        Args:
+            factor (float): Multiplier applied to every value.
+            prune_below (float, optional): Remove pairs whose magnitude falls below this.
+
+        Returns:
+            int: The number of pairs removed.
+        """
+        self._values[:self._used] *= np.float32(factor)
+        if prune_below is None:
+            return 0
+        live = self._sources[:self._used] != _FREE
+        weak = np.flatnonzero(live & (np.abs(self._values[:self._used]) < prune_below))
+        if len(weak):
+            self._free(weak)
+        return len(weak)
+
+    def _ordering(self, keys):
+        """
+        Returns (indptr, slots): the live slots grouped by key, with group r at slots[indptr[r]:indptr[r + 1]].
+        """
+        keys = keys[:self._used]
+        live = np.flatnonzero(keys != _FREE)
+        slots = live[np.argsort(keys[live], kind='stable')]
+        counts = np.bincount(keys[live], minlength=1)
+        return np.concatenate(([0], np.cumsum(counts))), slots
+
+    def _group(self, by_target, key):
+        """
+        Returns the slots of the live pairs whose source (or, with by_target, target) is key.
+        """
+        if self._orderings is None:
+            self._orderings = (self._ordering(self._sources), self._ordering(self._targets))
+        indptr, slots = self._orderings[by_target]
+        keys = self._targets if by_target else self._sources
+        group = slots[indptr[key]:indptr[key + 1]] if key + 1 < len(indptr) else slots[:0]
+        # Tombstoned slots no longer hold the key; pending slots are not in the orderings yet
+        group = group[keys[group] == key]
+        if self._pending:
+            pending = np.array(self._pending, dtype=np.int64)
+            group = np.concatenate((group, pending[keys[pending] == key]))
+        return group
+
+    def outgoing(self, source):
+        """
+        Returns (target IDs, values) of everyone source has a relationship with.
+        """
+        slots = self._group(False, source)
+        return self._targets[slots].astype(np.int64), self._values[slots]
+
+    def incoming(self, target):
+        """
+        Returns (source IDs, values) of everyone with a relationship toward target.
+        """
+        slots = self._group(True, target)
+        return self._sources[slots].astype(np.int64), self._values[slots]
+
+    @staticmethod
+    def _top(ids, values, k):
+        if len(values) > k:
+            chosen = np.argpartition(-values, k - 1)[:k]
+            ids, values = ids[chosen], values[chosen]
+        order = np.argsort(-values, kind='stable')
+        return [(int(ids[position]), float(values[position])) for position in order]
+
+    def top_allies(self, source, k=5):
+        """
+        Returns the k characters source likes most, as (ID, value) pairs, strongest first.
+        Only positive relationships count.
+        """
+        ids, values = self.outgoing(source)
+        positive = values > 0
+        return self._top(ids[positive], values[positive], k)
+
+    def top_enemies(self, source, k=5):
+        """
+        Returns the k characters source dislikes most, as (ID, value) pairs, strongest first.
+        Only negative relationships count.
+        """
+        ids, values = self.outgoing(source)
+        negative = values < 0
+        return [(other, -value) for other, value in self._top(ids[negative], -values[negative], k)]
+
+    def neighbourhood(self, source, depth=1, min_strength=0.0):
+        """
+        Returns the relationships around a character for prompt context: those of the character and,
+        for depth > 1, of the characters it relates to, breadth first.
+
+        Args:
+            source (int): The character at the centre.
+            depth (int): Number of steps to follow.
+            min_strength (float): Ignore relationships whose magnitude is below this.
+
+        Returns:
+            list: (source ID, target ID, value) triples.
+        """
+        edges = []
+        visited = {source}
+        frontier = [source]
+        for _ in range(depth):
+            next_frontier = []
+            for member in frontier:
+                targets, values = self.outgoing(member)
+                strong = np.abs(values) >= min_strength
+                for target, value in zip(targets[strong].tolist(), values[strong].tolist()):
+                    edges.append((member, target, value))
+                    if target not in visited:
+                        visited.add(target)
+                        next_frontier.append(target)
+            frontier = next_frontier
+        return edges
+
+    def remove_character(self, row):
+        """
+        Removes every relationship from or toward a character, in O(its relationships) while the
+        orderings are current.
+        """
+        slots = np.union1d(self._group(False, row), self._group(True, row))
+        if len(slots):
+            self._free(slots)
@@ -0,0 +1,215 @@
+# spatial_index.py
+
+import heapq
+import math
+
+
+class SpatialHash:
+    """
+    Uniform grid hash over 2D points, for finding map elements near a position without scanning
+    every element.
+
+    Items are bucketed by the grid cell containing them; radius, rectangle and nearest-neighbour
+    queries only visit the buckets that can hold matches. Inserting, moving and removing an item are
+    O(1).
+    """
+
+    def __init__(self, cell_size=8):
+        """
+        Initializes an empty SpatialHash.
+
+        Args:
+            cell_size (int): Side length of a grid cell in map units. Roughly the typical query radius
+                works well.
+        """
+        self.cell_size = cell_size
+        self._cells = {}  # (cell_x, cell_y) -> set of item IDs
+        self._positions = {}  # Item ID -> (x, y)
+
+    def _cell(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def insert(self, item_id, x, y):
+        """
+        Adds an item at a position, or moves it there if it is already indexed.
+
+        Args:
+            item_id (hashable): Identifies the item.
+            x (float): The item's x coordinate.
+            y (float): The item's y coordinate.
+        """
+        if item_id in self._positions:
+            self.move(item_id, x, y)
+            return
+        self._positions[item_id] = (x, y)
+        self._cells.setdefault(self._cell(x, y), set()).add(item_id)
+
+    def move(self, item_id, x, y):
+        """
+        Moves an indexed item to a new position.
+
+        Raises:
+            KeyError: If the item is not indexed.
+        """
+        old_x, old_y = self._positions[item_id]
+        old_cell = self._cell(old_x, old_y)
+        new_cell = self._cell(x, y)
+        self._positions[item_id] = (x, y)
+        if old_cell != new_cell:
+            self._discard_from_cell(old_cell, item_id)
+            self._cells.setdefault(new_cell, set()).add(item_id)
+
+    def remove(self, item_id):
+        """
+        Removes an item from the index.
+
+        Raises:
+            KeyError: If the item is not indexed.
+        """
+        x, y = self._positions.pop(item_id)
+        self._discard_from_cell(self._cell(x, y), item_id)
+
+    def _discard_from_cell(self, cell, item_id):
+        items = self._cells[cell]
+        items.discard(item_id)
+        if not items:
+            del self._cells[cell]
+
+    def position(self, item_id):
+        """
+        Returns the (x, y) position of an indexed item.
+        """
+        return self._positions[item_id]
+
+    def query_rect(self, x0, y0, x1, y1):
+        """
+        Returns the items inside a rectangle, edges included.
+
+        Args:
+            x0 (float): Left edge.
+            y0 (float): Top edge.
+            x1 (float): Right edge.
+            y1 (float): Bottom edge.
+
+        Returns:
+            list: The IDs of the items inside the rectangle.
+        """
+        first_x, first_y = self._cell(x0, y0)
+        last_x, last_y = self._cell(x1, y1)
+        if (last_x - first_x + 1) * (last_y - first_y + 1) > len(self._cells):
+            # Large rectangles visit the occupied cells rather than every cell they cover
+            cells = [
+                items for (cell_x, cell_y), items in self._cells.items()
+                if first_x <= cell_x <= last_x and first_y <= cell_y <= last_y
+            ]
+        else:
+            cells = [
+                self._cells[(cell_x, cell_y)]
+                for cell_y in range(first_y, last_y + 1)
+                for cell_x in range(first_x, last_x + 1)
+                if (cell_x, cell_y) in self._cells
+            ]
+        positions = self._positions
+        return [
+            item_id for items in cells for item_id in items
+            if x0 <= positions[item_id][0] <= x1 and y0 <= positions[item_id][1] <= y1
+        ]
+
+    def query_radius(self, x, y, radius):
+        """
+        Returns the items within a distance of a position, nearest first.
+
+        Args:
+            x (float): The position's x coordinate.
+            y (float): The position's y coordinate.
+            radius (float): The maximum Euclidean distance.
+
+        Returns:
+            list: The IDs of the items within the radius.
+        """
+        limit = radius * radius
+        found = []
+        for item_id in self.query_rect(x - radius, y - radius, x + radius, y + radius):
+            item_x, item_y = self._positions[item_id]
+            distance = (item_x - x) ** 2 + (item_y - y) ** 2
+            if distance <= limit:
+                found.append((distance, item_id))
+        found.sort(key=lambda pair: pair[0])
+        return [item_id for _, item_id in found]
+
+    def nearest(self, x, y, k=1, max_radius=None):
+        """
+        Returns the k items nearest to a position.
+
+        Searches rings of grid cells outwards from the position and stops once no unvisited cell can
+        hold an item closer than the k-th nearest found so far.
+
+        Args:
+            x (float): The position's x coordinate.
+            y (float): The position's y coordinate.
+            k (int): The number of items to return.
+            max_radius (float, optional): Ignore items farther than this.
+
+        Returns:
+            list: Up to k item IDs, nearest first.
+        """
+        if k <= 0 or not self._positions:
+            return []
+        center_x, center_y = self._cell(x, y)
+        limit = math.inf if max_radius is None else max_radius * max_radius
+        best = []  # Max-heap of (-squared distance, insertion order, item ID) holding the k nearest so far
+        order = 0
+        visited = 0
+        ring = 0
+        while visited < len(self._positions):
+            if 8 * ring > len(self._cells):
+                # The rings have grown past the occupied cells; comparing every item is cheaper
+                return self._nearest_by_scan(x, y, k, limit)
+            for cell in self._ring_cells(center_x, center_y, ring):
+                items = self._cells.get(cell)
+                if not items:
+                    continue
+                visited += len(items)
+                for item_id in items:
+                    item_x, item_y = self._positions[item_id]
+                    distance = (item_x - x) ** 2 + (item_y - y) ** 2
+                    if distance > limit:
+                        continue
+                    order += 1
+                    entry = (-distance, order, item_id)
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, entry)
+            # Anything in a farther ring is at least this far away
+            reach = (ring * self.cell_size) ** 2
+            if (len(best) == k and -best[0][0] <= reach) or reach > limit:
+                break
+            ring += 1
+        return [item_id for _, _, item_id in sorted(best, key=lambda entry: (-entry[0], entry[1]))]
+
+    def _nearest_by_scan(self, x, y, k, limit):
+        distances = []
+        for item_id, (item_x, item_y) in self._positions.items():
+            distance = (item_x - x) ** 2 + (item_y - y) ** 2
+            if distance <= limit:
+                distances.append((distance, item_id))
+        return [item_id for _, item_id in heapq.nsmallest(k, distances, key=lambda pair: pair[0])]
+
+    @staticmethod
+    def _ring_cells(center_x, center_y, ring):
+        if ring == 0:
+            yield center_x, center_y
+            return
+        for offset in range(-ring, ring + 1):
+            yield center_x + offset, center_y - ring
+            yield center_x + offset, center_y + ring
+        for offset in range(-ring + 1, ring):
+            yield center_x - ring, center_y + offset
+            yield center_x + ring, center_y + offset
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, item_id):
+        return item_id in self._positions
@@ -0,0 +1,105 @@
+# terrain_noise.py
+
+import numpy as np
+
+_UNIT_24 = np.float32(1.0 / (1 << 24))
+# Cells of noise computed per band of rows, sized so a band's float32 temporaries fit in L2 cache
+_BAND_CELLS = 1 << 16
+
+
+def _lattice_values(ix, iy, seed):
+    """
+    Hashes integer lattice coordinates to pseudo-random values in [0, 1).
+
+    The value at a lattice point depends only on (seed, ix, iy), so any window of the noise field can
+    be computed independently and neighbouring windows agree along their edges.
+
+    Args:
+        ix (np.ndarray): Lattice x coordinates, shape (1, n).
+        iy (np.ndarray): Lattice y coordinates, shape (m, 1).
+        seed (int): The noise seed.
+
+    Returns:
+        np.ndarray: An (m, n) float32 array.
+    """
+    with np.errstate(over='ignore'):
+        h = (ix.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+             ^ iy.astype(np.uint64) * np.uint64(0xC2B2AE3D27D4EB4F)
+             ^ np.uint64(seed & 0xFFFFFFFFFFFFFFFF) * np.uint64(0x165667B19E3779F9))
+        # SplitMix64 finalizer
+        h ^= h >> np.uint64(30)
+        h *= np.uint64(0xBF58476D1CE4E5B9)
+        h ^= h >> np.uint64(27)
+        h *= np.uint64(0x94D049BB133111EB)
+        h ^= h >> np.uint64(31)
+    return (h >> np.uint64(40)).astype(np.float32) * _UNIT_24
+
+
+def _smoothstep(t):
+    return t * t * (3 - 2 * t)
+
+
+def value_noise(x0, y0, width, height, seed, scale=16.0, octaves=3, persistence=0.5):
+    """
+    Computes a window of coherent (value) noise over absolute map coordinates.
+
+    Random values on an integer lattice are smoothly interpolated between lattice points, and several
+    octaves of increasing frequency are summed. Interpolation is done along x for the few lattice rows
+    the window touches and then along y for every cell, so the per-cell work is a handful of array
+    operations per octave.
+
+    Args:
+        x0 (int): Absolute x coordinate of the window's left column.
+        y0 (int): Absolute y coordinate of the window's top row.
+        width (int): Number of columns.
+        height (int): Number of rows.
+        seed (int): The noise seed.
+        scale (float): Size in cells of the coarsest features.
+        octaves (int): Number of detail layers.
+        persistence (float): Amplitude falloff per octave.
+
+    Returns:
+        np.ndarray: A (height, width) float32 array of values in [0, 1).
+    """
+    if width <= 0 or height <= 0:
+        return np.zeros((max(height, 0), max(width, 0)), dtype=np.float32)
+    amplitudes = [persistence ** octave for octave in range(octaves)]
+    xs = np.arange(x0, x0 + width, dtype=np.float64)
+    ys = np.arange(y0, y0 + height, dtype=np.float64)
+    layers = []
+    for octave in range(octaves):
+        frequency = (2 ** octave) / scale
+        fx = xs * frequency
+        fy = ys * frequency
+        ix = np.floor(fx).astype(np.int64)
+        iy = np.floor(fy).astype(np.int64)
+        sx = _smoothstep((fx - ix).astype(np.float32))
+        sy = _smoothstep((fy - iy).astype(np.float32))[:, None]
+
+        # Lattice values covering the window, then interpolated along x for each lattice row. np.take
+        # keeps the rows C-ordered (lattice[:, column] would not), so gathering whole rows below is a
+        # contiguous copy. The octave's normalized amplitude is applied to these few rows, not every cell.
+        lattice_x = np.arange(ix[0], ix[-1] + 2, dtype=np.int64)[None, :]
+        lattice_y = np.arange(iy[0], iy[-1] + 2, dtype=np.int64)[:, None]
+        lattice = _lattice_values(lattice_x, lattice_y, seed + octave * 1013)
+        column = ix - ix[0]
+        rows = np.take(lattice, column, axis=1) * (1 - sx) + np.take(lattice, column + 1, axis=1) * sx
+        rows *= np.float32(amplitudes[octave] / sum(amplitudes))
+        layers.append((rows, rows[1:] - rows[:-1], iy - iy[0], sy))
+
+    # Along y, each cell is its upper row plus sy times the step to the lower row. The window is
+    # filled a band of rows at a time so the temporaries stay in cache.
+    total = np.empty((height, width), dtype=np.float32)
+    band = max(1, _BAND_CELLS // width)
+    for start in range(0, height, band):
+        window = total[start:start + band]
+        for octave, (rows, steps, row, sy) in enumerate(layers):
+            lattice_rows = row[start:start + band]
+            step = steps[lattice_rows]
+            step *= sy[start:start + band]
+            if octave == 0:
+                np.add(rows[lattice_rows], step, out=window)
+            else:
+                window += rows[lattice_rows]
+                window += step
+    return total
@@ -0,0 +1,260 @@
+# visibility.py
+
+from collections import OrderedDict
+
+import numpy as np
+
+# Bytes of working memory per ray step of one observer: an int64 cell index and its float32 transmittance
+_BYTES_PER_RAY_STEP = 12
+
+
+class _RayTemplate:
+    """
+    The cells crossed by the straight lines from an observer to every cell within a radius, stored as
+    offsets so they can be reused for any observer position.
+    """
+
+    def __init__(self, radius):
+        offsets = np.arange(-radius, radius + 1)
+        dy, dx = np.meshgrid(offsets, offsets, indexing='ij')
+        dx, dy = dx.ravel(), dy.ravel()
+        length = np.maximum(np.abs(dx), np.abs(dy))
+        steps = np.arange(1, max(radius, 2))
+        # Cells strictly between the observer and the target; shorter rays are padded
+        self.valid = steps[None, :] < length[:, None]
+        fraction = np.where(self.valid, steps[None, :] / np.maximum(length, 1)[:, None], 0.0)
+        self.step_x = np.rint(dx[:, None] * fraction).astype(np.int64)
+        self.step_y = np.rint(dy[:, None] * fraction).astype(np.int64)
+        self.dx = dx
+        self.dy = dy
+        self.in_range = dx * dx + dy * dy <= radius * radius
+
+
+class VisibilityEngine:
+    """
+    Computes field-of-view masks for many observers at once on a MapSchema.
+
+    Each cell's `visibility` property is the fraction of light passing through it (1 is clear, 0 is
+    opaque). A target cell is visible when the product of the visibility of the cells between the
+    observer and the target stays at or above `min_transmittance`. Rays to every cell in range are
+    precomputed per radius, so a batch of observers is evaluated with a few array gathers and sums.
+
+    Masks are cached per (x, y, radius) observer state and dropped when terrain inside their window
+    changes; an observer that moves simply looks up its new state.
+    """
+
+    def __init__(self, map_schema, min_transmittance=0.3, max_cached=4096, batch_size=256,
+                 max_chunk_bytes=32 * 1024 * 1024):
+        """
+        Initializes the VisibilityEngine and subscribes it to the map's terrain changes.
+
+        Args:
+            map_schema (MapSchema): The map to compute visibility on.
+            min_transmittance (float): Minimum fraction of light that must reach a cell for it to be seen.
+            max_cached (int): Maximum number of cached masks, least recently used dropped first.
+            batch_size (int): Maximum number of observers evaluated per array operation.
+            max_chunk_bytes (int): Working memory allowed per array operation. The number of ray steps
+                per observer grows with the cube of the radius, so large radii are evaluated in
+                smaller chunks.
+        """
+        self.map = map_schema
+        self.min_transmittance = min_transmittance
+        self.max_cached = max_cached
+        self.batch_size = batch_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self._templates = {}
+        self._cache = OrderedDict()  # (x, y, radius) -> bool mask of shape (2 * radius + 1, 2 * radius + 1)
+        self._padded = {}  # Radius -> (flat log-transmittance grid, flat in-map grid), rebuilt after terrain changes
+        self.hits = 0
+        self.misses = 0
+        map_schema.add_terrain_listener(self._on_terrain_changed)
+
+    def close(self):
+        """
+        Stops following the map's terrain changes.
+        """
+        self.map.remove_terrain_listener(self._on_terrain_changed)
+
+    def _template(self, radius):
+        template = self._templates.get(radius)
+        if template is None:
+            template = self._templates[radius] = _RayTemplate(radius)
+        return template
+
+    def _chunk_size(self, radius):
+        """
+        Returns the number of observers with a radius evaluated per array operation, keeping the
+        working memory of each chunk within max_chunk_bytes.
+        """
+        per_observer = self._template(radius).valid.size * _BYTES_PER_RAY_STEP
+        return int(max(1, min(self.batch_size, self.max_chunk_bytes // per_observer)))
+
+    def _padded_grids(self, radius):
+        """
+        Returns the map's log transmittance and in-map flags, padded by `radius` cells of opaque,
+        off-map border and flattened. The last element is a neutral entry used by padded ray steps.
+        """
+        grids = self._padded.get(radius)
+        if grids is None:
+            height, width = self.map.height, self.map.width
+            log_transmittance = np.full((height + 2 * radius, width + 2 * radius), -np.inf, dtype=np.float32)
+            with np.errstate(divide='ignore'):
+                log_transmittance[radius:radius + height, radius:radius + width] = np.log(
+                    np.clip(self.map.visibility_grid(), 0.0, 1.0)
+                )
+            in_map = np.zeros(log_transmittance.shape, dtype=bool)
+            in_map[radius:radius + height, radius:radius + width] = True
+            grids = self._padded[radius] = (
+                np.append(log_transmittance.ravel(), np.float32(0.0)),
+                in_map.ravel()
+            )
+        return grids
+
+    def compute(self, observers):
+        """
+        Returns the field-of-view mask of each observer.
+
+        Args:
+            observers (list): (x, y, radius) tuples. Observers must stand on the map.
+
+        Returns:
+            list: For each observer, a read-only (2 * radius + 1, 2 * radius + 1) boolean array centred on it;
+                mask[dy + radius, dx + radius] tells whether cell (x + dx, y + dy) is visible.
+        """
+        results = [None] * len(observers)
+        pending = {}  # Radius -> [(position in results, observer)]
+        for position, observer in enumerate(observers):
+            key = (int(observer[0]), int(observer[1]), int(observer[2]))
+            mask = self._cache.get(key)
+            if mask is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                results[position] = mask
+            else:
+                pending.setdefault(key[2], []).append((position, key))
+
+        for radius, batch in pending.items():
+            self.misses += len(batch)
+            chunk_size = self._chunk_size(radius)
+            for start in range(0, len(batch), chunk_size):
+                chunk = batch[start:start + chunk_size]
+                masks = self._compute_batch([key for _, key in chunk], radius)
+                for (position, key), mask in zip(chunk, masks):
+                    results[position] = mask
+                    self._cache[key] = mask
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+        return results
+
+    def _compute_batch(self, observers, radius):
+        template = self._template(radius)
+        log_transmittance, in_map = self._padded_grids(radius)
+        padded_width = self.map.width + 2 * radius
+        sentinel = len(log_transmittance) - 1
+
+        xs = np.array([x for x, _, _ in observers], dtype=np.int64) + radius
+        ys = np.array([y for _, y, _ in observers], dtype=np.int64) + radius
+        base = ys * padded_width + xs
+
+        # Built in place, so a chunk holds one index array and one gathered array
+        steps = base[:, None, None] + (template.step_y * padded_width + template.step_x)
+        np.copyto(steps, sentinel, where=~template.valid)
+        transmitted = log_transmittance[steps].sum(axis=2) >= np.float32(np.log(self.min_transmittance))
+
+        targets = base[:, None] + template.dy * padded_width + template.dx
+        visible = transmitted & template.in_range & in_map[targets]
+        size = 2 * radius + 1
+        visible = visible.reshape(len(observers), size, size)
+        visible.setflags(write=False)  # Masks are shared through the cache
+        return list(visible)
+
+    def visible_mask(self, x, y, radius):
+        """
+        Returns the field-of-view mask of a single observer (see `compute`).
+        """
+        return self.compute([(x, y, radius)])[0]
+
+    def can_see(self, observer, x, y):
+        """
+        Returns whether an (x, y, radius) observer can see a cell.
+        """
+        observer_x, observer_y, radius = observer
+        dx, dy = x - observer_x, y - observer_y
+        if abs(dx) > radius or abs(dy) > radius:
+            return False
+        return bool(self.visible_mask(observer_x, observer_y, radius)[dy + radius, dx + radius])
+
+    def coverage(self, observers):
+        """
+        Returns every cell of the map seen by at least one observer.
+
+        Args:
+            observers (list): (x, y, radius) tuples.
+
+        Returns:
+            np.ndarray: A (height, width) boolean array.
+        """
+        seen = np.zeros((self.map.height, self.map.width), dtype=bool)
+        for (x, y, radius), mask in zip(observers, self.compute(observers)):
+            top, left = y - radius, x - radius
+            clip_top, clip_left = max(top, 0), max(left, 0)
+            clip_bottom = min(y + radius + 1, self.map.height)
+            clip_right = min(x + radius + 1, self.map.width)
+            seen[clip_top:clip_bottom, clip_left:clip_right] |= mask[
+                clip_top - top:clip_bottom - top, clip_left - left:clip_right - left
+            ]
+        return seen
+
+    def elements_detecting(self, x, y):
+        """
+        Returns the dynamic elements whose detection_range covers a position and that have a line of
+        sight to it.
+
+        Args:
+            x (int): The position's x coordinate.
+            y (int): The position's y coordinate.
+
+        Returns:
+            list: The detecting element dicts, nearest first.
+        """
+        candidates = self.map.find_detecting(x, y)
+        observers = [
+            (element['x'], element['y'], int(np.ceil(element['properties']['detection_range'])))
+            for element in candidates
+        ]
+        masks = self.compute(observers)
+        return [
+            element for element, (observer_x, observer_y, radius), mask in zip(candidates, observers, masks)
+            if mask[y - observer_y + radius, x - observer_x + radius]
+        ]
+
+    def _on_terrain_changed(self, cells):
+        self._padded.clear()
+        if cells is None:
+            self._cache.clear()
+            return
+        cells = list(cells)
+        if not cells:
+            return
+        # A mask is stale if a changed cell lies within its radius. Test each key against the changed
+        # cells' bounding box first, and only the few keys overlapping it against every cell.
+        xs = [x for x, _ in cells]
+        ys = [y for _, y in cells]
+        x_min, x_max, y_min, y_max = min(xs), max(xs), min(ys), max(ys)
+        stale = [
+            key for key in self._cache
+            if x_min - key[2] <= key[0] <= x_max + key[2] and y_min - key[2] <= key[1] <= y_max + key[2]
+            and (len(cells) == 1
+                 or any(abs(x - key[0]) <= key[2] and abs(y - key[1]) <= key[2] for x, y in cells))
+        ]
+        for key in stale:
+            del self._cache[key]
+
+    def stats(self):
+        """
+        Returns cache statistics.
+
+        Returns:
+            dict: Cached mask count, hits and misses.
+        """
+        return {"cached": len(self._cache), "hits": self.hits, "misses": self.misses}
@@ -24,6 +24,10 @@ class Location:
         self.items = items or []
 
 from core.data_management.map_manager import MapSchema, generate_map
+from core.data_management.chunked_map import ChunkedMap
+from core.data_management.pathfinding import Pathfinder
+from core.data_management.location_graph import LocationGraph
+from core.data_management.world_state import WorldState
 from core.data_management.character_manager import Character
 
 class WorldManager:
@@ -34,7 +38,13 @@ class WorldManager:
     def __init__(self, world_data: dict):
         """Initializes the WorldManager with world data."""
         self.world = self._create_world_from_data(world_data)
+        self.location_graph = LocationGraph(self.world.locations)
+        self.state = WorldState({
+            (name, "location_description"): location.description
+            for name, location in self.world.locations.items()
+        })
         self.current_map = None  # To hold the current active map
+        self._pathfinder = None  # Pathfinder for current_map, created on first use
 
     def _create_world_from_data(self, world_data: dict) -> World:
         """Creates a World object from the provided data."""
@@ -53,16 +63,81 @@ class WorldManager:
         """Retrieves details about a specific location."""
         return self.world.locations.get(location_name)
 
-    def move_player(self, player: Character, new_location_name: str):
-        """Moves the player to a new location."""
+    def snapshot(self):
+        """
+        Returns an immutable snapshot of the world state. Readers, e.g. concurrent narrative
+        generations, see a consistent version while writers keep changing the live state.
+        """
+        return self.state.snapshot()
+
+    def get_world_state(self, location_name: str, snapshot=None):
+        """
+        Returns the world state as seen from a location: its own keys (such as "location_description")
+        over the world-wide ones.
+
+        Args:
+            location_name (str): The location.
+            snapshot (WorldSnapshot, optional): The version to read. The current one if omitted.
+
+        Returns:
+            LocationState: A read-only mapping; its `version` identifies the snapshot it reads.
+        """
+        return (snapshot or self.state.snapshot()).at_location(location_name)
+
+    def set_state(self, key, value, location_name: str = None) -> int:
+        """
+        Sets a world state value, world-wide or for one location, and returns the new state version.
+        Values must not be changed in place afterwards; set a new value instead.
+        """
+        return self.state.set(key if location_name is None else (location_name, key), value)
+
+    def update_state(self, changes: dict, location_name: str = None) -> int:
+        """
+        Sets several world state values as one change and returns the new state version.
+        """
+        if location_name is not None:
+            changes = {(location_name, key): value for key, value in changes.items()}
+        return self.state.update(changes)
+
+    def move_player(self, player: Character, new_location_name: str) -> bool:
+        """
+        Moves the player to a new location. A player already at a location can only move to a
+        location connected to it.
+
+        Returns:
+            bool: True if the player moved.
+        """
         new_location = self.get_location_details(new_location_name)
-        if new_location:
-            player.location = new_location  # Assuming Character class has a 'location' attribute
-            print(f"{player.name} has moved to {new_location.name}.")  # Placeholder for narrative 
-        else:
+        if not new_location:
             print(f"Error: Location '{new_location_name}' not found.")
+            return False
+        current = getattr(player.location, "name", player.location)
+        if current in self.location_graph and not self.location_graph.is_connected(current, new_location_name):
+            print(f"Error: '{new_location_name}' cannot be reached directly from '{current}'.")
+            return False
+        player.location = new_location  # Assuming Character class has a 'location' attribute
+        print(f"{player.name} has moved to {new_location.name}.")  # Placeholder for narrative
+        return True
+
+    def get_distance(self, origin: str, destination: str):
+        """
+        Returns the number of moves between two locations, or None if there is no route.
+        """
+        return self.location_graph.distance(origin, destination)
+
+    def get_route(self, origin: str, destination: str):
+        """
+        Returns a shortest route between two locations as a list of names, or None if there is no route.
+        """
+        return self.location_graph.route(origin, destination)
+
+    def is_reachable(self, origin: str, destination: str) -> bool:
+        """
+        Returns whether there is any route from one location to another.
+        """
+        return self.location_graph.is_reachable(origin, destination)
 
-    def generate_new_map(self, name: str, width: int, height: int, narrative_context: dict):
+    def generate_new_map(self, name: str, width: int, height: int, narrative_context: dict, seed: int = None):
         """
         Generates a new map based on narrative context and player actions.
 
@@ -71,13 +146,81 @@ class WorldManager:
             width (int): Width of the map.
             height (int): Height of the map.
             narrative_context (dict): Information about the current narrative phase, player actions, etc.
+            seed (int, optional): Seed for reproducing the same map. Random if omitted.
 
         Returns:
             MapSchema: The generated map object.
         """
-        self.current_map = generate_map(name, width, height, narrative_context)
+        self.current_map = generate_map(name, width, height, narrative_context, seed=seed)
         print(f"New map '{name}' generated with dimensions {width}x{height}.")  # Placeholder for debug output
         return self.current_map
 
+    def generate_chunked_map(self, name: str, seed: int = None, chunk_size: int = 64,
+                             memory_limit: int = 16 * 1024 * 1024) -> ChunkedMap:
+        """
+        Creates an unbounded map whose terrain is generated chunk by chunk as it is explored.
+
+        Args:
+            name (str): Name of the new map.
+            seed (int, optional): Seed for reproducing the same terrain. Random if omitted.
+            chunk_size (int): Width and height of a chunk in cells.
+            memory_limit (int): Maximum bytes of terrain kept cached; older chunks are regenerated on demand.
+
+        Returns:
+            ChunkedMap: The new map, which becomes the current map.
+        """
+        self.current_map = ChunkedMap(name, seed=seed, chunk_size=chunk_size, memory_limit=memory_limit)
+        return self.current_map
+
+    def get_terrain_around(self, x: int, y: int, radius: int):
+        """
+        Returns the terrain codes of the square of cells centred on a position in the current map.
+        Look up a code's type and properties with `current_map.terrain_cell(code)`.
+
+        Args:
+            x (int): The position's column.
+            y (int): The position's row.
+            radius (int): Number of cells to include on each side of the position.
+
+        Returns:
+            np.ndarray: A (2 * radius + 1, 2 * radius + 1) uint8 array. Cells beyond the edge of a
+                bounded map are EMPTY_TERRAIN (0).
+
+        Raises:
+            ValueError: If there is no current map.
+        """
+        if self.current_map is None:
+            raise ValueError("No map has been generated.")
+        size = 2 * radius + 1
+        return self.current_map.terrain_window(x - radius, y - radius, size, size)
+
+    def get_pathfinder(self) -> Pathfinder:
+        """
+        Returns the pathfinder for the current map, creating it on first use or after the map changes.
+
+        Raises:
+            ValueError: If there is no current bounded map to search.
+        """
+        if not isinstance(self.current_map, MapSchema):
+            raise ValueError("Pathfinding needs a generated map.")
+        if self._pathfinder is None or self._pathfinder.map is not self.current_map:
+            if self._pathfinder is not None:
+                self._pathfinder.close()
+            self._pathfinder = Pathfinder(self.current_map)
+        return self._pathfinder
+
+    def find_path(self, start, goal):
+        """
+        Finds a cheapest path between two cells of the current map, honouring terrain movement costs.
+
+        Args:
+            start (tuple): The (x, y) start cell.
+            goal (tuple): The (x, y) goal cell.
+
+        Returns:
+            list: The (x, y) cells from start to goal inclusive, or None if the goal cannot be reached.
+        """
+        return self.get_pathfinder().find_path(start, goal)
+
     # Additional world manipulation methods can be added here
     # These should be implemented based on the specific needs of the game
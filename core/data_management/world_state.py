@@ -0,0 +1,427 @@
+# world_state.py
+
+import threading
+from collections.abc import Mapping
+
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+_LEVELS = 3
+_REMOVE = object()
+
+
+class PersistentMap(Mapping):
+    """
+    An immutable mapping whose updates return a new map sharing everything they did not change.
+
+    Keys are spread by hash over a fixed-depth trie of 32-way tuples with small dicts as leaves. An
+    update copies only the path from the root to each changed leaf, so it costs a few dozen pointer
+    copies regardless of the map's size, and old versions stay valid and unchanged.
+    """
+
+    __slots__ = ('_root', '_size')
+
+    def __init__(self, items=None):
+        self._root = None
+        self._size = 0
+        if items:
+            updated = self.update(items)
+            self._root, self._size = updated._root, updated._size
+
+    @classmethod
+    def _from(cls, root, size):
+        new = cls.__new__(cls)
+        new._root = root
+        new._size = size
+        return new
+
+    @staticmethod
+    def _path(key):
+        key_hash = hash(key)
+        return tuple((key_hash >> (_BITS * level)) & _MASK for level in range(_LEVELS))
+
+    def _leaf(self, key):
+        node = self._root
+        for index in self._path(key):
+            if node is None:
+                return None
+            node = node[index]
+        return node
+
+    def __getitem__(self, key):
+        leaf = self._leaf(key)
+        if leaf is None or key not in leaf:
+            raise KeyError(key)
+        return leaf[key]
+
+    def __contains__(self, key):
+        leaf = self._leaf(key)
+        return leaf is not None and key in leaf
+
+    def __iter__(self):
+        stack = [(self._root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if node is None:
+                continue
+            if depth == _LEVELS:
+                yield from node
+            else:
+                stack.extend((child, depth + 1) for child in reversed(node))
+
+    def __len__(self):
+        return self._size
+
+    def __repr__(self):
+        return f"PersistentMap({dict(self.items())!r})"
+
+    def _apply(self, changes):
+        """
+        Returns a new map with (key, value) changes applied, where a value of _REMOVE deletes the key.
+        Each changed path is copied once, however many of the changes fall on it.
+        """
+        size = self._size
+
+        def build(node, depth, group):
+            nonlocal size
+            if depth == _LEVELS:
+                leaf = dict(node) if node else {}
+                for _, key, value in group:
+                    if value is _REMOVE:
+                        if key in leaf:
+                            del leaf[key]
+                            size -= 1
+                    else:
+                        size += key not in leaf
+                        leaf[key] = value
+                return leaf or None
+            children = list(node) if node else [None] * _WIDTH
+            by_index = {}
+            for change in group:
+                by_index.setdefault(change[0][depth], []).append(change)
+            for index, subgroup in by_index.items():
+                children[index] = build(children[index], depth + 1, subgroup)
+            return tuple(children) if any(child is not None for child in children) else None
+
+        root = build(self._root, 0, [(self._path(key), key, value) for key, value in changes])
+        return PersistentMap._from(root, size)
+
+    def set(self, key, value):
+        """
+        Returns a new map with a key set to a value.
+        """
+        return self._apply([(key, value)])
+
+    def update(self, mapping):
+        """
+        Returns a new map with every key of a mapping (or iterable of pairs) set.
+        """
+        items = mapping.items() if isinstance(mapping, Mapping) else mapping
+        return self._apply(list(items))
+
+    def delete(self, key):
+        """
+        Returns a new map without a key.
+
+        Raises:
+            KeyError: If the key is not in the map.
+        """
+        if key not in self:
+            raise KeyError(key)
+        return self._apply([(key, _REMOVE)])
+
+
+class ChangeLog:
+    """
+    The keys changed by each version of a world state, so a reader that last looked at one version
+    can find what changed since in O(changed keys). Only the latest `limit` versions are kept.
+    """
+
+    def __init__(self, limit=4096):
+        self.limit = limit
+        # (version before the first entry, entries); entry i holds the keys changed by version start + i + 1.
+        # Replaced as a whole when trimmed, so readers always see a matching pair.
+        self.state = (0, [])
+
+    def append(self, keys):
+        start, entries = self.state
+        entries.append(keys)
+        if len(entries) > self.limit:
+            dropped = len(entries) // 2
+            self.state = (start + dropped, entries[dropped:])
+
+    def changed_between(self, old_version, new_version):
+        """
+        Returns the set of keys changed after old_version up to new_version, or None if the log no
+        longer reaches back to old_version. If old_version is the newer one, returns the keys changed
+        between the two, so a reader can also compare against an older version.
+        """
+        old_version, new_version = min(old_version, new_version), max(old_version, new_version)
+        start, entries = self.state
+        if old_version < start:
+            return None
+        changed = set()
+        for keys in entries[old_version - start:new_version - start]:
+            changed.update(keys)
+        return changed
+
+
+class TrackedWorldState(dict):
+    """
+    A plain dict world state that records which keys each change touched, for callers that keep
+    their world state in a dict. Every change to a key advances `version`; `changed_keys_since`
+    lists the keys changed after a version.
+    """
+
+    def __init__(self, *args, log_limit=4096, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+        self._log = ChangeLog(log_limit)
+
+    @property
+    def change_source(self):
+        """
+        Identifies whose versions `version` counts, so consumers can tell world states apart.
+        """
+        return self._log
+
+    def _changed(self, *keys):
+        self._log.append(keys)
+        self.version += 1
+
+    def changed_keys_since(self, version):
+        """
+        Returns the keys changed after a version, or None if that version is too old to tell.
+        """
+        return self._log.changed_between(version, self.version)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._changed(key)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed(key)
+
+    def update(self, *args, **kwargs):
+        changes = dict(*args, **kwargs)
+        super().update(changes)
+        if changes:
+            self._changed(*changes)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        present = key in self
+        value = super().pop(key, *default)
+        if present:
+            self._changed(key)
+        return value
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._changed(key)
+        return key, value
+
+    def clear(self):
+        keys = tuple(self)
+        super().clear()
+        if keys:
+            self._changed(*keys)
+
+
+class WorldSnapshot(Mapping):
+    """
+    An immutable, consistent view of the world state at one version.
+    """
+
+    __slots__ = ('version', '_map', '_log')
+
+    def __init__(self, version, state_map, log=None):
+        self.version = version
+        self._map = state_map
+        self._log = log
+
+    @property
+    def change_source(self):
+        """
+        Identifies the WorldState this snapshot came from, so consumers can tell world states apart.
+        """
+        return self._log
+
+    def changed_keys_since(self, version):
+        """
+        Returns the keys changed after a version up to this snapshot's, or None if that is unknown.
+        """
+        if self._log is None:
+            return None
+        return self._log.changed_between(version, self.version)
+
+    def __getitem__(self, key):
+        return self._map[key]
+
+    def __contains__(self, key):
+        return key in self._map
+
+    def __iter__(self):
+        return iter(self._map)
+
+    def __len__(self):
+        return len(self._map)
+
+    def at_location(self, location_name):
+        """
+        Returns the view of this snapshot seen from a location (see LocationState).
+        """
+        return LocationState(self, location_name)
+
+    def __repr__(self):
+        return f"<WorldSnapshot version={self.version}, keys={len(self._map)}>"
+
+
+class LocationState(Mapping):
+    """
+    The world state as seen from a location: keys stored for the location, as (location, key), hide
+    world-wide keys of the same name.
+    """
+
+    __slots__ = ('snapshot', 'location')
+
+    def __init__(self, snapshot, location):
+        self.snapshot = snapshot
+        self.location = location
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    @property
+    def change_source(self):
+        return self.snapshot.change_source, self.location
+
+    def changed_keys_since(self, version):
+        """
+        Returns the keys of this view changed after a version, or None if that is unknown.
+        """
+        changed = self.snapshot.changed_keys_since(version)
+        if changed is None:
+            return None
+        return {
+            key[1] if isinstance(key, tuple) else key
+            for key in changed
+            if isinstance(key, str) or (isinstance(key, tuple) and len(key) == 2 and key[0] == self.location)
+        }
+
+    def __getitem__(self, key):
+        state = self.snapshot._map
+        scoped = (self.location, key)
+        if scoped in state:
+            return state[scoped]
+        if isinstance(key, str):
+            return state[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        seen = set()
+        for key in self.snapshot:
+            if isinstance(key, tuple) and len(key) == 2 and key[0] == self.location:
+                key = key[1]
+            elif not isinstance(key, str):
+                continue
+            if key not in seen:
+                seen.add(key)
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"<LocationState location={self.location!r}, version={self.version}>"
+
+
+class WorldState:
+    """
+    The live world state, advanced by writers while readers work from snapshots.
+
+    Each write produces a new PersistentMap and version; `snapshot` hands out the current one in
+    O(1) without copying or locking, so any number of threads can read a consistent version while
+    writers keep going. Writers are serialized by a lock. Stored values must be treated as
+    immutable: replace a value rather than changing it in place, or snapshots will see the change.
+    """
+
+    def __init__(self, initial=None):
+        """
+        Initializes the WorldState.
+
+        Args:
+            initial (dict, optional): The starting keys and values.
+        """
+        self._log = ChangeLog()
+        self._head = WorldSnapshot(0, PersistentMap(initial), self._log)
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    @property
+    def version(self):
+        return self._head.version
+
+    def snapshot(self):
+        """
+        Returns the current state as an immutable WorldSnapshot.
+        """
+        return self._head
+
+    def get(self, key, default=None):
+        return self._head.get(key, default)
+
+    def subscribe(self, listener):
+        """
+        Registers a callable run after every write with the new version and the changed keys, e.g.
+        to discard work derived from older versions. Listeners run on the writing thread.
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
+
+    def _commit(self, change, keys):
+        with self._lock:
+            head = self._head
+            state_map = change(head._map)
+            self._log.append(keys)
+            self._head = WorldSnapshot(head.version + 1, state_map, self._log)
+            version = self._head.version
+        for listener in list(self._listeners):
+            listener(version, keys)
+        return version
+
+    def changed_keys_since(self, version):
+        """
+        Returns the keys changed after a version, or None if that version is too old to tell.
+        """
+        return self._head.changed_keys_since(version)
+
+    def set(self, key, value):
+        """
+        Sets a key and returns the new version.
+        """
+        return self._commit(lambda state_map: state_map.set(key, value), (key,))
+
+    def update(self, mapping):
+        """
+        Sets several keys as one change and returns the new version.
+        """
+        items = list(mapping.items() if isinstance(mapping, Mapping) else mapping)
+        return self._commit(lambda state_map: state_map.update(items), tuple(key for key, _ in items))
+
+    def delete(self, key):
+        """
+        Removes a key and returns the new version.
+
+        Raises:
+            KeyError: If the key is not set.
+        """
+        return self._commit(lambda state_map: state_map.delete(key), (key,))
@@ -63,3 +63,21 @@ class GameIntegrator:
         #   narrative_text = self.feedback_processor.process_feedback(analysis_results, player_action, advertiser_input)
 
         return narrative_text
+
+    async def handle_player_action_stream(self, player_action, narrative_context, advertiser_input):
+        """
+        Handles a player action and yields the corresponding narrative in chunks as it is generated,
+        so the game can start rendering before the whole passage is available.
+
+        Args:
+            player_action: The action taken by the player.
+            narrative_context: The context in which the action occurred within the narrative.
+            advertiser_input: The advertiser input related to the interaction.
+
+        Yields:
+            Successive chunks of the generated narrative text.
+        """
+        self.data_collector.collect_data(player_action, narrative_context, advertiser_input)
+
+        async for chunk in self.narrative_generator.stream_narrative(player_action, advertiser_input):
+            yield chunk
@@ -2,6 +2,8 @@
 
 import pygame
 
+from core.utils.text_processing import format_narrative
+
 class PygameIntegration:
     """
     Handles the integration of the narrative game with the Pygame library for display and input.
@@ -47,6 +49,38 @@ class PygameIntegration:
         """
         pygame.display.flip()
 
+    def display_narrative(self, text: str, line_width=80):
+        """
+        Clears the screen and displays a narrative passage, wrapped over several lines.
+
+        Args:
+            text: The narrative text to display.
+            line_width: The maximum number of characters per line.
+        """
+        self.clear_screen()
+        line_height = self.font.get_linesize()
+        for index, line in enumerate(format_narrative(text, line_width).split("\n")):
+            self.display_text(line, y_position=10 + index * line_height)
+        self.update_display()
+
+    async def display_narrative_stream(self, chunks, line_width=80) -> str:
+        """
+        Displays a narrative passage while it is being generated, redrawing as each chunk arrives.
+
+        Args:
+            chunks: An async iterator of narrative text chunks (e.g., NarrativeGenerator.stream_narrative).
+            line_width: The maximum number of characters per line.
+
+        Returns:
+            The complete narrative text.
+        """
+        text = ""
+        async for chunk in chunks:
+            text += chunk
+            self.display_narrative(text, line_width)
+            pygame.event.pump()  # Keep the window responsive while waiting for the next chunk
+        return text
+
     def handle_input(self) -> str:
         """
         Handles player input events in Pygame.
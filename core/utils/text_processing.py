@@ -48,3 +48,16 @@ def format_narrative(text: str, line_width: int = 80) -> str:
         lines.append(current_line.strip())
 
     return "\n".join(lines)
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates how many LLM tokens a text will use, counting each word and punctuation mark as one token.
+
+    Args:
+        text: The input text string.
+
+    Returns:
+        The estimated number of tokens.
+    """
+
+    return len(re.findall(r"\w+|[^\w\s]", text))
@@ -1,3 +1,5 @@
+import asyncio
+
 import pygame
 from narrative.generation.narrative_generator import NarrativeGenerator
 from narrative.generation.narrative_structuring import NarrativeStructuring
@@ -57,6 +59,7 @@ def main():
     # Game Initialization
     current_location = "forest"  # Starting location
     player_action = ""
+    loop = asyncio.new_event_loop()  # Drives streamed narrative generation between frames
 
     # Main Game Loop
     running = True
@@ -73,15 +76,18 @@ def main():
         # Generate Narrative
         if player_action:
             try:
-                narrative_text = narrative_generator.generate_narrative(player_action, current_location)
+                narrative_text = loop.run_until_complete(pygame_integration.display_narrative_stream(
+                    narrative_generator.stream_narrative(player_action, current_location)
+                ))
                 logger.info("Narrative Generated: %s", narrative_text)
-                pygame_integration.display_narrative(narrative_text)
             except Exception as e:
                 logger.error("Failed to generate narrative: %s", e)
 
         # Refresh the game display (Add any display update logic here)
         pygame.display.update()
 
+    loop.close()
+
 
 if __name__ == "__main__":
     try:
@@ -1,21 +1,49 @@
 from narrative.generation.PromptManager import PromptManager
+from narrative.generation.llm_cache import LLMResponseCache
+from narrative.generation.llm_client import LLMClient, SyncLLMClient
+from narrative.generation.single_flight import SingleFlight
 
 class LLMIntegration:
     """
     Manages the interaction between the narrative generation system and the Large Language Model (LLM).
     Responsible for sending prompts to the LLM and retrieving the generated text.
+
+    All LLM requests run on one background event loop, whether they come from blocking callers or
+    from coroutines on other loops, so the client, the batcher and the sharing of identical in-flight
+    prompts never span event loops. The client and batcher passed in must not be used elsewhere.
     """
 
-    def __init__(self, narrative_structuring, context_manager):
+    def __init__(self, narrative_structuring, context_manager, llm_client=None, batcher=None, cache=None,
+                 model_params=None):
         """
         Initializes the LLMIntegration with dependencies on narrative structuring and context management.
 
         Args:
             narrative_structuring (NarrativeStructuring): Handles the structure of the narrative.
             context_manager (ContextManager): Tracks narrative context to inform prompt construction.
+            llm_client (LLMClient, optional): Asynchronous client used to reach the LLM. Defaults to a
+                pooled client for the configured endpoint. It is run on this integration's own loop.
+            batcher (MicroBatcher, optional): When given, prompts are coalesced into batched requests
+                through it instead of being sent one at a time.
+            cache (LLMResponseCache, optional): When given, responses are cached and repeated prompts skip the LLM.
+            model_params (dict, optional): Model parameters (e.g., temperature) sent with every prompt.
         """
         self.prompt_manager = PromptManager(narrative_structuring, context_manager)
         self.llm_endpoint = self._initialize_llm_endpoint()
+        self.llm_client = llm_client or LLMClient(self.llm_endpoint)
+        self.batcher = batcher
+        self.cache = cache
+        self.model_params = dict(model_params or {})
+        self.single_flight = SingleFlight()
+        self._sync_client = None
+
+    def _client_loop(self):
+        """
+        Returns the SyncLLMClient whose background event loop runs every LLM request, starting it on first use.
+        """
+        if self._sync_client is None:
+            self._sync_client = SyncLLMClient(self.llm_client)
+        return self._sync_client
 
     def _initialize_llm_endpoint(self):
         """
@@ -40,33 +68,230 @@ class LLMIntegration:
         Returns:
             str: The narrative text generated by the LLM.
         """
-        # Use the PromptManager to create a prompt for the LLM
-        prompt = self.prompt_manager.create_prompt(scenario, character, current_state)
+        # Use the PromptManager to create a prompt for the LLM, keeping the static lore preamble separate
+        prompt = self.prompt_manager.create_prompt_parts(scenario, character, current_state)
         
         # Send the prompt to the LLM and retrieve the generated narrative
-        narrative_text = self._send_prompt_to_llm(prompt)
+        narrative_text = self._send_prompt_to_llm(prompt.suffix, prefix=prompt.prefix)
         
         return narrative_text
 
-    def _send_prompt_to_llm(self, prompt):
+    async def generate_narrative_async(self, scenario, character, current_state, timeout=None):
+        """
+        Generates narrative text without blocking the event loop while the LLM responds.
+
+        Args:
+            scenario (str): The type of scenario (e.g., "dialogue", "action").
+            character (Character): The character involved in the scenario.
+            current_state (dict): The current state of the narrative, including location, recent actions, etc.
+            timeout (float, optional): Maximum time in seconds to wait for the LLM. Timing out does not
+                cancel the request for other callers waiting on the same prompt.
+
+        Returns:
+            str: The narrative text generated by the LLM.
+        """
+        prompt = self.prompt_manager.create_prompt_parts(scenario, character, current_state)
+        return await self._send_prompt_to_llm_async(prompt.suffix, timeout, prefix=prompt.prefix)
+
+    def generate_prompt(self, prompt):
+        """
+        Generates the LLM's response to a prompt built elsewhere, blocking until it arrives. Uses the
+        same cache and sharing of identical in-flight prompts as the other requests.
+
+        Args:
+            prompt (PromptParts): The prompt, split into its static prefix and per-turn suffix.
+
+        Returns:
+            str: The narrative text generated by the LLM.
+        """
+        return self._send_prompt_to_llm(prompt.suffix, prefix=prompt.prefix)
+
+    async def generate_prompt_async(self, prompt, timeout=None):
+        """
+        Generates the LLM's response to a prompt built elsewhere, through the same cache and sharing
+        of identical in-flight prompts as the other requests, on the integration's background loop.
+
+        Args:
+            prompt (PromptParts): The prompt, split into its static prefix and per-turn suffix.
+            timeout (float, optional): Maximum time in seconds to wait for the LLM.
+
+        Returns:
+            str: The narrative text generated by the LLM.
+        """
+        return await self._send_prompt_to_llm_async(prompt.suffix, timeout, prefix=prompt.prefix)
+
+    def has_idle_capacity(self, fraction):
+        """
+        Returns whether fewer than a fraction of the LLM client's in-flight slots are in use, e.g. to
+        start optional work only while real requests leave room for it.
+
+        Args:
+            fraction (float): The share of the client's in-flight slots that may be in use.
+
+        Returns:
+            bool: True if the client is below that share.
+        """
+        return self.llm_client.in_flight < fraction * self.llm_client.max_in_flight
+
+    async def stream_narrative(self, scenario, character, current_state):
+        """
+        Generates narrative text and yields it in chunks as the LLM produces it.
+
+        A cached response is yielded as a single chunk. A streamed response is cached once it has been
+        received in full; a stream abandoned part-way is not cached.
+
+        Args:
+            scenario (str): The type of scenario (e.g., "dialogue", "action").
+            character (Character): The character involved in the scenario.
+            current_state (dict): The current state of the narrative, including location, recent actions, etc.
+
+        Yields:
+            str: Successive chunks of the narrative text.
+        """
+        prompt = self.prompt_manager.create_prompt_parts(scenario, character, current_state)
+        async for chunk in self.stream_prompt(prompt):
+            yield chunk
+
+    async def stream_prompt(self, prompt):
+        """
+        Streams the LLM's response to a prompt built elsewhere, through the same cache as the other
+        requests: a cached response is yielded as a single chunk, and a streamed response is cached
+        once it has been received in full.
+
+        Args:
+            prompt (PromptParts): The prompt, split into its static prefix and per-turn suffix.
+
+        Yields:
+            str: Successive chunks of the narrative text.
+        """
+        params = self._request_params(prompt.prefix)
+        key = LLMResponseCache.make_key(prompt.suffix, **params)
+        if self.cache is not None:
+            narrative_text = self.cache.get(key)
+            if narrative_text is not None:
+                yield narrative_text
+                return
+
+        chunks = []
+        async for chunk in self._client_loop().relay(self.llm_client.stream(prompt.suffix, **params)):
+            chunks.append(chunk)
+            yield chunk
+        if self.cache is not None:
+            self.cache.set(key, "".join(chunks))
+
+    def _request_params(self, prefix=None):
+        """
+        Returns the parameters sent with a prompt. A static prompt prefix travels as its own "prefix"
+        field so that prefix-caching backends can reuse its processed state across requests.
+
+        Args:
+            prefix (str, optional): The static part of the prompt preceding it.
+
+        Returns:
+            dict: The model parameters, plus the prefix if one was given.
+        """
+        if not prefix:
+            return self.model_params
+        return dict(self.model_params, prefix=prefix)
+
+    def _send_prompt_to_llm(self, prompt, prefix=None):
         """
-        Sends the generated prompt to the LLM and retrieves the response.
+        Sends the generated prompt to the LLM and retrieves the response, blocking until it arrives.
 
         Args:
             prompt (str): The prompt generated by the PromptManager.
+            prefix (str, optional): A static prompt prefix sent separately for prefix caching.
 
         Returns:
             str: The narrative text generated by the LLM.
         """
-        # This is a placeholder for the actual API call or integration logic
-        # You would typically use requests or another HTTP client to send the prompt
-        # For example:
-        # response = requests.post(self.llm_endpoint, json={"prompt": prompt})
-        # return response.json().get('text', '')
+        params = self._request_params(prefix)
+        key = LLMResponseCache.make_key(prompt, **params)
+        if self.cache is not None:
+            # Answer cache hits on the calling thread instead of handing them to the client loop
+            narrative_text = self.cache.get(key)
+            if narrative_text is not None:
+                return narrative_text
+        return self._client_loop().run(self._fetch_shared(key, prompt, params))
 
-        # Mock LLM response for demonstration purposes
-        mock_response = f"LLM response based on prompt: {prompt}"
-        return mock_response
+    async def _send_prompt_to_llm_async(self, prompt, timeout=None, prefix=None):
+        """
+        Sends the generated prompt to the LLM over the pooled asynchronous client, awaiting the request
+        on the integration's background loop. Cached responses are returned without contacting the LLM,
+        and identical prompts already in flight share one request.
+
+        Args:
+            prompt (str): The prompt generated by the PromptManager.
+            timeout (float, optional): Maximum time in seconds this caller waits for the response.
+            prefix (str, optional): A static prompt prefix sent separately for prefix caching.
+
+        Returns:
+            str: The narrative text generated by the LLM.
+        """
+        params = self._request_params(prefix)
+        key = LLMResponseCache.make_key(prompt, **params)
+        if self.cache is not None:
+            narrative_text = self.cache.get(key)
+            if narrative_text is not None:
+                return narrative_text
+        return await self._client_loop().run_async(self._fetch_shared(key, prompt, params, timeout))
+
+    async def _fetch_shared(self, key, prompt, params, timeout=None):
+        """
+        Joins the request already in flight for an identical prompt, or starts one. Runs on the
+        integration's background loop.
+
+        Args:
+            key (str): The content hash of the prompt and model parameters.
+            prompt (str): The prompt to send.
+            params (dict): Model parameters sent with the prompt.
+            timeout (float, optional): Maximum time in seconds this caller waits for the response.
+
+        Returns:
+            str: The narrative text generated by the LLM.
+        """
+        return await self.single_flight.do(key, lambda: self._fetch_and_cache(key, prompt, params), timeout)
+
+    async def _fetch_and_cache(self, key, prompt, params):
+        """
+        Sends a prompt to the LLM and caches the response when a cache is configured.
+
+        Args:
+            key (str): The content hash of the prompt and model parameters.
+            prompt (str): The prompt to send.
+            params (dict): Model parameters sent with the prompt.
+
+        Returns:
+            str: The narrative text generated by the LLM.
+        """
+        narrative_text = await self._dispatch_prompt(prompt, params)
+        if self.cache is not None:
+            self.cache.set(key, narrative_text)
+        return narrative_text
+
+    async def _dispatch_prompt(self, prompt, params):
+        """
+        Sends a prompt to the LLM, batching it with concurrent prompts when a batcher is configured.
+        Prompts sharing a prefix are batched together, since the batcher groups them by parameters.
+
+        Args:
+            prompt (str): The prompt to send.
+            params (dict): Model parameters sent with the prompt.
+
+        Returns:
+            str: The narrative text generated by the LLM.
+        """
+        if self.batcher is not None:
+            return await self.batcher.submit(prompt, **params)
+        return await self.llm_client.generate(prompt, **params)
+
+    def close(self):
+        """
+        Releases the connections held by the LLM client and stops the background loop.
+        """
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
 
     def adapt_prompt(self, base_prompt, tone=None, urgency=None):
         """
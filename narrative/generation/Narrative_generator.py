@@ -1,7 +1,10 @@
+import json
+
 from narrative.generation.narrative_structuring import NarrativeStructuring
 from core.data_management.character_manager import CharacterManager
 from core.data_management.world_manager import WorldManager
 from narrative.generation.PromptManager import PromptManager
+from narrative.generation.speculation import SpeculativeGenerator
 from narrative.lore.lore import Lore
 
 class NarrativeGenerator:
@@ -10,7 +13,8 @@ class NarrativeGenerator:
     Integrates with the Prompt Manager, LLM, and Lore to maintain narrative consistency.
     """
 
-    def __init__(self, narrative_structuring: NarrativeStructuring, character_manager: CharacterManager, world_manager: WorldManager):
+    def __init__(self, narrative_structuring: NarrativeStructuring, character_manager: CharacterManager, world_manager: WorldManager,
+                 llm_integration=None, speculator: SpeculativeGenerator = None, token_budget=None, lore_index=None):
         """
         Initializes the NarrativeGenerator with required managers and structuring tools.
 
@@ -18,12 +22,31 @@ class NarrativeGenerator:
             narrative_structuring (NarrativeStructuring): Handles the structure of the narrative.
             character_manager (CharacterManager): Manages characters in the narrative.
             world_manager (WorldManager): Manages the game world state and environment.
+            llm_integration (LLMIntegration, optional): Generates and streams narrative from the LLM,
+                answering repeated prompts from its response cache. Without one, both yield the
+                placeholder narrative.
+            speculator (SpeculativeGenerator, optional): Pre-generates narrative for the branching paths
+                predicted after each streamed turn. Requests carrying a session ID check it first. A write
+                to the world manager's state discards the pending speculations for the locations whose
+                view of the state it changes.
+            token_budget (int, optional): Maximum number of tokens per prompt; lower-ranked context is
+                dropped to stay within it. No limit if omitted.
+            lore_index (LoreIndex, optional): Retrieves only the lore relevant to each action and location
+                for its prompt instead of including every world rule.
         """
         self.narrative_structuring = narrative_structuring
         self.character_manager = character_manager
         self.world_manager = world_manager
+        self.llm_integration = llm_integration
+        self.speculator = speculator
         self.lore = Lore()  # Initialize the Lore class to access world and character information
-        self.prompt_manager = PromptManager(narrative_structuring, self.get_context_manager())
+        self.prompt_manager = PromptManager(narrative_structuring, self.get_context_manager(), token_budget=token_budget,
+                                            lore_index=lore_index)
+        self._location_versions = {}  # change_source -> version the location's fingerprint stands for
+        world_state = getattr(world_manager, "state", None)
+        if speculator is not None and hasattr(world_state, "subscribe"):
+            # A write that changes a location's view makes its speculations stale, so cancel them early
+            world_state.subscribe(self._on_world_state_change)
 
     def get_context_manager(self):
         """
@@ -40,13 +63,15 @@ class NarrativeGenerator:
             "current_emotions": {}
         }
 
-    def generate_narrative(self, player_action, current_location):
+    def generate_narrative(self, player_action, current_location, session_id=None):
         """
         Generates the narrative text based on player action and current location.
 
         Args:
             player_action (str): The action performed by the player.
             current_location (str): The current location of the player in the game world.
+            session_id (hashable, optional): Identifies the player session, used to serve narrative
+                pre-generated for this action.
 
         Returns:
             str: The generated narrative text.
@@ -54,34 +79,20 @@ class NarrativeGenerator:
         try:
             self._validate_input(player_action, current_location)
 
-            # Retrieve the relevant data based on player action and location
-            characters = self.character_manager.get_characters_in_location(current_location)
-            world_state = self.world_manager.get_world_state(current_location)
-
-            # Retrieve relevant lore information for consistency
-            world_rules = self.lore.get_world_rules()
-            character_backstories = {
-                character.name: self.lore.get_character_backstory(character.name)
-                for character in characters
-            }
-
-            # Generate a narrative structure (e.g., setup, conflict, resolution)
-            narrative_structure = self.narrative_structuring.create_structure(player_action, characters, world_state)
-
-            # Use the PromptManager to create a prompt for the LLM or narrative engine
-            main_character = self.character_manager.get_main_character()
-            current_state = {
-                "location": current_location,
-                "action_description": player_action,
-                "characters": characters,
-                "world_state": world_state,
-                "world_rules": world_rules,
-                "character_backstories": character_backstories
-            }
-            prompt = self.prompt_manager.create_prompt("action", main_character, current_state)
-
-            # Use the generated prompt in the narrative process (e.g., sending it to an LLM)
-            narrative_text = self._generate_narrative_from_prompt(prompt)
+            if self.speculator is not None and session_id is not None:
+                narrative_text = self.speculator.take(
+                    session_id, player_action, current_location, self._world_fingerprint(current_location)
+                )
+                if narrative_text is not None:
+                    return narrative_text
+
+            prompt, _ = self._build_prompt(player_action, current_location)
+
+            # Send the prompt to the LLM, through the same cache as streamed requests
+            if self.llm_integration is None:
+                narrative_text = self._generate_narrative_from_prompt(prompt.text)
+            else:
+                narrative_text = self.llm_integration.generate_prompt(prompt)
 
             return narrative_text
 
@@ -93,6 +104,193 @@ class NarrativeGenerator:
             # Handle any unexpected errors during narrative generation
             raise RuntimeError(f"Failed to generate narrative: {str(e)}")
 
+    async def stream_narrative(self, player_action, current_location, session_id=None):
+        """
+        Generates the narrative text based on player action and current location, yielding it in chunks
+        as the LLM produces it so the first words can be shown before the whole passage is ready.
+
+        Args:
+            player_action (str): The action performed by the player.
+            current_location (str): The current location of the player in the game world.
+            session_id (hashable, optional): Identifies the player session. When a speculator is
+                configured, pre-generated narrative for this action is served first and the predicted
+                next actions are pre-generated once this one has been streamed.
+
+        Yields:
+            str: Successive chunks of the narrative text.
+        """
+        self._validate_input(player_action, current_location)
+        try:
+            speculate = self.speculator is not None and session_id is not None
+            if speculate:
+                narrative_text = await self.speculator.take_async(
+                    session_id, player_action, current_location, self._world_fingerprint(current_location)
+                )
+                if narrative_text is not None:
+                    yield narrative_text
+                    return
+
+            prompt, narrative_structure = self._build_prompt(player_action, current_location)
+            if self.llm_integration is None:
+                yield self._generate_narrative_from_prompt(prompt.text)
+            else:
+                async for chunk in self.llm_integration.stream_prompt(prompt):
+                    yield chunk
+
+            if speculate:
+                self._speculate(session_id, narrative_structure.get("branching_paths", []), current_location)
+        except Exception as e:
+            raise RuntimeError(f"Failed to generate narrative: {str(e)}")
+
+    def invalidate_speculations(self, session_id=None, location=None):
+        """
+        Cancels pre-generated narrative, e.g. after an action changes the world state.
+
+        Args:
+            session_id (hashable, optional): The session to clear. Clears every session if omitted.
+            location (str, optional): Only clear narrative pre-generated for this location.
+        """
+        if self.speculator is not None:
+            self.speculator.invalidate(session_id, location)
+
+    def _on_world_state_change(self, version, keys):
+        """
+        Cancels pre-generated narrative for the locations whose view of the world state changed, as
+        soon as it changes rather than when it would be served. Writes to other locations' keys leave
+        a location's speculations alone.
+        """
+        for location in self.speculator.locations():
+            if self.world_manager.get_world_state(location).changed_keys_since(version - 1) != set():
+                self.invalidate_speculations(location=location)
+
+    def _speculate(self, session_id, branching_paths, current_location):
+        """
+        Starts pre-generating narrative for the predicted next actions of a session.
+
+        Args:
+            session_id (hashable): Identifies the player session.
+            branching_paths (list): Predicted next actions, most likely first.
+            current_location (str): The location the predicted actions would happen in.
+        """
+        characters, world_state = self._gather_context(current_location)
+        candidates = [
+            (path, current_location, self._create_prompt(path.replace("_", " "), current_location, characters, world_state))
+            for path in branching_paths[:self.speculator.top_k]
+        ]
+        # Fingerprint the state the prompts were built from; a fresh read could already be newer
+        self.speculator.schedule(session_id, candidates, self._fingerprint(current_location, world_state))
+
+    def _world_fingerprint(self, current_location):
+        """
+        Identifies the world state at a location, so that narrative generated against an older state
+        is not served.
+
+        Args:
+            current_location (str): The location to fingerprint.
+
+        Returns:
+            str: A value that changes whenever the location's world state changes.
+        """
+        return self._fingerprint(current_location, self.world_manager.get_world_state(current_location))
+
+    def _fingerprint(self, current_location, world_state):
+        """
+        Identifies a world state read at a location.
+
+        A versioned state is identified by a version whose view of the location is the same: the last
+        version this generator fingerprinted for the location, unless the location's keys (or
+        world-wide ones) changed since. Writes to other locations therefore leave the fingerprint,
+        and the speculations stamped with it, unchanged.
+
+        Args:
+            current_location (str): The location the state was read at.
+            world_state (Mapping): The state read, e.g. a LocationState.
+
+        Returns:
+            str: A value that changes whenever the location's world state changes.
+        """
+        version = getattr(world_state, "version", None)
+        if version is None:
+            return json.dumps([current_location, world_state], sort_keys=True, default=str)
+        source = getattr(world_state, "change_source", None)
+        seen = self._location_versions.get(source)
+        if seen is not None and world_state.changed_keys_since(seen) == set():
+            version = seen
+        elif source is not None:
+            self._location_versions[source] = version
+        return json.dumps([current_location, version])
+
+    def _gather_context(self, current_location):
+        """
+        Retrieves the characters and world state relevant to a location.
+
+        Args:
+            current_location (str): The current location of the player in the game world.
+
+        Returns:
+            tuple: The characters at the location and the location's world state.
+        """
+        characters = self.character_manager.get_characters_in_location(current_location)
+        world_state = self.world_manager.get_world_state(current_location)
+        return characters, world_state
+
+    def _build_prompt(self, player_action, current_location):
+        """
+        Gathers characters, world state and lore for the action and builds the prompt for it.
+
+        Args:
+            player_action (str): The action performed by the player.
+            current_location (str): The current location of the player in the game world.
+
+        Returns:
+            tuple: The PromptParts to send to the LLM or narrative engine, and the narrative structure.
+        """
+        # Retrieve the relevant data based on player action and location
+        characters, world_state = self._gather_context(current_location)
+
+        # Generate a narrative structure (e.g., setup, conflict, resolution)
+        narrative_structure = self.narrative_structuring.create_structure(player_action, characters, world_state)
+
+        prompt = self._create_prompt(
+            player_action, current_location, characters, world_state, narrative_structure.get("event_triggers", [])
+        )
+        return prompt, narrative_structure
+
+    def _create_prompt(self, player_action, current_location, characters, world_state, active_events=()):
+        """
+        Builds the prompt for an action from the gathered characters and world state.
+
+        Args:
+            player_action (str): The action performed by the player.
+            current_location (str): The current location of the player in the game world.
+            characters (list): The characters at the location.
+            world_state (dict): The world state at the location.
+            active_events (list, optional): Names of the events currently affecting the narrative.
+
+        Returns:
+            PromptParts: The prompt to send to the LLM or narrative engine, split into its static
+                lore preamble and per-turn part.
+        """
+        # Retrieve relevant lore information for consistency
+        world_rules = self.lore.get_world_rules()
+        character_backstories = {
+            character.name: self.lore.get_character_backstory(character.name)
+            for character in characters
+        }
+
+        # Use the PromptManager to create a prompt for the LLM or narrative engine
+        main_character = self.character_manager.get_main_character()
+        current_state = {
+            "location": current_location,
+            "action_description": player_action,
+            "characters": characters,
+            "world_state": world_state,
+            "world_rules": world_rules,
+            "character_backstories": character_backstories,
+            "active_events": list(active_events)
+        }
+        return self.prompt_manager.create_prompt_parts("action", main_character, current_state)
+
     def _generate_narrative_from_prompt(self, prompt):
         """
         Generates narrative text based on the given prompt.
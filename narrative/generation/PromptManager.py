@@ -1,5 +1,28 @@
+from collections import namedtuple
+
+from narrative.generation.context_packing import ContextItem, ContextPacker
 from narrative.generation.narrative_structuring import NarrativeStructuring
+from narrative.generation.prompt_templates import CompiledTemplate, render_lore_fields
 from narrative.lore.lore import Lore
+from narrative.lore.lore_index import LoreIndex
+
+# Introduces the packed context at the end of a prompt
+CONTEXT_HEADING = " Context: "
+
+
+class PromptParts(namedtuple("PromptParts", ["prefix", "suffix", "dropped"], defaults=((),))):
+    """
+    A prompt split into a static prefix (lore preamble) that rarely changes and a per-turn suffix.
+    Backends that cache prompt prefixes only need to process the suffix when the prefix repeats.
+    `dropped` lists the ContextItems left out to keep the prompt within its token budget.
+    """
+
+    __slots__ = ()
+
+    @property
+    def text(self):
+        return self.prefix + self.suffix
+
 
 class PromptManager:
     """
@@ -7,18 +30,38 @@ class PromptManager:
     Utilizes lore information to ensure that prompts are consistent with the game world and characters.
     """
 
-    def __init__(self, narrative_structuring: NarrativeStructuring, context_manager):
+    def __init__(self, narrative_structuring: NarrativeStructuring, context_manager, token_budget=None,
+                 context_packer: ContextPacker = None, lore_index: LoreIndex = None, lore_top_k=5):
         """
         Initializes the PromptManager with dependencies on narrative structuring, context management, and lore.
 
         Args:
             narrative_structuring (NarrativeStructuring): Handles the structure of the narrative.
             context_manager (ContextManager): Tracks narrative context to inform prompt construction.
+            token_budget (int, optional): Maximum number of tokens per prompt. Context that does not fit
+                is dropped, lowest ranked first. No limit if omitted.
+            context_packer (ContextPacker, optional): Counts tokens and ranks context items.
+            lore_index (LoreIndex, optional): When given, prompts include only the lore fragments most
+                relevant to the action and location instead of every world rule. The index is kept in
+                sync with this manager's lore.
+            lore_top_k (int): Maximum number of retrieved lore fragments per prompt.
         """
         self.narrative_structuring = narrative_structuring
         self.context_manager = context_manager
+        self.token_budget = token_budget
+        self.context_packer = context_packer or ContextPacker()
         self.lore = Lore()  # Initialize Lore to access world and character information
+        self.lore_index = lore_index
+        self.lore_top_k = lore_top_k
+        self._lore_version = self.lore.version
+        self._lore_fields = render_lore_fields(self.lore)
+        self._prefix_cache = {}  # Character name -> lore preamble, valid for _lore_version
+        self._backstory_cache = {}  # Character name -> backstory text, valid for _lore_version
+        self._lore_items = {}  # World rule and backstory ContextItems with token counts, valid for _lore_version
+        self._compiled_templates = {}
         self.prompt_templates = self._load_templates()
+        for scenario_name, template_string in self.prompt_templates.items():
+            self._compile_template(scenario_name, template_string)
 
     def _load_templates(self):
         """
@@ -46,30 +89,269 @@ class PromptManager:
         Returns:
             str: The formatted prompt ready to be sent to the LLM.
         """
+        return self.create_prompt_parts(scenario, character, current_state).text
+
+    def create_prompt_parts(self, scenario, character, current_state):
+        """
+        Creates a prompt split into its static lore preamble and its per-turn part.
+
+        Args:
+            scenario (str): The type of scenario (e.g., "dialogue", "action").
+            character (Character): The character involved in the scenario.
+            current_state (dict): The current state of the narrative, including location, recent actions, etc.
+
+        Returns:
+            PromptParts: The lore preamble as the prefix, the scenario text and packed context as the
+                suffix, and the context dropped to meet the token budget.
+        """
         template = self.prompt_templates.get(scenario)
         if not template:
             raise ValueError(f"Unknown scenario: {scenario}")
 
-        # Retrieve relevant lore information
-        character_backstory = self.lore.get_character_backstory(character.name)
-        world_rules = self.lore.get_world_rules()
-        location_description = current_state.get("world_state", {}).get("location_description", "")
-
-        # Use the template to create a prompt, incorporating lore information
-        prompt = template.format(
-            character_name=character.name,
-            dialogue=current_state.get('dialogue', ''),
-            location=current_state.get('location', ''),
-            action_description=current_state.get('action_description', ''),
-            location_description=location_description,
-            object_description=current_state.get('object_description', '')
+        self._refresh_lore()
+        compiled = self._compiled_templates.get(scenario)
+        if compiled is None or compiled.source is not template:
+            # The template was replaced directly in prompt_templates rather than through add_custom_template
+            compiled = self._compile_template(scenario, template)
+
+        values = {
+            "character_name": character.name,
+            "dialogue": current_state.get('dialogue', ''),
+            "location": current_state.get('location', ''),
+            "action_description": current_state.get('action_description', ''),
+            "location_description": current_state.get("world_state", {}).get("location_description", ""),
+            "object_description": current_state.get('object_description', '')
+        }
+        if "character_backstory" in compiled.fields:
+            values["character_backstory"] = self._backstory_text(character.name)
+
+        # Use the compiled template to create the per-turn part of the prompt
+        suffix = compiled.render(values)
+
+        # Pack world rules and supporting context into whatever budget the fixed text leaves
+        world_rules = self._world_rule_items() if self.lore_index is None else []
+        context_items = self._context_items(character, current_state, values)
+        budget = None
+        if self.token_budget is not None:
+            # Count only the sections the prompt can contain: the world rules heading is left out when
+            # lore is retrieved, and the context heading only appears with context
+            fixed_tokens = self.context_packer.token_counter(suffix) + self._fixed_prefix_tokens(
+                character.name, self.lore_index is None
+            )
+            if context_items:
+                fixed_tokens += self.context_packer.token_counter(CONTEXT_HEADING)
+            budget = max(self.token_budget - fixed_tokens, 0)
+        packed = self.context_packer.pack(world_rules + context_items, budget)
+
+        kept_rules = [item.text for item in packed.items if item.kind == "world_rule"]
+        if self.lore_index is not None:
+            # World rules arrive as retrieved lore in the suffix, leaving only the backstory in the prefix
+            prefix = self._format_prefix(character.name, None)
+        elif len(kept_rules) == len(world_rules):
+            prefix = self._lore_prefix(character.name)
+        else:
+            prefix = self._format_prefix(character.name, ', '.join(kept_rules))
+        context = [item.text for item in packed.items if item.kind != "world_rule"]
+        if context:
+            suffix += CONTEXT_HEADING + " ".join(context)
+
+        return PromptParts(prefix, suffix, tuple(packed.dropped))
+
+    def _world_rule_items(self):
+        """
+        Returns the world rules as context items, counting their tokens once per lore version.
+
+        Returns:
+            list: One ContextItem per world rule.
+        """
+        items = self._lore_items.get("world_rules")
+        if items is None:
+            items = [
+                ContextItem("world_rule", rule, tokens=self.context_packer.token_counter(rule))
+                for rule in self.lore.get_world_rules().values()
+            ]
+            self._lore_items["world_rules"] = items
+        return items
+
+    def _retrieved_lore_items(self, character, values, present=()):
+        """
+        Retrieves the lore fragments most relevant to the prompt's action and location.
+
+        Args:
+            character (Character): The character the prompt is about. Their own backstory is already
+                in the prefix and is not retrieved again.
+            values (dict): The values the prompt template was rendered with.
+            present (iterable): Names of the other characters whose backstories are already candidate
+                context; their backstory fragments are not retrieved again.
+
+        Returns:
+            list: One ContextItem per fragment, with its relevance relative to the best match as priority.
+        """
+        self.lore_index.sync(self.lore)
+        query = " ".join(
+            values[field] for field in ("action_description", "location", "location_description", "dialogue")
+            if isinstance(values.get(field), str)
         )
+        # Backstory fragments are keyed "name" and "name.motivations[i]"; skip every fragment of the
+        # covered characters, fetching enough extra results to make up for the ones skipped
+        covered = {character.name.lower()} | {name.lower() for name in present}
+        skipped = sum(
+            1 + len(backstory.get("motivations", []))
+            for name, backstory in self.lore.character_backstories.items() if name in covered
+        )
+        results = [
+            (score, fragment)
+            for score, fragment in self.lore_index.search(query, self.lore_top_k + skipped)
+            if fragment.source != "character_backstories" or fragment.key.split(".")[0] not in covered
+        ][:self.lore_top_k]
+        if not results:
+            return []
+        best = results[0][0]
+        return [
+            ContextItem("lore", f"{fragment.context}: {fragment.text}" if fragment.context else fragment.text,
+                        score / best)
+            for score, fragment in results
+        ]
+
+    def _context_items(self, character, current_state, values=None):
+        """
+        Collects the optional context for a prompt: lore retrieved for the action and location,
+        backstories of the other characters present, the player's recent actions and the active events.
+
+        Args:
+            character (Character): The character the prompt is about.
+            current_state (dict): The current state of the narrative.
+            values (dict, optional): The values the prompt template was rendered with.
 
-        # Integrate character backstory and world rules into the prompt for more context
-        prompt += f" {character.name}'s background: {character_backstory['backstory']}. "
-        prompt += f"World rules to consider: {', '.join(world_rules.values())}."
+        Returns:
+            list: The candidate ContextItems.
+        """
+        items = []
+        present = []
+        for name in current_state.get("character_backstories", {}):
+            if name == character.name:
+                continue
+            item = self._lore_items.get(("backstory", name))
+            if item is None:
+                backstory = self.lore.get_character_backstory(name).get("backstory")
+                if not backstory:
+                    continue
+                text = f"{name}'s background: {backstory}"
+                item = ContextItem("backstory", text, tokens=self.context_packer.token_counter(text))
+                self._lore_items[("backstory", name)] = item
+            items.append(item)
+            present.append(name)
+        if self.lore_index is not None and values is not None:
+            items[:0] = self._retrieved_lore_items(character, values, present)
+
+        recent_actions = current_state.get("recent_actions")
+        if recent_actions is None and isinstance(self.context_manager, dict):
+            recent_actions = self.context_manager.get("previous_actions", [])
+        for index, action in enumerate(recent_actions or []):
+            # More recent actions rank higher
+            items.append(ContextItem("recent_action", f"Earlier: {action}.", (index + 1) / (len(recent_actions) + 1)))
+
+        for event in current_state.get("active_events", []):
+            items.append(ContextItem("active_event", f"Ongoing event: {event.replace('_', ' ')}."))
+        return items
+
+    def _fixed_prefix_tokens(self, character_name, with_world_rules=True):
+        """
+        Returns the number of tokens in a character's lore preamble excluding the world rules themselves.
+
+        Args:
+            character_name (str): The name of the character the prompt is about.
+            with_world_rules (bool): Whether the preamble has a world rules section, whose heading is
+                counted. Prompts using the lore index leave the section out.
+
+        Returns:
+            int: The token count.
+        """
+        key = ("fixed_prefix", character_name, with_world_rules)
+        tokens = self._lore_items.get(key)
+        if tokens is None:
+            prefix = self._format_prefix(character_name, "" if with_world_rules else None)
+            tokens = self._lore_items[key] = self.context_packer.token_counter(prefix)
+        return tokens
+
+    def _compile_template(self, scenario_name, template_string):
+        """
+        Compiles a template against the current lore and stores it for its scenario.
+
+        Args:
+            scenario_name (str): The name of the scenario.
+            template_string (str): The template string to compile.
+
+        Returns:
+            CompiledTemplate: The compiled template.
+        """
+        compiled = CompiledTemplate(template_string, self._lore_fields, self._lore_version)
+        self._compiled_templates[scenario_name] = compiled
+        return compiled
+
+    def _refresh_lore(self):
+        """
+        Re-renders lore fragments and recompiles templates if the lore has changed since they were built.
+        """
+        if self._lore_version == self.lore.version:
+            return
+        self._lore_version = self.lore.version
+        self._lore_fields = render_lore_fields(self.lore)
+        self._prefix_cache.clear()
+        self._backstory_cache.clear()
+        self._lore_items.clear()
+        for scenario_name, template_string in self.prompt_templates.items():
+            self._compile_template(scenario_name, template_string)
 
-        return prompt
+    def _backstory_text(self, character_name):
+        """
+        Returns a character's backstory text, looking it up in the lore only once per lore version.
+
+        Args:
+            character_name (str): The name of the character.
+
+        Returns:
+            str: The character's backstory.
+        """
+        backstory = self._backstory_cache.get(character_name)
+        if backstory is None:
+            backstory = self.lore.get_character_backstory(character_name)['backstory']
+            self._backstory_cache[character_name] = backstory
+        return backstory
+
+    def _lore_prefix(self, character_name):
+        """
+        Returns the lore preamble for a character, formatting it only once per lore version.
+
+        World rules come first so that prompts for different characters still share the longest
+        possible prefix.
+
+        Args:
+            character_name (str): The name of the character the prompt is about.
+
+        Returns:
+            str: The world rules and the character's backstory, ready to precede the prompt.
+        """
+        prefix = self._prefix_cache.get(character_name)
+        if prefix is None:
+            prefix = self._format_prefix(character_name, self._lore_fields['world_rules'])
+            self._prefix_cache[character_name] = prefix
+        return prefix
+
+    def _format_prefix(self, character_name, world_rules_text):
+        """
+        Formats a lore preamble from the given world rules text and the character's backstory.
+
+        Args:
+            character_name (str): The name of the character the prompt is about.
+            world_rules_text (str): The world rules to include, or None to leave them out.
+
+        Returns:
+            str: The lore preamble.
+        """
+        prefix = "" if world_rules_text is None else f"World rules to consider: {world_rules_text}. "
+        prefix += f"{character_name}'s background: {self._backstory_text(character_name)}. "
+        return prefix
 
     def adapt_prompt(self, base_prompt, tone=None, urgency=None):
         """
@@ -98,6 +380,8 @@ class PromptManager:
             template_string (str): The template string to use for the scenario.
         """
         self.prompt_templates[scenario_name] = template_string
+        self._refresh_lore()
+        self._compile_template(scenario_name, template_string)
 
     def remove_template(self, scenario_name):
         """
@@ -108,5 +392,6 @@ class PromptManager:
         """
         if scenario_name in self.prompt_templates:
             del self.prompt_templates[scenario_name]
+            self._compiled_templates.pop(scenario_name, None)
         else:
             raise KeyError(f"No such template: {scenario_name}")
@@ -1,5 +1,8 @@
 # core/action_executor.py
 
+from core.data_management.character_manager import Character
+
+
 class ActionExecutor:
     """
     Executes character actions and updates the game state.
@@ -22,6 +25,14 @@ class ActionExecutor:
         """
         if action == "move_to_location":
             target_location = game_state.get("target_location")  # Get target location from game state
+            target_position = game_state.get("target_position")  # Optional (x, y) on the current map
+            if target_position is not None and game_state.get("position") is not None:
+                path = self.world_manager.find_path(game_state["position"], target_position)
+                if path is None:
+                    print(f"{character.name} cannot find a way to {target_position}.")
+                    return
+                game_state["path"] = path
+                game_state["position"] = path[-1]
             if target_location:
                 self.world_manager.move_player(character, target_location)  
                 # Add narrative for the move
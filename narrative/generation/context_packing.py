@@ -0,0 +1,87 @@
+# narrative/generation/context_packing.py
+
+from collections import namedtuple
+
+from core.utils.text_processing import estimate_tokens
+
+# A piece of context that may be included in a prompt. `priority` (0 to 1) orders items of the same kind
+# (higher is kept first); `tokens` is the item's cost, counted when omitted.
+ContextItem = namedtuple("ContextItem", ["kind", "text", "priority", "tokens"], defaults=(0.0, None))
+
+# The outcome of packing: kept items in their original order, dropped items, and tokens used.
+PackedContext = namedtuple("PackedContext", ["items", "dropped", "tokens_used"])
+
+# How strongly each kind of context is preferred when the budget is tight
+DEFAULT_KIND_WEIGHTS = {
+    "world_rule": 4.0,
+    "lore": 3.5,
+    "active_event": 3.0,
+    "recent_action": 2.0,
+    "backstory": 1.0
+}
+
+
+class ContextPacker:
+    """
+    Selects which context items fit into a prompt's token budget.
+
+    Items are ranked by the weight of their kind plus their own priority and packed greedily: an item
+    that does not fit is skipped, and smaller, lower-ranked items may still fill the remaining space.
+    """
+
+    def __init__(self, token_counter=estimate_tokens, kind_weights=None):
+        """
+        Initializes the ContextPacker.
+
+        Args:
+            token_counter (callable): Returns the number of tokens in a text.
+            kind_weights (dict, optional): Preference per item kind. Defaults to DEFAULT_KIND_WEIGHTS.
+        """
+        self.token_counter = token_counter
+        self.kind_weights = dict(DEFAULT_KIND_WEIGHTS if kind_weights is None else kind_weights)
+
+    def cost(self, item):
+        """
+        Returns the number of tokens an item takes up in a prompt, including one for its separator.
+
+        Args:
+            item (ContextItem): The item to measure.
+
+        Returns:
+            int: The item's token cost.
+        """
+        tokens = item.tokens if item.tokens is not None else self.token_counter(item.text)
+        return tokens + 1
+
+    def pack(self, items, budget):
+        """
+        Packs items into a token budget.
+
+        Args:
+            items (list): The candidate ContextItems.
+            budget (int): The number of tokens available, or None for no limit.
+
+        Returns:
+            PackedContext: The kept items in their original order, the dropped items and the tokens used.
+        """
+        costs = [self.cost(item) for item in items]
+        if budget is None:
+            return PackedContext(list(items), [], sum(costs))
+
+        ranking = sorted(
+            range(len(items)),
+            key=lambda index: self.kind_weights.get(items[index].kind, 0.0) + items[index].priority,
+            reverse=True
+        )
+        kept = set()
+        remaining = budget
+        for index in ranking:
+            if costs[index] <= remaining:
+                kept.add(index)
+                remaining -= costs[index]
+
+        return PackedContext(
+            [item for index, item in enumerate(items) if index in kept],
+            [item for index, item in enumerate(items) if index not in kept],
+            budget - remaining
+        )
@@ -0,0 +1,169 @@
+# narrative/generation/llm_batcher.py
+
+import asyncio
+import json
+import time
+
+
+class BatchMetrics:
+    """
+    Collects batch size and queueing delay statistics for a MicroBatcher, used to tune its window.
+    """
+
+    def __init__(self):
+        self.batches = 0
+        self.prompts = 0
+        self.batch_sizes = {}  # Batch size -> number of batches sent with that size
+        self.total_queue_delay = 0.0
+        self.max_queue_delay = 0.0
+        self.full_flushes = 0  # Batches sent because they reached max_batch_size
+        self.window_flushes = 0  # Batches sent because their window elapsed
+
+    def record(self, batch_size, queue_delays, full):
+        """
+        Records one dispatched batch.
+
+        Args:
+            batch_size (int): The number of prompts in the batch.
+            queue_delays (list): Seconds each prompt spent queued before the batch was sent.
+            full (bool): Whether the batch was sent because it reached the maximum size.
+        """
+        self.batches += 1
+        self.prompts += batch_size
+        self.batch_sizes[batch_size] = self.batch_sizes.get(batch_size, 0) + 1
+        self.total_queue_delay += sum(queue_delays)
+        self.max_queue_delay = max(self.max_queue_delay, max(queue_delays, default=0.0))
+        if full:
+            self.full_flushes += 1
+        else:
+            self.window_flushes += 1
+
+    def snapshot(self):
+        """
+        Returns the current statistics.
+
+        Returns:
+            dict: Counters plus the mean batch size and mean queueing delay in seconds.
+        """
+        return {
+            "batches": self.batches,
+            "prompts": self.prompts,
+            "batch_sizes": dict(self.batch_sizes),
+            "mean_batch_size": self.prompts / self.batches if self.batches else 0.0,
+            "mean_queue_delay": self.total_queue_delay / self.prompts if self.prompts else 0.0,
+            "max_queue_delay": self.max_queue_delay,
+            "full_flushes": self.full_flushes,
+            "window_flushes": self.window_flushes
+        }
+
+
+class MicroBatcher:
+    """
+    Coalesces prompts submitted at about the same time into batched LLM requests.
+
+    Prompts are queued for at most `window` seconds, or until `max_batch_size` prompts are waiting,
+    then sent as one `LLMClient.generate_batch` call. Each caller awaits only its own result. Prompts
+    are grouped by model parameters, since a batch shares one set of parameters.
+    """
+
+    def __init__(self, client, window=0.01, max_batch_size=32, timeout=None):
+        """
+        Initializes the MicroBatcher.
+
+        Args:
+            client (LLMClient): The client used to send batches.
+            window (float): Maximum time in seconds a prompt waits for others to join its batch.
+            max_batch_size (int): Number of queued prompts that triggers an immediate send.
+            timeout (float, optional): Request timeout applied to each batch.
+        """
+        if window < 0:
+            raise ValueError("Batch window cannot be negative.")
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        self.client = client
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.timeout = timeout
+        self.metrics = BatchMetrics()
+        self._queues = {}  # Parameter key -> list of (prompt, future, enqueued_at)
+        self._timers = {}
+        self._tasks = set()
+
+    async def submit(self, prompt, **params):
+        """
+        Queues a prompt for the next batch and waits for its generated text.
+
+        Args:
+            prompt (str): The prompt to send.
+            **params: Model parameters for the prompt.
+
+        Returns:
+            str: The generated text.
+        """
+        loop = asyncio.get_running_loop()
+        key = json.dumps(params, sort_keys=True)
+        future = loop.create_future()
+        queue = self._queues.setdefault(key, [])
+        queue.append((prompt, future, time.monotonic()))
+
+        if len(queue) >= self.max_batch_size:
+            self._flush(key, full=True)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+        return await future
+
+    def _flush(self, key, full=False):
+        """
+        Sends the prompts queued under a parameter key as one batch.
+
+        Args:
+            key (str): The parameter key of the queue to flush.
+            full (bool): Whether the flush was triggered by the queue reaching its maximum size.
+        """
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        queue = self._queues.pop(key, [])
+        # Callers that were cancelled while queued are dropped from the batch
+        batch = [entry for entry in queue if not entry[1].done()]
+        if not batch:
+            return
+
+        now = time.monotonic()
+        self.metrics.record(len(batch), [now - enqueued_at for _, _, enqueued_at in batch], full)
+        task = asyncio.get_running_loop().create_task(self._send(json.loads(key), batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, params, batch):
+        """
+        Sends a batch and resolves each caller's future with its result.
+
+        Args:
+            params (dict): Model parameters shared by the batch.
+            batch (list): The queued (prompt, future, enqueued_at) entries.
+        """
+        try:
+            texts = await self.client.generate_batch([prompt for prompt, _, _ in batch], timeout=self.timeout, **params)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except BaseException:
+            # The send was cancelled, e.g. when the loop shuts down; don't leave its callers waiting
+            for _, future, _ in batch:
+                future.cancel()
+            raise
+        for (_, future, _), text in zip(batch, texts):
+            if not future.done():
+                future.set_result(text)
+
+    async def flush(self):
+        """
+        Sends every queued prompt immediately and waits for the batches to complete.
+        """
+        for key in list(self._queues):
+            self._flush(key)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,205 @@
+# narrative/generation/llm_cache.py
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LLMResponseCache:
+    """
+    Content-addressed cache of LLM responses.
+
+    Responses are keyed on a hash of the normalized prompt plus the model parameters used to generate
+    them. Recent entries live in an in-memory LRU tier; when a database path is given, entries are
+    also written to an SQLite tier that survives restarts and is shared by processes using the same
+    file. Every entry expires after its time-to-live.
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600.0, db_path=None, clock=time.time):
+        """
+        Initializes the LLMResponseCache.
+
+        Args:
+            max_entries (int): Maximum number of entries held in memory before the least recently used is evicted.
+            ttl (float): Default time-to-live of an entry in seconds.
+            db_path (str, optional): Path of the SQLite file backing the on-disk tier. No disk tier if omitted.
+            clock (callable): Returns the current time in seconds; replaceable for testing.
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()  # Key -> (expires_at, text)
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path is not None:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses (key TEXT PRIMARY KEY, text TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(prompt, **params):
+        """
+        Builds the cache key for a prompt and its model parameters.
+
+        Whitespace in the prompt is normalized so that formatting differences do not split entries.
+
+        Args:
+            prompt (str): The prompt sent to the LLM.
+            **params: Model parameters that influence the response (e.g., temperature, max_tokens).
+
+        Returns:
+            str: A hex digest identifying the request.
+        """
+        normalized = " ".join(prompt.split())
+        material = json.dumps([normalized, params], sort_keys=True, default=str)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Looks up a cached response.
+
+        Args:
+            key (str): The cache key built by `make_key`.
+
+        Returns:
+            str: The cached response, or None if there is no live entry.
+        """
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, text = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return text
+                del self._entries[key]
+                self.expirations += 1
+
+            if self._db is not None:
+                row = self._db.execute("SELECT text, expires_at FROM llm_responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    text, expires_at = row
+                    if expires_at > now:
+                        self._store_in_memory(key, text, expires_at)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return text
+                    self._db.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                    self._db.commit()
+                    self.expirations += 1
+
+            self.misses += 1
+            return None
+
+    def set(self, key, text, ttl=None):
+        """
+        Stores a response in every cache tier.
+
+        Args:
+            key (str): The cache key built by `make_key`.
+            text (str): The response to cache.
+            ttl (float, optional): Overrides the default time-to-live for this entry.
+        """
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._store_in_memory(key, text, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, text, expires_at) VALUES (?, ?, ?)",
+                    (key, text, expires_at)
+                )
+                self._db.commit()
+
+    def _store_in_memory(self, key, text, expires_at):
+        """
+        Stores an entry in the LRU tier, evicting the least recently used entries beyond capacity.
+        Must be called with the lock held.
+        """
+        self._entries[key] = (expires_at, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        """
+        Removes an entry from every cache tier.
+
+        Args:
+            key (str): The cache key to remove.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self._db.commit()
+
+    def purge_expired(self):
+        """
+        Removes expired entries from every cache tier.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        now = self._clock()
+        with self._lock:
+            expired = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+            for key in expired:
+                del self._entries[key]
+            removed = len(expired)
+            if self._db is not None:
+                removed += self._db.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,)).rowcount
+                self._db.commit()
+            self.expirations += removed
+            return removed
+
+    def clear(self):
+        """
+        Removes every entry from every cache tier.
+        """
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_responses")
+                self._db.commit()
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: Hit, miss, eviction and expiration counts, the hit rate and the in-memory size.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries)
+            }
+
+    def close(self):
+        """
+        Closes the on-disk tier.
+        """
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
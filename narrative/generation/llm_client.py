@@ -0,0 +1,306 @@
+# narrative/generation/llm_client.py
+
+import asyncio
+import json
+import threading
+
+import httpx
+
+
+class LLMRequestError(RuntimeError):
+    """
+    Raised when the LLM service cannot be reached, times out, or returns an unusable response.
+    """
+
+
+class LLMClient:
+    """
+    Asynchronous client for the LLM service.
+
+    Requests share a bounded pool of keep-alive connections, and the number of prompts in flight at
+    once is capped so that a burst of player actions queues locally instead of overwhelming the
+    service. A client is bound to the event loop it is first used on.
+    """
+
+    def __init__(self, endpoint, max_connections=100, max_keepalive_connections=20,
+                 max_in_flight=256, timeout=30.0, connect_timeout=5.0, headers=None, batch_endpoint=None):
+        """
+        Initializes the LLMClient.
+
+        Args:
+            endpoint (str): URL of the LLM generation endpoint.
+            max_connections (int): Maximum number of open connections in the pool.
+            max_keepalive_connections (int): Maximum number of idle connections kept alive for reuse.
+            max_in_flight (int): Maximum number of requests awaiting a response at any one time.
+            timeout (float): Default time in seconds allowed for a single request.
+            connect_timeout (float): Time in seconds allowed to establish a new connection.
+            headers (dict, optional): Extra HTTP headers sent with every request (e.g., authorization).
+            batch_endpoint (str, optional): URL accepting several prompts in one request. Defaults to `endpoint`.
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1.")
+        self.endpoint = endpoint
+        self.batch_endpoint = batch_endpoint or endpoint
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections
+        )
+        self._timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._headers = dict(headers or {})
+        self._http = None
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+
+    def _get_http(self):
+        """
+        Returns the pooled HTTP client, creating it on first use.
+
+        Returns:
+            httpx.AsyncClient: The shared HTTP client.
+        """
+        if self._http is None:
+            self._http = httpx.AsyncClient(limits=self._limits, timeout=self._timeout, headers=self._headers)
+        return self._http
+
+    async def generate(self, prompt, timeout=None, **params):
+        """
+        Sends a prompt to the LLM and returns the generated text.
+
+        Args:
+            prompt (str): The prompt to send.
+            timeout (float, optional): Overrides the default request timeout for this call.
+            **params: Model parameters (e.g., temperature, max_tokens) forwarded to the service. A "prefix"
+                parameter carries a static leading part of the prompt separately, so that backends with
+                prefix caching can reuse its processed state; `prompt` then holds only the remainder.
+
+        Returns:
+            str: The generated text.
+
+        Raises:
+            LLMRequestError: If the request fails, times out, or the response has no text.
+        """
+        payload = dict(params, prompt=prompt)
+        data = await self._post(payload, timeout)
+        text = data.get("text")
+        if not isinstance(text, str):
+            raise LLMRequestError("LLM response did not contain generated text.")
+        return text
+
+    async def generate_batch(self, prompts, timeout=None, **params):
+        """
+        Sends several prompts to the LLM in a single request.
+
+        The batch occupies one in-flight slot. The service is expected to answer with a "texts" list
+        holding one generated text per prompt, in order.
+
+        Args:
+            prompts (list): The prompts to send.
+            timeout (float, optional): Overrides the default request timeout for this call.
+            **params: Model parameters shared by every prompt in the batch.
+
+        Returns:
+            list: The generated texts, in the same order as `prompts`.
+
+        Raises:
+            LLMRequestError: If the request fails or the response does not match the batch.
+        """
+        payload = dict(params, prompts=list(prompts))
+        data = await self._post(payload, timeout, url=self.batch_endpoint)
+        texts = data.get("texts")
+        if not isinstance(texts, list) or len(texts) != len(payload["prompts"]):
+            raise LLMRequestError("LLM batch response does not match the number of prompts sent.")
+        return texts
+
+    async def stream(self, prompt, timeout=None, **params):
+        """
+        Sends a prompt to the LLM and yields the generated text as it is produced.
+
+        The service is expected to answer with newline-delimited JSON objects, each carrying a "text"
+        chunk, optionally ending with an object whose "done" field is true. The request holds an
+        in-flight slot until the stream ends or the caller stops iterating.
+
+        Args:
+            prompt (str): The prompt to send.
+            timeout (float, optional): Overrides the default timeout, applied to each read of the stream.
+            **params: Model parameters forwarded to the service, including an optional "prefix" as for `generate`.
+
+        Yields:
+            str: Successive chunks of generated text.
+
+        Raises:
+            LLMRequestError: If the request fails, times out, or a chunk cannot be decoded.
+        """
+        payload = dict(params, prompt=prompt, stream=True)
+        request_timeout = self._timeout if timeout is None else timeout
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                async with self._get_http().stream("POST", self.endpoint, json=payload, timeout=request_timeout) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.strip():
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("done"):
+                            break
+                        text = chunk.get("text")
+                        if text:
+                            yield text
+            except httpx.TimeoutException as e:
+                raise LLMRequestError(f"LLM stream timed out: {e}") from e
+            except httpx.HTTPStatusError as e:
+                raise LLMRequestError(f"LLM service returned status {e.response.status_code}.") from e
+            except (httpx.HTTPError, ValueError) as e:
+                raise LLMRequestError(f"LLM stream failed: {e}") from e
+            finally:
+                self.in_flight -= 1
+
+    async def _post(self, payload, timeout=None, url=None):
+        """
+        Posts a JSON payload to the LLM service while holding an in-flight slot.
+
+        Args:
+            payload (dict): The JSON body of the request.
+            timeout (float, optional): Overrides the default request timeout.
+            url (str, optional): Overrides the endpoint the payload is posted to.
+
+        Returns:
+            dict: The decoded JSON response.
+
+        Raises:
+            LLMRequestError: If the request fails or the response is not valid JSON.
+        """
+        request_timeout = self._timeout if timeout is None else timeout
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                response = await self._get_http().post(url or self.endpoint, json=payload, timeout=request_timeout)
+                response.raise_for_status()
+                return response.json()
+            except httpx.TimeoutException as e:
+                raise LLMRequestError(f"LLM request timed out: {e}") from e
+            except httpx.HTTPStatusError as e:
+                raise LLMRequestError(f"LLM service returned status {e.response.status_code}.") from e
+            except (httpx.HTTPError, ValueError) as e:
+                raise LLMRequestError(f"LLM request failed: {e}") from e
+            finally:
+                self.in_flight -= 1
+
+    async def aclose(self):
+        """
+        Closes all pooled connections.
+        """
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+
+class SyncLLMClient:
+    """
+    Wrapper around an LLMClient for callers that are not running an event loop, or that run several.
+
+    The wrapped client runs on a private event loop in a background thread, so its connection pool
+    is kept alive between calls and several threads can share it. Coroutines can also be awaited
+    from other event loops through `run_async` and `relay`, so everything bound to the client's
+    loop (the client itself, batchers, in-flight request sharing) is only ever used on that loop.
+    """
+
+    def __init__(self, client: LLMClient):
+        """
+        Initializes the wrapper and starts its event loop thread.
+
+        Args:
+            client (LLMClient): The asynchronous client to wrap.
+        """
+        self.client = client
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-client-loop", daemon=True)
+        self._thread.start()
+
+    def run(self, coroutine, timeout=None):
+        """
+        Runs a coroutine on the wrapper's event loop and waits for its result.
+
+        Args:
+            coroutine (coroutine): The coroutine to run.
+            timeout (float, optional): Maximum time in seconds to wait for the result.
+
+        Returns:
+            The result of the coroutine.
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        return future.result(timeout)
+
+    async def run_async(self, coroutine):
+        """
+        Runs a coroutine on the wrapper's event loop and awaits its result from the caller's loop.
+        Cancelling the caller cancels the coroutine.
+
+        Args:
+            coroutine (coroutine): The coroutine to run.
+
+        Returns:
+            The result of the coroutine.
+        """
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, self._loop))
+
+    async def relay(self, iterator):
+        """
+        Iterates an asynchronous iterator on the wrapper's event loop, yielding its items on the
+        caller's loop. The iterator is closed on the wrapper's loop if the caller stops early.
+
+        Args:
+            iterator (async iterator): The iterator to relay, e.g. `client.stream(prompt)`.
+
+        Yields:
+            The iterator's items.
+        """
+        async def next_item():
+            try:
+                return False, await iterator.__anext__()
+            except StopAsyncIteration:
+                return True, None
+
+        finished = False
+        try:
+            while True:
+                finished, item = await self.run_async(next_item())
+                if finished:
+                    return
+                yield item
+        finally:
+            if not finished and hasattr(iterator, "aclose") and not self._loop.is_closed():
+                await self.run_async(iterator.aclose())
+
+    def generate(self, prompt, timeout=None, **params):
+        """
+        Sends a prompt to the LLM and blocks until the generated text is available.
+
+        Args:
+            prompt (str): The prompt to send.
+            timeout (float, optional): Overrides the default request timeout for this call.
+            **params: Model parameters forwarded to the service.
+
+        Returns:
+            str: The generated text.
+        """
+        return self.run(self.client.generate(prompt, timeout=timeout, **params))
+
+    def close(self):
+        """
+        Closes the wrapped client and stops the event loop thread.
+        """
+        if self._loop.is_closed():
+            return
+        self.run(self.client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
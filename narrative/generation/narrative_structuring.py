@@ -1,4 +1,4 @@
-# narrative/generation/Narrative_structuring.py
+# narrative/generation/narrative_structuring.py
 
 class NarrativeStructuring:
     """
@@ -31,10 +31,7 @@ class NarrativeStructuring:
         Returns:
             dict: A dictionary representing the structured narrative elements.
         """
-        # Update events based on the current world state
-        self.event_manager.update_events(world_state)
-        
-        # Determine active events that may influence the narrative
+        # Update events based on the current world state and determine those that may influence the narrative
         active_events = self._get_active_events(world_state)
 
         narrative_structure = {
@@ -162,7 +159,8 @@ class NarrativeStructuring:
 
     def _get_active_events(self, world_state):
         """
-        Retrieves a list of currently active events from the EventManager.
+        Updates the EventManager for a world state and returns the events active in it. The result
+        belongs to this world state, even while other structures are created concurrently.
 
         Args:
             world_state (dict): The current state of the game world.
@@ -170,11 +168,7 @@ class NarrativeStructuring:
         Returns:
             list: A list of active events.
         """
-        active_events = []
-        for event_name in self.event_manager.events:
-            if self.event_manager.check_event(event_name, world_state):
-                active_events.append(event_name)
-        return active_events
+        return self.event_manager.update_events(world_state)
 
     def _describe_active_events(self, active_events):
         """
@@ -0,0 +1,113 @@
+# narrative/generation/prompt_templates.py
+
+from string import Formatter
+
+# Template fields filled from the Lore rather than from the current narrative state
+LORE_FIELDS = ("world_rules", "key_events", "world_facts")
+
+
+def render_lore_fields(lore):
+    """
+    Renders the lore-derived template fields once, so prompts do not rebuild them on every turn.
+
+    Args:
+        lore (Lore): The lore to render.
+
+    Returns:
+        dict: The text for each field in LORE_FIELDS.
+    """
+    return {
+        "world_rules": ', '.join(lore.get_world_rules().values()),
+        "key_events": ' '.join(lore.get_key_events()),
+        "world_facts": ', '.join(
+            f"{name.replace('_', ' ')}: {fact}" for name, fact in lore.get_world_facts().items()
+        )
+    }
+
+
+def _convert(value, conversion):
+    """
+    Applies a `str.format` conversion ("r", "a" or "s") to a value.
+    """
+    if conversion == "r":
+        return repr(value)
+    if conversion == "a":
+        return ascii(value)
+    if conversion == "s":
+        return str(value)
+    return value
+
+
+class CompiledTemplate:
+    """
+    A prompt template prepared for fast rendering.
+
+    Lore fields are substituted at compile time, with any conversion or format spec applied, and
+    the remaining fields are turned into a %-style pattern with a fixed argument order, which
+    renders faster than `str.format` on the original template. Templates using attribute or index
+    lookups (e.g., "{character.name}") fall back to `str.format`.
+    """
+
+    __slots__ = ("source", "lore_version", "fields", "_pattern", "_arguments")
+
+    def __init__(self, source, lore_fields, lore_version):
+        """
+        Compiles a template.
+
+        Args:
+            source (str): The template string, in `str.format` syntax.
+            lore_fields (dict): Pre-rendered lore field values (see render_lore_fields).
+            lore_version (int): The Lore version the lore fields were rendered from.
+        """
+        self.source = source
+        self.lore_version = lore_version
+        pattern = []
+        arguments = []  # (field name, conversion, format spec) per placeholder in the pattern
+        simple = True
+        for literal, field_name, format_spec, conversion in Formatter().parse(source):
+            pattern.append(literal.replace("%", "%%"))
+            if field_name is None:
+                continue
+            if not field_name or not field_name.isidentifier() or "{" in format_spec:
+                simple = False
+                break
+            if field_name in lore_fields:
+                text = format(_convert(lore_fields[field_name], conversion), format_spec)
+                pattern.append(text.replace("%", "%%"))
+            else:
+                pattern.append("%s")
+                arguments.append((field_name, conversion, format_spec))
+
+        if simple:
+            self.fields = frozenset(name for name, _, _ in arguments)
+            self._pattern = "".join(pattern)
+            self._arguments = tuple(arguments)
+        else:
+            self.fields = frozenset(
+                field_name.split(".")[0].split("[")[0]
+                for _, field_name, _, _ in Formatter().parse(source) if field_name
+            )
+            self._pattern = None
+            self._arguments = dict(lore_fields)
+
+    def render(self, values):
+        """
+        Renders the template.
+
+        Args:
+            values (dict): Values for the template's non-lore fields.
+
+        Returns:
+            str: The rendered text.
+
+        Raises:
+            KeyError: If a field used by the template has no value.
+        """
+        if self._pattern is None:
+            return self.source.format(**{**self._arguments, **values})
+
+        rendered = []
+        for field_name, conversion, format_spec in self._arguments:
+            value = _convert(values[field_name], conversion)
+            rendered.append(format(value, format_spec) if format_spec else value)
+        return self._pattern % tuple(rendered)
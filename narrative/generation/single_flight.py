@@ -0,0 +1,101 @@
+# narrative/generation/single_flight.py
+
+import asyncio
+
+
+class _Flight:
+    """
+    A shared in-progress call and the number of callers currently awaiting it.
+    """
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one shared call.
+
+    The first caller for a key starts the call; callers arriving while it is in progress await the
+    same result instead of starting their own. Each caller waits through a shield, so a caller that is
+    cancelled or times out leaves the shared call running for the others. The shared call is only
+    cancelled once every caller has given up on it. Failures are delivered to every caller of that
+    flight and are not remembered: the next call for the key starts afresh.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self.leaders = 0  # Calls that started a new flight
+        self.followers = 0  # Calls that joined a flight already in progress
+
+    async def do(self, key, factory, timeout=None):
+        """
+        Runs `factory()` for the key, or joins the call already in progress for it.
+
+        Args:
+            key (hashable): Identifies calls that are interchangeable (e.g., a prompt hash).
+            factory (callable): Returns the coroutine to run when no call for the key is in progress.
+            timeout (float, optional): Maximum time in seconds this caller waits for the result.
+
+        Returns:
+            The result of the shared call.
+
+        Raises:
+            asyncio.TimeoutError: If this caller's timeout elapses first. Other callers are unaffected.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._finish(key, flight))
+            self.leaders += 1
+        else:
+            self.followers += 1
+
+        flight.waiters += 1
+        try:
+            if timeout is None:
+                return await asyncio.shield(flight.task)
+            return await asyncio.wait_for(asyncio.shield(flight.task), timeout)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every caller has been cancelled or timed out, so nobody needs the result
+                flight.task.cancel()
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    def _finish(self, key, flight):
+        """
+        Forgets a completed flight so the next call for its key starts a new one.
+        """
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            # Mark the exception as retrieved in case every caller left before it was raised
+            flight.task.exception()
+
+    def in_flight(self):
+        """
+        Returns the number of distinct calls currently in progress.
+
+        Returns:
+            int: The number of keys with a call in progress.
+        """
+        return len(self._flights)
+
+    def stats(self):
+        """
+        Returns how many calls started a flight and how many were deduplicated into one.
+
+        Returns:
+            dict: Leader and follower counts and the current number of flights.
+        """
+        return {
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "in_flight": len(self._flights)
+        }
@@ -0,0 +1,228 @@
+# narrative/generation/speculation.py
+
+import asyncio
+
+from core.utils.text_processing import estimate_tokens
+
+
+class SpeculationMetrics:
+    """
+    Tracks how useful speculative pre-generation is: how often players take a predicted action, and
+    how many generated tokens are thrown away.
+    """
+
+    def __init__(self):
+        self.started = 0
+        self.hits = 0  # Player actions answered from a speculation
+        self.misses = 0  # Player actions with no usable speculation
+        self.skipped_busy = 0  # Speculations not started because the LLM had no idle capacity
+        self.cancelled = 0  # Speculations cancelled before they finished
+        self.stale = 0  # Finished speculations discarded because the world state changed
+        self.used_tokens = 0
+        self.wasted_tokens = 0
+
+    def snapshot(self):
+        """
+        Returns the current statistics.
+
+        Returns:
+            dict: Counters plus the hit rate over player actions.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "started": self.started,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "skipped_busy": self.skipped_busy,
+            "cancelled": self.cancelled,
+            "stale": self.stale,
+            "used_tokens": self.used_tokens,
+            "wasted_tokens": self.wasted_tokens
+        }
+
+
+class _Speculation:
+    """
+    A narrative being generated ahead of time for one predicted action.
+    """
+
+    __slots__ = ("task", "fingerprint")
+
+    def __init__(self, task, fingerprint):
+        self.task = task
+        self.fingerprint = fingerprint
+
+
+class SpeculativeGenerator:
+    """
+    Pre-generates narrative for the actions a player is predicted to take next.
+
+    Speculations are kept per session and keyed on the predicted action and location. Each one records
+    a fingerprint of the world state it was generated against; a speculation whose fingerprint no
+    longer matches is discarded rather than served. Speculations are only started while the LLM client
+    has idle capacity, so they never delay real player requests.
+
+    Speculations go through an LLMIntegration, so they run on its client's loop and share its response
+    cache and in-flight requests: a real request for a prompt being speculated joins that request
+    instead of sending the prompt again.
+    """
+
+    def __init__(self, llm_integration, top_k=3, idle_fraction=0.5):
+        """
+        Initializes the SpeculativeGenerator.
+
+        Args:
+            llm_integration (LLMIntegration): The integration used to generate speculative narrative.
+            top_k (int): Maximum number of predicted actions pre-generated per turn.
+            idle_fraction (float): Speculation only starts while fewer than this fraction of the
+                integration's client's in-flight slots are in use.
+        """
+        self.llm_integration = llm_integration
+        self.top_k = top_k
+        self.idle_fraction = idle_fraction
+        self.metrics = SpeculationMetrics()
+        self._sessions = {}  # Session ID -> {(action, location): _Speculation}
+
+    @staticmethod
+    def _key(action, location):
+        """
+        Normalizes a predicted or actual action so that "find_shelter" and "Find shelter" match.
+        """
+        return " ".join(action.replace("_", " ").lower().split()), location
+
+    def schedule(self, session_id, candidates, fingerprint):
+        """
+        Starts pre-generating narrative for a session's predicted next actions, replacing the
+        speculations left over from its previous turn. Must be called from a running event loop.
+
+        Args:
+            session_id (hashable): Identifies the player session.
+            candidates (list): (action, location, PromptParts) tuples, most likely first.
+            fingerprint (hashable): Identifies the world state the prompts were built from.
+        """
+        self.invalidate(session_id)
+        loop = asyncio.get_running_loop()
+        speculations = {}
+        for action, location, prompt in candidates[:self.top_k]:
+            if not self.llm_integration.has_idle_capacity(self.idle_fraction):
+                self.metrics.skipped_busy += 1
+                continue
+            speculations[self._key(action, location)] = _Speculation(
+                loop.create_task(self.llm_integration.generate_prompt_async(prompt)), fingerprint
+            )
+            self.metrics.started += 1
+        if speculations:
+            self._sessions[session_id] = speculations
+
+    def take(self, session_id, action, location, fingerprint):
+        """
+        Returns a finished speculation for the action without waiting for pending ones. May be called
+        from a thread other than the one running the event loop.
+
+        Args:
+            session_id (hashable): Identifies the player session.
+            action (str): The action the player actually took.
+            location (str): The location the action happened in.
+            fingerprint (hashable): Identifies the current world state.
+
+        Returns:
+            str: The pre-generated narrative, or None if there is no finished, current speculation.
+        """
+        speculation = self._claim(session_id, action, location, fingerprint)
+        if speculation is None or not speculation.task.done():
+            if speculation is not None:
+                self._discard(speculation)
+            self.metrics.misses += 1
+            return None
+        return self._result(speculation)
+
+    async def take_async(self, session_id, action, location, fingerprint):
+        """
+        Returns the speculation for the action, waiting for it if it is still being generated.
+
+        Args:
+            session_id (hashable): Identifies the player session.
+            action (str): The action the player actually took.
+            location (str): The location the action happened in.
+            fingerprint (hashable): Identifies the current world state.
+
+        Returns:
+            str: The pre-generated narrative, or None if there is no current speculation.
+        """
+        speculation = self._claim(session_id, action, location, fingerprint)
+        if speculation is None:
+            self.metrics.misses += 1
+            return None
+        await asyncio.wait([speculation.task])
+        return self._result(speculation)
+
+    def _claim(self, session_id, action, location, fingerprint):
+        """
+        Removes and returns the session's speculation for the action if it matches the world state.
+        """
+        speculations = self._sessions.get(session_id)
+        if not speculations:
+            return None
+        speculation = speculations.pop(self._key(action, location), None)
+        if speculation is not None and speculation.fingerprint != fingerprint:
+            self.metrics.stale += 1
+            self._discard(speculation)
+            return None
+        return speculation
+
+    def _result(self, speculation):
+        """
+        Returns the text of a finished speculation, counting it as a hit if it succeeded.
+        """
+        task = speculation.task
+        if task.cancelled() or task.exception() is not None:
+            self.metrics.misses += 1
+            return None
+        text = task.result()
+        self.metrics.hits += 1
+        self.metrics.used_tokens += estimate_tokens(text)
+        return text
+
+    def _discard(self, speculation):
+        """
+        Cancels or throws away a speculation that will not be served.
+        """
+        task = speculation.task
+        if not task.done():
+            # Tasks may only be cancelled from their own loop's thread, and callers may be on another
+            loop = task.get_loop()
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(task.cancel)
+            self.metrics.cancelled += 1
+        elif not task.cancelled() and task.exception() is None:
+            self.metrics.wasted_tokens += estimate_tokens(task.result())
+
+    def locations(self):
+        """
+        Returns the locations that pending speculations were generated for.
+        """
+        return {location for speculations in list(self._sessions.values()) for _, location in list(speculations)}
+
+    def invalidate(self, session_id=None, location=None):
+        """
+        Discards speculations, e.g. because the world state changed under them. May be called from a
+        thread other than the one running the event loop.
+
+        Args:
+            session_id (hashable, optional): The session to clear. Clears every session if omitted.
+            location (str, optional): Only clear speculations for actions at this location.
+        """
+        if session_id is None:
+            sessions = list(self._sessions)
+        else:
+            sessions = [session_id]
+        for session in sessions:
+            if location is None:
+                discarded = list(self._sessions.pop(session, {}).values())
+            else:
+                speculations = self._sessions.get(session, {})
+                discarded = [speculations.pop(key, None) for key in list(speculations) if key[1] == location]
+            for speculation in discarded:
+                if speculation is not None:
+                    self._discard(speculation)
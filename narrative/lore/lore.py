@@ -8,6 +8,7 @@ class Lore:
     """
 
     def __init__(self):
+        self.version = 0  # Incremented on every change so derived prompt text can be refreshed
         self.world_rules = self._initialize_world_rules()
         self.character_backstories = self._initialize_character_backstories()
         self.key_events = self._initialize_key_events()
@@ -81,3 +82,19 @@ class Lore:
 
     def get_world_facts(self):
         return self.world_facts
+
+    def set_world_rule(self, rule_name, rule_text):
+        self.world_rules[rule_name] = rule_text
+        self.version += 1
+
+    def set_character_backstory(self, character_name, backstory):
+        self.character_backstories[character_name.lower()] = backstory
+        self.version += 1
+
+    def add_key_event(self, event_description):
+        self.key_events.append(event_description)
+        self.version += 1
+
+    def set_world_fact(self, fact_name, fact_text):
+        self.world_facts[fact_name] = fact_text
+        self.version += 1
@@ -0,0 +1,233 @@
+# lore_index.py
+
+import os
+import re
+from collections import Counter, namedtuple
+
+import numpy as np
+import yaml
+
+# A retrievable piece of lore. `context` names what the text is about (e.g., a character or place)
+# and is indexed together with the text.
+LoreFragment = namedtuple("LoreFragment", ["source", "key", "text", "context"])
+
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the their them they this to was "
+    "were with".split()
+)
+
+# YAML keys whose values are structured game data rather than prose worth retrieving
+_SKIPPED_YAML_KEYS = frozenset(["terrain", "properties", "x", "y", "width", "height"])
+
+# YAML keys whose text describes the enclosing entry itself, so the key adds nothing as context
+_PROSE_YAML_KEYS = frozenset(["description", "text", "backstory", "background"])
+
+
+def tokenize(text):
+    """
+    Splits text into lowercase terms for indexing, dropping common stopwords.
+    """
+    return [term for term in re.findall(r"[a-z0-9]+", text.lower()) if term not in _STOPWORDS]
+
+
+class LoreIndex:
+    """
+    BM25 retrieval index over the lore, used to put only the fragments relevant to the current action
+    into a prompt instead of the whole lore.
+
+    Postings for all terms are stored in flat numpy arrays with per-term offsets, and each posting's
+    BM25 weight is computed when the index is built, so a query only gathers the postings of its terms
+    and sums them per fragment.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        """
+        Initializes an empty LoreIndex.
+
+        Args:
+            k1 (float): BM25 term frequency saturation.
+            b (float): BM25 document length normalization.
+        """
+        self.k1 = k1
+        self.b = b
+        self.fragments = []
+        self._lore_fragments = []  # Fragments derived from the synced Lore
+        self._extra_fragments = []  # Fragments added from YAML files or directly
+        self._lore = None
+        self._lore_version = None
+        self._dirty = True
+        self._vocabulary = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._postings = np.zeros(0, dtype=np.int32)
+        self._weights = np.zeros(0, dtype=np.float32)
+
+    @classmethod
+    def from_lore(cls, lore, data_dir=None, **kwargs):
+        """
+        Builds an index over a Lore and, optionally, every YAML file in a data directory.
+
+        Args:
+            lore (Lore): The lore to index.
+            data_dir (str, optional): Directory whose .yaml files are indexed as well (e.g., "data").
+            **kwargs: BM25 parameters passed to the constructor.
+
+        Returns:
+            LoreIndex: The index.
+        """
+        index = cls(**kwargs)
+        index.sync(lore)
+        if data_dir is not None:
+            for file_name in sorted(os.listdir(data_dir)):
+                if file_name.endswith((".yaml", ".yml")):
+                    index.add_yaml(os.path.join(data_dir, file_name))
+        return index
+
+    def sync(self, lore):
+        """
+        Re-indexes the lore-derived fragments if the lore has changed since they were indexed.
+
+        Args:
+            lore (Lore): The lore to index.
+        """
+        if lore is self._lore and lore.version == self._lore_version:
+            return
+        fragments = [
+            LoreFragment("world_rules", name, rule, name.replace("_", " "))
+            for name, rule in lore.get_world_rules().items()
+        ]
+        fragments += [
+            LoreFragment("key_events", str(position), event, "")
+            for position, event in enumerate(lore.get_key_events())
+        ]
+        fragments += [
+            LoreFragment("world_facts", name, fact, name.replace("_", " "))
+            for name, fact in lore.get_world_facts().items()
+        ]
+        for name, backstory in lore.character_backstories.items():
+            label = " ".join(str(backstory.get(field, "")) for field in ("name", "alias")).strip() or name
+            fragments.append(LoreFragment("character_backstories", name, backstory.get("backstory", ""), label))
+            for position, motivation in enumerate(backstory.get("motivations", [])):
+                fragments.append(LoreFragment("character_backstories", f"{name}.motivations[{position}]", motivation, label))
+        self._lore_fragments = fragments
+        self._lore = lore
+        self._lore_version = lore.version
+        self._dirty = True
+
+    def add_fragment(self, source, key, text, context=""):
+        """
+        Adds a fragment that does not come from the Lore.
+
+        Args:
+            source (str): Where the fragment comes from (e.g., a file name).
+            key (str): Identifies the fragment within its source.
+            text (str): The fragment text.
+            context (str, optional): What the text is about.
+        """
+        self._extra_fragments.append(LoreFragment(source, key, text, context))
+        self._dirty = True
+
+    def add_yaml(self, file_path):
+        """
+        Adds every prose string in a YAML file as a fragment, labelled with the names of the entries
+        that contain it. Structured map data such as terrain cells is skipped.
+
+        Args:
+            file_path (str): Path of the YAML file.
+        """
+        with open(file_path, 'r') as file:
+            data = yaml.safe_load(file)
+        self._add_yaml_node(os.path.basename(file_path), data, "", [], 0)
+
+    def _add_yaml_node(self, source, node, key, labels, depth):
+        """
+        Walks a YAML node, adding its prose strings as fragments. `labels` collects the names of the
+        enclosing entries (or their keys, for unnamed mappings below the top level) as context.
+        """
+        if isinstance(node, dict):
+            named = isinstance(node.get("name"), str)
+            if named:
+                labels = labels + [node["name"]]
+            for child_key, child in node.items():
+                if child_key in _SKIPPED_YAML_KEYS or child_key == "name":
+                    continue
+                if isinstance(child, str):
+                    child_labels = labels if child_key in _PROSE_YAML_KEYS else labels + [str(child_key)]
+                elif named or depth == 0 or (isinstance(child, list) and not all(isinstance(item, str) for item in child)):
+                    # Collections such as "events" or "locations" say less than the entry names inside them
+                    child_labels = labels
+                else:
+                    child_labels = labels + [str(child_key)]
+                child_path = f"{key}.{child_key}" if key else str(child_key)
+                self._add_yaml_node(source, child, child_path, child_labels, depth + 1)
+        elif isinstance(node, list):
+            for position, child in enumerate(node):
+                self._add_yaml_node(source, child, f"{key}[{position}]", labels, depth + 1)
+        elif isinstance(node, str) and len(node.split()) > 2:
+            self.add_fragment(source, key, node, " ".join(labels[-2:]).replace("_", " "))
+
+    def build(self):
+        """
+        Rebuilds the postings from the current fragments. Called automatically by `search` after changes.
+        """
+        self.fragments = self._lore_fragments + self._extra_fragments
+        term_counts = [Counter(tokenize(f"{fragment.context} {fragment.text}")) for fragment in self.fragments]
+        lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+        average_length = float(lengths.mean()) if len(lengths) and lengths.mean() > 0 else 1.0
+
+        vocabulary = {}
+        documents = []
+        frequencies = []
+        for document, counts in enumerate(term_counts):
+            for term, frequency in counts.items():
+                term_id = vocabulary.setdefault(term, len(vocabulary))
+                if term_id == len(documents):
+                    documents.append([])
+                    frequencies.append([])
+                documents[term_id].append(document)
+                frequencies[term_id].append(frequency)
+
+        document_count = len(self.fragments)
+        sizes = np.array([len(postings) for postings in documents], dtype=np.int64)
+        self._offsets = np.concatenate(([0], np.cumsum(sizes)))
+        if documents:
+            self._postings = np.concatenate([np.asarray(postings, dtype=np.int32) for postings in documents])
+            term_frequency = np.concatenate([np.asarray(values, dtype=np.float32) for values in frequencies])
+        else:
+            self._postings = np.zeros(0, dtype=np.int32)
+            term_frequency = np.zeros(0, dtype=np.float32)
+        idf = np.log1p((document_count - sizes + 0.5) / (sizes + 0.5)).astype(np.float32)
+        length_norm = 1 - self.b + self.b * lengths[self._postings] / average_length
+        self._weights = np.repeat(idf, sizes) * term_frequency * (self.k1 + 1) / (term_frequency + self.k1 * length_norm)
+        self._vocabulary = vocabulary
+        self._dirty = False
+
+    def search(self, query, k=5):
+        """
+        Returns the fragments most relevant to a query.
+
+        Args:
+            query (str): Free text, e.g. the player's action and location.
+            k (int): Maximum number of fragments to return.
+
+        Returns:
+            list: (score, LoreFragment) pairs, best first. Fragments sharing no terms with the query are omitted.
+        """
+        if self._dirty:
+            self.build()
+        term_ids = {self._vocabulary[term] for term in tokenize(query) if term in self._vocabulary}
+        if not term_ids or k <= 0:
+            return []
+
+        documents = np.concatenate([self._postings[self._offsets[t]:self._offsets[t + 1]] for t in term_ids])
+        weights = np.concatenate([self._weights[self._offsets[t]:self._offsets[t + 1]] for t in term_ids])
+        scores = np.bincount(documents, weights=weights, minlength=len(self.fragments))
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(float(scores[document]), self.fragments[document]) for document in top]
+
+    def __len__(self):
+        return len(self._lore_fragments) + len(self._extra_fragments)
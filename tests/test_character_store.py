@@ -0,0 +1,270 @@
+# tests/test_character_store.py
+
+import gc
+import unittest
+
+import numpy as np
+
+from core.data_management.character_manager import Character, CharacterManager
+from core.data_management.character_store import CharacterStore
+from core.data_management.world_manager import Location, WorldManager
+
+
+class TestCharacterStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = CharacterStore(capacity=2)
+        self.core = Location("The City Core", "Towering skyscrapers.")
+
+    def test_character_handle_reads_and_writes_columns(self):
+        """
+        Tests that Character attributes are backed by the store's arrays.
+        """
+        glitch = Character("Glitch", {"friendly": True, "paranoid": True, "hostile": False}, self.core, store=self.store)
+        self.assertEqual(glitch.traits, {"friendly": True, "paranoid": True})
+        self.assertEqual(glitch.location, "The City Core")
+        glitch.update_health(-30)
+        glitch.update_state('natural_disaster')
+        self.assertEqual(self.store.health[glitch.id], 70)
+        self.assertEqual(self.store.moods[self.store.mood_codes[glitch.id]], 'anxious')
+        glitch.update_health(500)
+        self.assertEqual(glitch.health, 100)
+        self.assertEqual(Character.from_row(self.store, glitch.id), glitch)
+        with self.assertRaises(AttributeError):
+            glitch.nickname = "G"
+
+    def test_location_is_always_the_name(self):
+        """
+        Tests that characters placed by name and by Location object both report the location's name,
+        whichever form was registered first.
+        """
+        by_name = Character("Reggie", [], "The City Core", store=self.store)
+        by_object = Character("Arthur", [], self.core, store=self.store)
+        self.assertEqual((by_name.location, by_object.location), ("The City Core", "The City Core"))
+        by_name.change_location(Location("Old Docks", "Rusting cranes."))
+        self.assertEqual(by_name.location, "Old Docks")
+        self.assertEqual(self.store.rows_at("Old Docks"), [by_name.id])
+
+    def test_store_grows_and_reuses_rows(self):
+        """
+        Tests that adding past capacity grows the columns and removed rows are reused.
+        """
+        rows = [self.store.add(f"NPC {number}", ["Loyal"] if number % 2 else [], self.core) for number in range(10)]
+        self.assertGreaterEqual(self.store.capacity, 10)
+        self.assertEqual(len(self.store), 10)
+        self.assertEqual(list(np.flatnonzero(self.store.trait_mask("Loyal"))), rows[1::2])
+        self.store.remove(rows[3])
+        self.assertEqual(self.store.add("Newcomer"), rows[3])
+        self.assertEqual(self.store.location_ids[rows[3]], -1)
+        self.assertLess(self.store.nbytes() / self.store.capacity, 32)
+
+    def test_many_traits_use_extra_words(self):
+        """
+        Tests that more than 64 distinct traits are stored.
+        """
+        everyone = self.store.add("Everyone", [f"trait{number}" for number in range(130)])
+        row = self.store.add("Polymath", [f"trait{number}" for number in range(0, 130, 3)])
+        self.assertEqual(self.store.trait_bits.shape[1], 3)
+        self.assertTrue(self.store.has_trait(row, "trait129"))
+        self.assertFalse(self.store.has_trait(row, "trait128"))
+        self.assertEqual(len(self.store.traits_of(row)), 44)
+        self.assertEqual(len(self.store.traits_of(everyone)), 130)
+
+    def test_traits_change_in_place_and_are_boolean(self):
+        """
+        Tests that traits set or deleted in place are stored, and only booleans are accepted as trait values.
+        """
+        glitch = Character("Glitch", {"friendly": True}, store=self.store)
+        glitch.traits["hostile"] = True
+        del glitch.traits["friendly"]
+        self.assertEqual(glitch.traits, {"hostile": True})
+        self.assertTrue(Character.from_row(self.store, glitch.row).has_trait("hostile"))
+        with self.assertRaises(TypeError):
+            glitch.traits["paranoid"] = "yes"
+        with self.assertRaises(TypeError):
+            glitch.traits = {"hostile": "yes"}
+        with self.assertRaises(TypeError):
+            self.store.add("Reggie", {"brave": 1})
+        self.assertEqual(len(self.store), 1)
+        glitch.traits = {"paranoid": True, "hostile": False}
+        self.assertEqual(dict(glitch.traits), {"paranoid": True})
+
+    def test_relationships_change_in_place_and_name_anyone(self):
+        """
+        Tests that relationships set through the mapping are stored, and that relationships with
+        names not yet in the store add those characters, as the per-character dicts allowed.
+        """
+        glitch = Character("Glitch", {}, store=self.store)
+        reggie = Character("Reggie", {}, store=self.store)
+        glitch.relationships["Reggie"] = 5
+        glitch.adjust_relationship("Reggie", 2)
+        glitch.adjust_relationship("Stranger", -3)
+        self.assertEqual(glitch.relationships, {"Reggie": 7.0, "Stranger": -3.0})
+        self.assertEqual(self.store.relationships.get(glitch.id, reggie.id), 7.0)
+        self.assertEqual(self.store.names[self.store.row_of("Stranger")], "Stranger")
+        del glitch.relationships["Stranger"]
+        self.assertNotIn("Stranger", glitch.relationships)
+        self.assertEqual(reggie.relationships, {})
+        with self.assertRaises(KeyError):
+            glitch.relationships["Nobody"]
+
+    def test_health_is_clamped(self):
+        """
+        Tests that setting health outside [0, MAX_HEALTH] clamps it instead of overflowing the column.
+        """
+        glitch = Character("Glitch", {}, store=self.store)
+        glitch.health = 40000
+        self.assertEqual(glitch.health, 100)
+        glitch.health = -5
+        self.assertEqual(glitch.health, 0)
+        self.assertEqual(self.store.health[self.store.add("Giant", health=40000)], 100)
+
+    def test_handles_on_removed_characters_stop_working(self):
+        """
+        Tests that a handle on a removed character raises rather than reading whoever reuses its row.
+        """
+        glitch = Character("Glitch", {}, store=self.store)
+        stale = Character.from_row(self.store, glitch.row)
+        self.store.remove(glitch.row)
+        newcomer = Character("Newcomer", {}, store=self.store)
+        self.assertEqual(newcomer.row, glitch.row)
+        self.assertNotEqual(newcomer, stale)
+        for handle in (glitch, stale):
+            with self.assertRaises(KeyError):
+                handle.name
+            with self.assertRaises(KeyError):
+                handle.health = 50
+        self.assertEqual(newcomer.health, 100)
+        with self.assertRaises(KeyError):
+            self.store.remove(glitch.row + 5)
+
+    def test_names_point_to_surviving_rows(self):
+        """
+        Tests that removing one of several characters sharing a name leaves the name on the others.
+        """
+        first = self.store.add("Guard")
+        second = self.store.add("Guard")
+        third = self.store.add("Guard")
+        self.assertEqual(self.store.row_of("Guard"), first)
+        self.store.remove(first)
+        self.assertEqual(self.store.row_of("Guard"), second)
+        self.store.remove(second)
+        self.assertEqual(self.store.row_of("Guard"), third)
+        self.store.remove(third)
+        with self.assertRaises(KeyError):
+            self.store.row_of("Guard")
+
+    def test_default_store_rows_are_freed_with_their_handle(self):
+        """
+        Tests that characters created without a store leave the default store when their handle is collected.
+        """
+        from core.data_management import character_manager
+
+        before = len(character_manager._default_store)
+        wanderer = Character("Wanderer", {})
+        self.assertEqual(len(character_manager._default_store), before + 1)
+        del wanderer
+        gc.collect()
+        self.assertEqual(len(character_manager._default_store), before)
+
+
+class TestBatchUpdates(unittest.TestCase):
+
+    def setUp(self):
+        self.store = CharacterStore()
+        self.core = Location("The City Core", "Towering skyscrapers.")
+        self.rows = np.array([
+            self.store.add(f"NPC {number}", ["Resilient"] if number % 3 == 0 else [],
+                           self.core if number < 60 else "Old Street Enclave", health=10 + number)
+            for number in range(100)
+        ])
+
+    def test_disaster_at_a_location_reports_perished(self):
+        """
+        Tests that a health delta and mood reach only the selected characters, with health clamped.
+        """
+        at_core = self.store.select(location=self.core)
+        perished = self.store.apply_event('natural_disaster', at_core, health_delta=-30)
+        self.assertEqual(list(perished), list(self.rows[:21]))  # Health 10..30 falls to 0
+        self.assertEqual(int(self.store.health[self.rows[0]]), 0)
+        self.assertEqual(int(self.store.health[self.rows[59]]), 39)
+        self.assertEqual(int(self.store.health[self.rows[60]]), 70)
+        anxious = self.store.select(mood='anxious')
+        self.assertEqual(list(np.flatnonzero(anxious)), list(self.rows[:60]))
+
+    def test_thresholds_and_predicates(self):
+        """
+        Tests reporting several thresholds and selecting with a trait and a predicate.
+        """
+        resilient_and_weak = self.store.select(trait="Resilient", predicate=lambda store: store.health < 40)
+        self.assertEqual(list(np.flatnonzero(resilient_and_weak)), [0, 3, 6, 9, 12, 15, 18, 21, 24, 27])
+        crossed = self.store.update_health(-15, thresholds=(0, 50))
+        self.assertEqual(list(crossed[0]), list(self.rows[:6]))
+        self.assertEqual(list(crossed[50]), list(self.rows[41:56]))
+        self.assertEqual(int(self.store.health.max()), 85)  # Health above MAX_HEALTH is clamped when added
+        healed = self.store.update_health(1000, where=self.rows[:3])
+        self.assertEqual(len(healed[0]), 0)
+        self.assertEqual(list(self.store.health[self.rows[:3]]), [100, 100, 100])
+        self.assertEqual(len(self.store.set_mood('joyful', self.rows[:3])), 3)
+        self.assertEqual(len(self.store.set_mood('joyful', self.rows[:3])), 0)
+
+    def test_removed_rows_are_skipped(self):
+        """
+        Tests that explicit row arrays skip removed characters, together with their per-row deltas.
+        """
+        self.store.remove(int(self.rows[1]))
+        crossed = self.store.update_health(np.array([-10, -100, -20]), where=self.rows[:3])
+        self.assertEqual(list(crossed[0]), [self.rows[0], self.rows[2]])
+        self.assertEqual(int(self.store.health[self.rows[0]]), 0)
+        self.assertEqual(int(self.store.health[self.rows[2]]), 0)
+        self.assertEqual(list(self.store.set_mood('joyful', self.rows[:3])), [self.rows[0], self.rows[2]])
+        reused = self.store.add("Newcomer")
+        self.assertEqual(reused, self.rows[1])
+        self.assertEqual(self.store.moods[self.store.mood_codes[reused]], 'neutral')
+        self.assertEqual(int(self.store.health[reused]), 100)
+
+
+class TestLocationIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.world_manager = WorldManager({"locations": {
+            "The City Core": {"description": "Towering skyscrapers.", "connections": ["The Churn Districts"]},
+            "The Churn Districts": {"description": "Ever-changing streets.", "connections": ["The City Core"]}
+        }})
+        self.core = self.world_manager.get_location_details("The City Core")
+        self.churn = self.world_manager.get_location_details("The Churn Districts")
+        self.manager = CharacterManager({
+            "glitch": {"name": "Percy Hawthorne", "traits": ["Paranoid"], "location": self.core},
+            "reggie": {"name": "Reginald Clive", "traits": ["Disciplined"], "location": self.core},
+            "arthur": {"name": "Sir Arthur Travers Harris", "traits": ["Cunning"]}
+        })
+
+    def names_at(self, location):
+        return [character.name for character in self.manager.get_characters_in_location(location)]
+
+    def test_index_follows_moves(self):
+        """
+        Tests that change_location and move_player keep the location index current.
+        """
+        self.assertEqual(self.names_at("The City Core"), ["Percy Hawthorne", "Reginald Clive"])
+        self.assertEqual(self.names_at(self.churn), [])
+        self.manager.get_character("reggie").change_location(self.churn)
+        self.assertTrue(self.world_manager.move_player(self.manager.get_main_character(), "The Churn Districts"))
+        self.assertEqual(self.names_at(self.core), [])
+        self.assertEqual(self.names_at("The Churn Districts"), ["Reginald Clive", "Percy Hawthorne"])
+        self.manager.get_character("arthur").location = self.churn
+        self.assertEqual(len(self.names_at(self.churn)), 3)
+        self.assertEqual(self.names_at("Atlantis"), [])
+
+    def test_removed_characters_leave_the_index(self):
+        """
+        Tests that a removed character is no longer found at its location.
+        """
+        self.manager.store.remove(self.manager.get_character("glitch").row)
+        self.assertEqual(self.names_at(self.core), ["Reginald Clive"])
+        self.assertEqual(list(np.flatnonzero(self.manager.store.select(location=self.core))),
+                         [self.manager.get_character("reggie").row])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+# tests/test_context_packing.py
+
+import random
+import unittest
+
+from narrative.generation.context_packing import ContextItem, ContextPacker
+
+
+class TestContextPacker(unittest.TestCase):
+
+    def setUp(self):
+        self.packer = ContextPacker()
+
+    def test_packing_never_exceeds_the_budget(self):
+        """
+        Tests that the kept items never cost more than the budget, whatever the items and budget.
+        """
+        generator = random.Random(7)
+        kinds = ["world_rule", "lore", "active_event", "recent_action", "backstory"]
+        for _ in range(200):
+            items = [
+                ContextItem(generator.choice(kinds), " ".join(["word"] * generator.randint(1, 30)), generator.random())
+                for _ in range(generator.randint(0, 12))
+            ]
+            budget = generator.randint(0, 150)
+            packed = self.packer.pack(items, budget)
+            self.assertLessEqual(packed.tokens_used, budget)
+            self.assertEqual(packed.tokens_used, sum(self.packer.cost(item) for item in packed.items))
+            self.assertEqual(len(packed.items) + len(packed.dropped), len(items))
+
+    def test_lowest_ranked_items_are_dropped_first(self):
+        """
+        Tests that, among equally sized items, the lowest ranked kinds and priorities are dropped.
+        """
+        items = [
+            ContextItem("backstory", "one two three"),
+            ContextItem("recent_action", "one two three", 0.2),
+            ContextItem("world_rule", "one two three"),
+            ContextItem("recent_action", "one two three", 0.9),
+            ContextItem("active_event", "one two three")
+        ]
+        packed = self.packer.pack(items, 3 * 4)
+        self.assertEqual(packed.items, [items[2], items[3], items[4]])
+        self.assertEqual(packed.dropped, [items[0], items[1]])
+
+    def test_smaller_lower_ranked_items_fill_remaining_space(self):
+        """
+        Tests that an item too large for what is left is skipped while a smaller one still fits.
+        """
+        items = [
+            ContextItem("world_rule", "one two three four five"),
+            ContextItem("active_event", "one two three four five six"),
+            ContextItem("backstory", "one")
+        ]
+        packed = self.packer.pack(items, 8)
+        self.assertEqual(packed.items, [items[0], items[2]])
+        self.assertEqual(packed.tokens_used, 8)
+
+    def test_no_budget_keeps_everything_in_order(self):
+        """
+        Tests that without a budget every item is kept in its original order.
+        """
+        items = [ContextItem("backstory", "b"), ContextItem("world_rule", "a")]
+        packed = self.packer.pack(items, None)
+        self.assertEqual(packed.items, items)
+        self.assertEqual(packed.dropped, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+# tests/test_event_manager.py
+
+import threading
+import unittest
+
+from core.data_management.event_manager import EventManager
+from core.data_management.world_state import TrackedWorldState, WorldState
+
+
+class CountingCondition:
+    """
+    An event condition that counts how often it is evaluated.
+    """
+
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+        self.calls = 0
+
+    def __call__(self, world_state):
+        self.calls += 1
+        return world_state.get(self.key) == self.value
+
+
+class TestEventManager(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = EventManager()
+        self.conditions = {}
+        for number in range(100):
+            key = f"district_{number}_alert"
+            condition = self.conditions[f"lockdown_{number}"] = CountingCondition(key, "high")
+            self.manager.register_event(f"lockdown_{number}", condition, lambda world_state: None, depends_on=[key])
+        self.weather = CountingCondition("weather", "storm")
+        self.manager.register_event("natural_disaster", self.weather, lambda world_state: None, depends_on=["weather"])
+
+    def calls(self):
+        return sum(condition.calls for condition in self.conditions.values()) + self.weather.calls
+
+    def test_only_events_with_changed_inputs_are_evaluated(self):
+        """
+        Tests that a tracked world state re-evaluates only the events depending on changed keys.
+        """
+        world_state = TrackedWorldState(weather="clear")
+        self.manager.update_events(world_state)
+        self.assertEqual(self.calls(), 101)
+        self.manager.update_events(world_state)
+        self.assertEqual(self.calls(), 101)
+
+        world_state["weather"] = "storm"
+        world_state["district_7_alert"] = "high"
+        self.manager.update_events(world_state)
+        self.assertEqual(self.calls(), 103)
+        self.assertEqual(self.manager.get_active_events(), ["lockdown_7", "natural_disaster"])
+
+        world_state.pop("district_7_alert")
+        self.manager.update_events(world_state)
+        self.assertEqual(self.calls(), 104)
+        self.assertEqual(self.manager.get_active_events(), ["natural_disaster"])
+        self.assertTrue(self.manager.check_event("natural_disaster", world_state))
+
+    def test_new_events_undeclared_events_and_other_world_states(self):
+        """
+        Tests that new and undeclared events are evaluated and a different world state re-evaluates all.
+        """
+        world_state = TrackedWorldState()
+        self.manager.update_events(world_state)
+        undeclared = CountingCondition("festival", True)
+        self.manager.register_event("festival", undeclared, lambda world_state: None)
+        self.manager.update_events(world_state)
+        self.manager.update_events(world_state)
+        self.assertEqual(undeclared.calls, 2)
+        self.assertEqual(self.calls(), 101)
+        self.manager.update_events({"weather": "storm"})
+        self.assertEqual(self.calls(), 202)
+        self.assertEqual(self.manager.get_active_events(), ["natural_disaster"])
+
+    def test_world_state_snapshots_track_changes(self):
+        """
+        Tests incremental evaluation against successive location views of a WorldState.
+        """
+        state = WorldState({"weather": "clear"})
+        self.manager.update_events(state.snapshot().at_location("The City Core"))
+        state.set(("Old Street Enclave", "district_3_alert"), "high")
+        self.manager.update_events(state.snapshot().at_location("The City Core"))
+        self.assertEqual(self.calls(), 101)
+        state.set(("The City Core", "district_3_alert"), "high")
+        self.manager.update_events(state.snapshot().at_location("The City Core"))
+        self.assertEqual(self.calls(), 102)
+        self.assertEqual(self.manager.get_active_events(), ["lockdown_3"])
+        self.manager.update_events(state.snapshot().at_location("Old Street Enclave"))
+        self.assertEqual(self.calls(), 203)
+
+    def test_older_snapshot_and_alternating_locations(self):
+        """
+        Tests that an older snapshot is diffed against the newer one and that alternating location
+        views each stay incremental.
+        """
+        state = WorldState({"weather": "clear"})
+        old = state.snapshot()
+        state.set("weather", "storm")
+        self.manager.update_events(state.snapshot())
+        self.assertEqual(self.manager.get_active_events(), ["natural_disaster"])
+        self.manager.update_events(old)
+        self.assertEqual(self.manager.get_active_events(), [])
+        self.assertEqual(self.calls(), 102)
+
+        for location in ("The City Core", "Old Street Enclave"):
+            self.manager.update_events(state.snapshot().at_location(location))
+        calls = self.calls()
+        state.set(("Old Street Enclave", "district_5_alert"), "high")
+        for _ in range(3):
+            for location in ("The City Core", "Old Street Enclave"):
+                self.manager.update_events(state.snapshot().at_location(location))
+                active = self.manager.get_active_events()
+                expected = ["lockdown_5", "natural_disaster"] if location == "Old Street Enclave" else ["natural_disaster"]
+                self.assertEqual(active, expected)
+        self.assertEqual(self.calls(), calls + 1)
+
+    def test_effects_of_active_events_run_every_update(self):
+        """
+        Tests that an active event's effects run on updates that do not re-evaluate it.
+        """
+        applied = []
+        self.manager.register_event("curfew", CountingCondition("curfew", True),
+                                    lambda world_state: applied.append(world_state.version), depends_on=["curfew"])
+        world_state = TrackedWorldState(curfew=True)
+        self.manager.update_events(world_state)
+        world_state["weather"] = "fog"
+        self.manager.update_events(world_state)
+        self.manager.update_events(world_state)
+        self.assertEqual(applied, [0, 1, 1])
+        self.assertEqual(self.manager.events["curfew"]["conditions"].calls, 1)
+
+
+    def test_concurrent_updates_return_their_own_active_events(self):
+        """
+        Tests that updates of different location views running at the same time each return the
+        events active in their own view.
+        """
+        state = WorldState({"weather": "clear", ("Old Street Enclave", "district_5_alert"): "high"})
+        barrier = threading.Barrier(2)
+
+        def meet(world_state):
+            barrier.wait(timeout=5)
+            return False
+
+        self.manager.register_event("rendezvous", meet, lambda world_state: None)
+        results = {}
+
+        def update(location):
+            results[location] = self.manager.update_events(state.snapshot().at_location(location))
+
+        threads = [threading.Thread(target=update, args=(location,)) for location in ("The City Core", "Old Street Enclave")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, {"The City Core": [], "Old Street Enclave": ["lockdown_5"]})
+
+
+if __name__ == '__main__':
+    unittest.main()
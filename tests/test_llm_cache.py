@@ -0,0 +1,80 @@
+# tests/test_llm_cache.py
+
+import os
+import tempfile
+import unittest
+
+from narrative.generation.llm_cache import LLMResponseCache
+
+
+class FakeClock:
+    """
+    Manually advanced clock for expiring cache entries.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLLMResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = LLMResponseCache(max_entries=2, ttl=60, clock=self.clock)
+
+    def test_key_normalizes_prompt_and_includes_params(self):
+        """
+        Tests that whitespace differences share a key while different model parameters do not.
+        """
+        key = LLMResponseCache.make_key("In the  forest,\n Glitch explores", temperature=0.7)
+        self.assertEqual(key, LLMResponseCache.make_key("In the forest, Glitch explores ", temperature=0.7))
+        self.assertNotEqual(key, LLMResponseCache.make_key("In the forest, Glitch explores", temperature=0.9))
+
+    def test_hit_miss_and_lru_eviction(self):
+        """
+        Tests hit/miss counting and that the least recently used entry is evicted first.
+        """
+        self.assertIsNone(self.cache.get("a"))
+        self.cache.set("a", "text a")
+        self.cache.set("b", "text b")
+        self.assertEqual(self.cache.get("a"), "text a")
+        self.cache.set("c", "text c")
+
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), "text a")
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (2, 2, 1))
+
+    def test_ttl_expiry(self):
+        """
+        Tests that entries stop being served once their time-to-live has elapsed.
+        """
+        self.cache.set("a", "text a")
+        self.cache.set("b", "text b", ttl=600)
+        self.clock.now += 61
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.get("b"), "text b")
+        self.assertEqual(self.cache.stats()["expirations"], 1)
+
+    def test_disk_tier(self):
+        """
+        Tests that entries written to the SQLite tier are served by a fresh cache on the same file.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            db_path = os.path.join(directory, "llm_cache.sqlite")
+            first = LLMResponseCache(ttl=60, db_path=db_path, clock=self.clock)
+            first.set("a", "text a")
+            first.close()
+
+            second = LLMResponseCache(ttl=60, db_path=db_path, clock=self.clock)
+            self.assertEqual(second.get("a"), "text a")
+            self.assertEqual(second.stats()["disk_hits"], 1)
+            self.clock.now += 61
+            self.assertEqual(second.purge_expired(), 2)
+            second.close()
+
+if __name__ == '__main__':
+    unittest.main()
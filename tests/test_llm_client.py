@@ -0,0 +1,190 @@
+# tests/test_llm_client.py
+
+import asyncio
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from narrative.generation.llm_batcher import MicroBatcher
+from narrative.generation.llm_client import LLMClient, LLMRequestError, SyncLLMClient
+
+
+class StandInLLMHandler(BaseHTTPRequestHandler):
+    """
+    Minimal stand-in for the LLM service. Echoes the prompt back and records how many requests
+    were being handled at the same time.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+            server.requests += 1
+        try:
+            time.sleep(body.get("delay", 0))
+            if body.get("stream"):
+                lines = [json.dumps({"text": word + " "}) for word in body["prompt"].split()]
+                response = "\n".join(lines + [json.dumps({"done": True})]).encode()
+            elif "prompts" in body:
+                response = json.dumps({"texts": [f"echo: {prompt}" for prompt in body["prompts"]]}).encode()
+            else:
+                response = json.dumps({"text": f"echo: {body['prompt']}"}).encode()
+        finally:
+            with server.lock:
+                server.active -= 1
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up waiting (timeout tests)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestLLMClient(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Starts a stand-in LLM server on a free local port.
+        """
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInLLMHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.active = 0
+        self.server.peak = 0
+        self.server.requests = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}/generate"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_generate(self):
+        """
+        Tests that the generated text is returned from the service response.
+        """
+        async def scenario():
+            async with LLMClient(self.endpoint) as client:
+                return await client.generate("Hello")
+
+        self.assertEqual(asyncio.run(scenario()), "echo: Hello")
+
+    def test_in_flight_cap(self):
+        """
+        Tests that concurrent prompts overlap but never exceed the in-flight cap.
+        """
+        async def scenario():
+            async with LLMClient(self.endpoint, max_in_flight=4) as client:
+                return await asyncio.gather(*(client.generate(f"p{i}", delay=0.05) for i in range(12)))
+
+        started = time.perf_counter()
+        results = asyncio.run(scenario())
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(results, [f"echo: p{i}" for i in range(12)])
+        self.assertLessEqual(self.server.peak, 4)
+        self.assertGreater(self.server.peak, 1)
+        self.assertLess(elapsed, 12 * 0.05)
+
+    def test_timeout(self):
+        """
+        Tests that a slow response raises LLMRequestError once the per-request timeout elapses.
+        """
+        async def scenario():
+            async with LLMClient(self.endpoint) as client:
+                await client.generate("slow", timeout=0.05, delay=0.5)
+
+        with self.assertRaises(LLMRequestError):
+            asyncio.run(scenario())
+
+    def test_sync_wrapper(self):
+        """
+        Tests that blocking callers can share one client through SyncLLMClient.
+        """
+        client = SyncLLMClient(LLMClient(self.endpoint))
+        try:
+            self.assertEqual(client.generate("one"), "echo: one")
+            self.assertEqual(client.generate("two"), "echo: two")
+        finally:
+            client.close()
+        self.assertEqual(self.server.requests, 2)
+
+    def test_shared_loop_from_other_loops(self):
+        """
+        Tests that coroutines on other event loops can await and stream through the wrapper's loop,
+        alongside blocking callers.
+        """
+        client = SyncLLMClient(LLMClient(self.endpoint))
+
+        async def scenario():
+            text = await client.run_async(client.client.generate("async"))
+            chunks = [chunk async for chunk in client.relay(client.client.stream("a b c"))]
+            partial = client.relay(client.client.stream("x y z"))
+            first = await partial.__anext__()
+            await partial.aclose()
+            return text, chunks, first
+
+        try:
+            for _ in range(2):
+                # A fresh caller loop each time; the client stays on the wrapper's loop
+                self.assertEqual(asyncio.run(scenario()), ("echo: async", ["a ", "b ", "c "], "x "))
+            self.assertEqual(client.generate("blocking"), "echo: blocking")
+        finally:
+            client.close()
+
+    def test_stream(self):
+        """
+        Tests that streamed chunks are yielded in order as the service produces them.
+        """
+        async def scenario():
+            async with LLMClient(self.endpoint) as client:
+                return [chunk async for chunk in client.stream("the rain keeps falling")]
+
+        self.assertEqual(asyncio.run(scenario()), ["the ", "rain ", "keeps ", "falling "])
+
+    def test_micro_batching(self):
+        """
+        Tests that concurrent prompts are coalesced into batches and each caller gets its own text.
+        """
+        async def scenario():
+            async with LLMClient(self.endpoint) as client:
+                batcher = MicroBatcher(client, window=0.02, max_batch_size=8)
+                results = await asyncio.gather(*(batcher.submit(f"p{i}") for i in range(20)))
+                return results, batcher.metrics.snapshot()
+
+        results, metrics = asyncio.run(scenario())
+        self.assertEqual(results, [f"echo: p{i}" for i in range(20)])
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(metrics["batch_sizes"], {8: 2, 4: 1})
+        self.assertEqual(metrics["full_flushes"], 2)
+
+    def test_cancelled_batch_cancels_its_callers(self):
+        """
+        Tests that callers waiting on a batch whose send is cancelled are cancelled too, rather
+        than waiting forever.
+        """
+        async def scenario():
+            async with LLMClient(self.endpoint) as client:
+                batcher = MicroBatcher(client, window=0)
+                callers = [asyncio.ensure_future(batcher.submit(f"p{i}", delay=1)) for i in range(2)]
+                await asyncio.sleep(0.05)
+                for task in list(batcher._tasks):
+                    task.cancel()
+                return await asyncio.wait_for(asyncio.gather(*callers, return_exceptions=True), 0.5)
+
+        for result in asyncio.run(scenario()):
+            self.assertIsInstance(result, asyncio.CancelledError)
+
+if __name__ == '__main__':
+    unittest.main()
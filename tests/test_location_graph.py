@@ -0,0 +1,69 @@
+# tests/test_location_graph.py
+
+import unittest
+
+from core.data_management.location_graph import LocationGraph
+from core.data_management.world_manager import Location, WorldManager
+from core.data_management.character_manager import Character
+
+
+def build_locations(connections):
+    return {
+        name: Location(name, f"{name} description", connections=targets)
+        for name, targets in connections.items()
+    }
+
+
+class TestLocationGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.connections = {
+            "The City Core": ["The Churn Districts", "Old Street Enclave"],
+            "The Churn Districts": ["The City Core", "Back Alleys"],
+            "Old Street Enclave": ["The City Core", "Department of Obscure Computing"],
+            "Department of Obscure Computing": ["Old Street Enclave", "Nowhere"],
+            "Back Alleys": ["The Churn Districts", "Sealed Vault"],
+            "Sealed Vault": [],
+            "Island": []
+        }
+
+    def test_precomputed_and_on_demand_queries_agree(self):
+        """
+        Tests that all-pairs and memoized per-source searches give the same answers.
+        """
+        locations = build_locations(self.connections)
+        precomputed = LocationGraph(locations)
+        on_demand = LocationGraph(locations, all_pairs_limit=0, max_cached_sources=2)
+        self.assertIsNotNone(precomputed.distances)
+        self.assertIsNone(on_demand.distances)
+        for graph in (precomputed, on_demand):
+            self.assertEqual(graph.distance("The City Core", "Department of Obscure Computing"), 2)
+            self.assertEqual(graph.distance("Sealed Vault", "The City Core"), None)
+            self.assertEqual(graph.route("Department of Obscure Computing", "Sealed Vault"), [
+                "Department of Obscure Computing", "Old Street Enclave", "The City Core",
+                "The Churn Districts", "Back Alleys", "Sealed Vault"
+            ])
+            self.assertFalse(graph.is_reachable("The City Core", "Island"))
+            self.assertEqual(graph.reachable_from("Back Alleys")[:3],
+                             ["Back Alleys", "The Churn Districts", "Sealed Vault"])
+        self.assertEqual(precomputed.invalid_connections, [("Department of Obscure Computing", "Nowhere")])
+
+    def test_move_player_requires_a_connection(self):
+        """
+        Tests that WorldManager only moves the player along connections.
+        """
+        world_data = {"locations": {
+            name: {"description": name, "connections": targets} for name, targets in self.connections.items()
+        }}
+        world_manager = WorldManager(world_data)
+        player = Character("Glitch", {}, location=world_manager.get_location_details("The City Core"))
+        self.assertFalse(world_manager.move_player(player, "Back Alleys"))
+        self.assertEqual(player.location, "The City Core")
+        self.assertTrue(world_manager.move_player(player, "The Churn Districts"))
+        self.assertEqual(player.location, "The Churn Districts")
+        self.assertFalse(world_manager.move_player(player, "Atlantis"))
+        self.assertEqual(world_manager.get_distance("The Churn Districts", "Sealed Vault"), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# tests/test_lore_index.py
+
+import os
+import tempfile
+import unittest
+
+from narrative.lore.lore import Lore
+from narrative.lore.lore_index import LoreIndex
+
+
+class TestLoreIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.lore = Lore()
+        self.index = LoreIndex.from_lore(self.lore)
+
+    def test_search_ranks_relevant_lore_first(self):
+        """
+        Tests that the fragment sharing the most query terms is returned first.
+        """
+        results = self.index.search("ancient artifacts magic", k=2)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0][1].key, "magic")
+        self.assertGreaterEqual(results[0][0], results[1][0])
+
+    def test_search_omits_unrelated_fragments(self):
+        """
+        Tests that fragments sharing no terms with the query are not returned.
+        """
+        self.assertEqual(self.index.search("zeppelin", k=5), [])
+        self.assertEqual(len(self.index.search("artifacts", k=10)), 2)
+
+    def test_sync_reindexes_changed_lore(self):
+        """
+        Tests that lore changes are searchable after syncing.
+        """
+        self.lore.set_world_rule("weather", "Acid rain falls every night.")
+        self.assertEqual(self.index.search("acid rain", k=1), [])
+        self.index.sync(self.lore)
+        self.assertEqual(self.index.search("acid rain", k=1)[0][1].key, "weather")
+
+    def test_add_yaml_labels_fragments_with_entry_names(self):
+        """
+        Tests that YAML prose is indexed with the names of its entries and terrain data is skipped.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "world.yaml")
+            with open(path, "w") as file:
+                file.write(
+                    "world:\n"
+                    "  locations:\n"
+                    "    - name: Old Docks\n"
+                    "      description: Rusting cranes loom over the black water.\n"
+                    "  terrain:\n"
+                    "    - type: water near the docks\n"
+                )
+            self.index.add_yaml(path)
+
+        score, fragment = self.index.search("docks", k=5)[0]
+        self.assertEqual(fragment.context, "Old Docks")
+        self.assertEqual(fragment.key, "world.locations[0].description")
+        self.assertEqual(len(self.index.search("docks", k=5)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,252 @@
+# tests/test_map_manager.py
+
+import unittest
+
+import numpy as np
+
+from core.data_management.chunked_map import ChunkedMap
+from core.data_management.map_manager import MapSchema, generate_map
+from core.data_management.terrain_noise import value_noise
+
+
+class TestMapSchema(unittest.TestCase):
+
+    def setUp(self):
+        self.map = MapSchema("Test Map", 4, 3)
+        self.forest = {'movement_cost': 2, 'visibility': 0.7}
+        self.water = {'movement_cost': 0, 'visibility': 0.9}
+
+    def test_terrain_cells_read_back_through_view(self):
+        """
+        Tests that terrain added per cell reads back as {'type', 'properties'} dicts.
+        """
+        self.map.add_terrain(1, 2, 'forest', self.forest)
+        self.assertEqual(self.map.terrain[2][1], {'type': 'forest', 'properties': self.forest})
+        self.assertIsNone(self.map.terrain[0][0])
+        self.assertEqual(len(self.map.terrain), 3)
+        self.assertEqual(len(self.map.terrain[0]), 4)
+
+    def test_identical_terrain_shares_a_code(self):
+        """
+        Tests that cells with the same type and properties share one terrain code.
+        """
+        self.map.add_terrain(0, 0, 'forest', self.forest)
+        self.map.add_terrain(3, 2, 'forest', dict(self.forest))
+        self.map.add_terrain(1, 0, 'water', self.water)
+        self.assertEqual(self.map.terrain_codes[0, 0], self.map.terrain_codes[2, 3])
+        self.assertEqual(len(self.map.terrain_kinds), 3)  # Empty, forest and water
+
+    def test_whole_map_property_grids(self):
+        """
+        Tests that movement cost and visibility grids are looked up from the terrain codes.
+        """
+        forest = self.map.terrain_code('forest', self.forest)
+        water = self.map.terrain_code('water', self.water)
+        codes = np.full((3, 4), forest, dtype=np.uint8)
+        codes[1] = water
+        self.map.set_terrain_codes(codes)
+
+        costs = self.map.movement_cost_grid()
+        self.assertEqual(costs.shape, (3, 4))
+        self.assertTrue(np.all(costs[1] == 0))
+        self.assertTrue(np.all(costs[0] == 2))
+        self.assertAlmostEqual(float(self.map.visibility_grid()[1, 0]), 0.9, places=5)
+        self.assertEqual(int(self.map.terrain_type_mask('water').sum()), 4)
+
+    def test_out_of_bounds_and_unregistered_codes_are_rejected(self):
+        """
+        Tests that invalid coordinates and unknown terrain codes raise ValueError.
+        """
+        with self.assertRaises(ValueError):
+            self.map.add_terrain(4, 0, 'forest', self.forest)
+        with self.assertRaises(ValueError):
+            self.map.set_terrain_codes(np.full((3, 4), 7, dtype=np.uint8))
+
+
+class TestMapElements(unittest.TestCase):
+
+    def setUp(self):
+        self.map = MapSchema("Test Map", 100, 100)
+        self.drone = self.map.add_dynamic_element(10, 10, 'Surveillance Drone', {'detection_range': 3})
+        self.agent = self.map.add_dynamic_element(40, 40, 'Government Agent', {'detection_range': 2})
+        self.vendor = self.map.add_dynamic_element(12, 11, 'Street Vendor', {})
+        self.map.add_landmark(11, 10, 'Piccadilly Circus', 'Flickering billboards.', 'high')
+
+    def test_radius_nearest_and_rect_queries(self):
+        """
+        Tests spatial queries against the indexed dynamic elements and landmarks.
+        """
+        near = self.map.find_near(11, 10, 2.5)
+        self.assertEqual([element['type'] for element in near], ['Surveillance Drone', 'Street Vendor'])
+        nearest = self.map.find_nearest(38, 38, k=2)
+        self.assertEqual([element['id'] for element in nearest], [self.agent, self.vendor])
+        in_rect = self.map.find_in_rect(0, 0, 20, 20)
+        self.assertEqual({element['id'] for element in in_rect}, {self.drone, self.vendor})
+        self.assertEqual(self.map.find_near(10, 10, 1, layer='landmarks')[0]['name'], 'Piccadilly Circus')
+
+    def test_index_follows_moves_and_removals(self):
+        """
+        Tests that moved and removed elements are found at their new positions only.
+        """
+        self.map.move_element(self.drone, 80, 80)
+        self.assertEqual(self.map.get_element(self.drone)['x'], 80)
+        self.assertEqual([element['id'] for element in self.map.find_near(79, 79, 2)], [self.drone])
+        self.assertEqual([element['id'] for element in self.map.find_near(10, 10, 1.5)], [])
+
+        self.map.remove_element(self.vendor)
+        self.assertEqual(len(self.map.dynamic_elements), 2)
+        self.assertEqual(self.map.find_near(12, 11, 1), [])
+        with self.assertRaises(ValueError):
+            self.map.move_element(self.agent, 100, 0)
+
+    def test_removals_keep_the_layer_lists_in_step(self):
+        """
+        Tests that removing elements from the middle and end of a layer leaves exactly the others,
+        and that elements moved within the list by a removal can still be removed.
+        """
+        extra = [self.map.add_dynamic_element(30 + i, 30, 'Crowd', {}) for i in range(3)]
+        for element_id in (self.drone, extra[2], extra[0], self.agent):
+            self.map.remove_element(element_id)
+        self.assertCountEqual([element['id'] for element in self.map.dynamic_elements], [self.vendor, extra[1]])
+        self.map.remove_element(self.vendor)
+        self.map.remove_element(extra[1])
+        self.assertEqual(self.map.dynamic_elements, [])
+
+    def test_find_detecting_uses_each_detection_range(self):
+        """
+        Tests that only elements whose own detection range covers the position are returned.
+        """
+        self.assertEqual([element['id'] for element in self.map.find_detecting(12, 10)], [self.drone])
+        self.assertEqual(self.map.find_detecting(43, 40), [])
+
+
+class TestChangeJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.map = MapSchema("Test Map", 20, 20)
+        self.drone = self.map.add_dynamic_element(1, 1, 'Surveillance Drone', {'detection_range': 3})
+        self.vendor = self.map.add_dynamic_element(2, 2, 'Street Vendor', {})
+
+    def test_changes_since_returns_compacted_deltas(self):
+        """
+        Tests that repeated moves, add-then-remove pairs and repeated cell changes are compacted.
+        """
+        synced = self.map.version
+        self.assertEqual(synced, 2)
+        self.map.move_element(self.drone, 3, 3)
+        self.map.move_element(self.drone, 4, 4)
+        self.map.remove_element(self.vendor)
+        agent = self.map.add_dynamic_element(5, 5, 'Government Agent', {})
+        temporary = self.map.add_dynamic_element(6, 6, 'Crowd', {})
+        self.map.move_element(agent, 7, 7)
+        self.map.remove_element(temporary)
+        self.map.add_terrain(0, 0, 'water', {'movement_cost': 0})
+        self.map.add_terrain(0, 0, 'plain', {'movement_cost': 1})
+
+        changes = self.map.changes_since(synced)
+        self.assertEqual(changes['version'], self.map.version)
+        self.assertFalse(changes['full'])
+        self.assertEqual([(element['id'], element['x']) for element in changes['added']], [(agent, 7)])
+        self.assertEqual(changes['moved'], [(self.drone, 4, 4)])
+        self.assertEqual(changes['removed'], [self.vendor])
+        code = self.map.terrain_code('plain', {'movement_cost': 1})
+        self.assertEqual(changes['terrain'], [(0, 0, code)])
+        self.assertEqual(changes['terrain_kinds'], {code: ('plain', {'movement_cost': 1})})
+        self.assertEqual(self.map.changes_since(self.map.version)['moved'], [])
+
+    def test_old_versions_require_a_full_resync(self):
+        """
+        Tests that versions dropped from a bounded journal ask for the whole map.
+        """
+        game_map = MapSchema("Small Journal", 10, 10, journal_limit=4)
+        element = game_map.add_dynamic_element(0, 0, 'Drone', {})
+        for x in range(1, 8):
+            game_map.move_element(element, x, 0)
+        self.assertTrue(game_map.changes_since(0)['full'])
+        self.assertEqual(game_map.changes_since(game_map.version - 1)['moved'], [(element, 7, 0)])
+        with self.assertRaises(ValueError):
+            game_map.changes_since(game_map.version + 1)
+
+
+class TestGenerateMap(unittest.TestCase):
+
+    def test_same_seed_gives_same_map(self):
+        """
+        Tests that maps generated with the same seed are identical.
+        """
+        context = {'phase': 'exploration', 'recent_action': 'combat'}
+        first = generate_map("A", 64, 48, context, seed=11)
+        second = generate_map("A", 64, 48, context, seed=11)
+        self.assertTrue(np.array_equal(first.terrain_codes, second.terrain_codes))
+        self.assertEqual(first.landmarks, second.landmarks)
+        self.assertEqual(first.dynamic_elements, second.dynamic_elements)
+
+    def test_noise_terrain_is_coherent(self):
+        """
+        Tests that neighbouring cells mostly share terrain, unlike uniformly random terrain.
+        """
+        coherent = generate_map("A", 128, 128, {}, seed=5).terrain_codes
+        uniform = generate_map("A", 128, 128, {}, seed=5, noise_scale=None).terrain_codes
+        self.assertGreater(np.mean(coherent[:, 1:] == coherent[:, :-1]), 0.8)
+        self.assertLess(np.mean(uniform[:, 1:] == uniform[:, :-1]), 0.4)
+
+    def test_noise_windows_line_up_across_row_bands(self):
+        """
+        Tests that noise computed for a window equals the same cells of a larger window, including
+        windows wide enough to be filled in several bands of rows.
+        """
+        whole = value_noise(-5, 0, 1100, 130, seed=3)
+        window = value_noise(20, 41, 900, 70, seed=3)
+        self.assertTrue(np.array_equal(window, whole[41:111, 25:925]))
+        self.assertGreaterEqual(whole.min(), 0.0)
+        self.assertLess(whole.max(), 1.0)
+
+    def test_empty_maps(self):
+        """
+        Tests that maps without cells are generated empty, with nowhere to place landmarks or elements.
+        """
+        context = {'phase': 'exploration', 'recent_action': 'combat'}
+        for width, height in ((5, 0), (0, 0), (0, 5)):
+            for noise_scale in (16.0, None):
+                game_map = generate_map("Z", width, height, context, seed=1, noise_scale=noise_scale)
+                self.assertEqual(game_map.terrain_codes.shape, (height, width))
+                self.assertEqual((game_map.landmarks, game_map.dynamic_elements), ([], []))
+        self.assertEqual(value_noise(0, 0, 5, 0, seed=1).shape, (0, 5))
+
+    def test_landmarks_and_elements_are_placed_on_passable_terrain(self):
+        """
+        Tests that generated landmarks and dynamic elements are in bounds and not on water.
+        """
+        game_map = generate_map("A", 50, 50, {'phase': 'exploration', 'recent_action': 'combat'}, seed=2)
+        self.assertEqual(len(game_map.landmarks), 3)
+        self.assertEqual(len(game_map.dynamic_elements), 2)
+        costs = game_map.movement_cost_grid()
+        for placed in game_map.landmarks + game_map.dynamic_elements:
+            self.assertGreater(costs[placed['y'], placed['x']], 0)
+
+
+class TestChunkedMap(unittest.TestCase):
+
+    def test_chunks_match_a_fully_generated_map(self):
+        """
+        Tests that chunk-by-chunk terrain is seamless and equal to the same seed generated at once.
+        """
+        chunked = ChunkedMap("A", seed=9, chunk_size=16)
+        whole = generate_map("A", 70, 50, {}, seed=9)
+        self.assertTrue(np.array_equal(chunked.terrain_window(0, 0, 70, 50), whole.terrain_codes))
+
+    def test_memory_cap_evicts_and_edits_survive_regeneration(self):
+        """
+        Tests that the cache stays within its memory limit and edited cells are replayed after eviction.
+        """
+        chunked = ChunkedMap("A", seed=3, chunk_size=8, memory_limit=8 * 8 * 2)
+        chunked.add_terrain(-5, 4, 'lava', {'movement_cost': 0, 'visibility': 0.2})
+        for chunk_x in range(10):
+            chunked.get_chunk(chunk_x, 100)
+        self.assertLessEqual(chunked.memory_usage(), 8 * 8 * 2)
+        self.assertGreater(chunked.stats()["evictions"], 0)
+        self.assertEqual(chunked.get_terrain(-5, 4)['type'], 'lava')
+
+
+if __name__ == '__main__':
+    unittest.main()
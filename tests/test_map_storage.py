@@ -0,0 +1,75 @@
+# tests/test_map_storage.py
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from core.data_management.map_manager import TERRAIN_PROPERTIES, generate_map
+from core.data_management.map_storage import convert_yaml_map, load_map, save_map
+
+
+class TestMapStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "map.rtmap")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip_preserves_terrain_elements_and_metadata(self):
+        """
+        Tests that a saved map loads back with the same terrain, elements and metadata.
+        """
+        game_map = generate_map("Round Trip", 64, 48, {"phase": "exploration"}, seed=3)
+        save_map(game_map, self.path)
+        loaded = load_map(self.path)
+
+        self.assertEqual((loaded.name, loaded.width, loaded.height), ("Round Trip", 64, 48))
+        self.assertTrue(np.array_equal(loaded.terrain_codes, game_map.terrain_codes))
+        self.assertEqual(loaded.terrain_kinds, game_map.terrain_kinds)
+        self.assertEqual(loaded.landmarks, game_map.landmarks)
+        self.assertEqual(loaded.dynamic_elements, game_map.dynamic_elements)
+        self.assertEqual(loaded.metadata, game_map.metadata)
+        landmark = loaded.landmarks[0]
+        self.assertIn(landmark, loaded.find_near(landmark['x'], landmark['y'], 0, layer='landmarks'))
+
+    def test_memory_mapped_terrain_changes_stay_private(self):
+        """
+        Tests that editing a copy-on-write map does not change the file.
+        """
+        game_map = generate_map("Shared", 16, 16, {}, seed=5)
+        save_map(game_map, self.path)
+        loaded = load_map(self.path)
+        self.assertIsInstance(loaded.terrain_codes, np.memmap)
+        loaded.add_terrain(0, 0, 'water', TERRAIN_PROPERTIES['water'])
+        loaded.add_terrain(1, 0, 'mountain', TERRAIN_PROPERTIES['mountain'])
+        self.assertEqual(loaded.get_terrain(1, 0)['type'], 'mountain')
+        self.assertTrue(np.array_equal(load_map(self.path, mmap_mode=None).terrain_codes, game_map.terrain_codes))
+
+    def test_convert_yaml_map(self):
+        """
+        Tests converting the bundled YAML map.
+        """
+        yaml_path = os.path.join(os.path.dirname(__file__), "..", "data", "map.yaml")
+        converted = convert_yaml_map(yaml_path, self.path)
+        loaded = load_map(self.path)
+        self.assertEqual(loaded.get_terrain(2, 0), converted.get_terrain(2, 0))
+        self.assertEqual([landmark['name'] for landmark in loaded.landmarks],
+                         [landmark['name'] for landmark in converted.landmarks])
+        self.assertEqual(loaded.metadata, converted.metadata)
+
+    def test_rejects_other_files(self):
+        """
+        Tests that a file without the map header is rejected.
+        """
+        with open(self.path, 'wb') as file:
+            file.write(b"not a map" * 16)
+        with self.assertRaises(ValueError):
+            load_map(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
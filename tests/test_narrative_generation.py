@@ -0,0 +1,200 @@
+# tests/test_narrative_generation.py
+
+import asyncio
+import unittest
+from collections import namedtuple
+
+from core.data_management.world_manager import WorldManager
+from narrative.generation.Narrative_generator import NarrativeGenerator
+from narrative.generation.speculation import SpeculativeGenerator
+
+Character = namedtuple("Character", ["name"])
+
+LOCATIONS = {"locations": {
+    "Old Docks": {"description": "Rusting cranes over black water.", "connections": []},
+    "The City Core": {"description": "Towering skyscrapers.", "connections": []}
+}}
+
+
+class StandInStructuring:
+    """
+    Stand-in for NarrativeStructuring that predicts the same next actions every turn.
+    """
+
+    def create_structure(self, player_action, characters, world_state):
+        return {"branching_paths": ["hide", "run"], "event_triggers": []}
+
+
+class StandInCharacters:
+    """
+    Stand-in for CharacterManager; `before_prompt` runs whenever a prompt is being built.
+    """
+
+    def __init__(self):
+        self.before_prompt = None
+
+    def get_characters_in_location(self, location):
+        return []
+
+    def get_main_character(self):
+        if self.before_prompt is not None:
+            self.before_prompt()
+        return Character("Reggie")
+
+
+class StandInIntegration:
+    """
+    Stand-in for LLMIntegration that answers every prompt with its per-turn part.
+    """
+
+    max_in_flight = 8
+    in_flight = 0
+
+    def has_idle_capacity(self, fraction):
+        return True
+
+    async def generate_prompt_async(self, prompt, timeout=None):
+        return f"narrative for {prompt.suffix}"
+
+
+class TestNarrativeGeneratorSpeculation(unittest.TestCase):
+
+    def setUp(self):
+        self.world_manager = WorldManager(LOCATIONS)
+        self.characters = StandInCharacters()
+        self.speculator = SpeculativeGenerator(StandInIntegration())
+        self.generator = NarrativeGenerator(StandInStructuring(), self.characters, self.world_manager,
+                                            speculator=self.speculator)
+
+    def turn(self, action, location="Old Docks"):
+        async def scenario():
+            chunks = [chunk async for chunk in self.generator.stream_narrative(action, location, session_id="session")]
+            await asyncio.sleep(0.01)
+            return "".join(chunks)
+
+        return asyncio.run(scenario())
+
+    def test_writes_elsewhere_keep_speculations(self):
+        """
+        Tests that writes to another location's keys neither cancel a location's speculations nor
+        make them stale, while writes to its own keys do.
+        """
+        self.turn("search the cranes")
+        self.world_manager.set_state("alarm", "raised", location_name="The City Core")
+        self.assertEqual(self.speculator.locations(), {"Old Docks"})
+        text = self.generator.generate_narrative("hide", "Old Docks", session_id="session")
+        self.assertTrue(text.startswith("narrative for"))
+        self.assertEqual(self.speculator.metrics.hits, 1)
+
+        self.world_manager.set_state("tide", "high", location_name="Old Docks")
+        self.assertEqual(self.speculator.locations(), set())
+        self.assertGreater(self.speculator.metrics.wasted_tokens, 0)
+
+    def test_world_wide_writes_invalidate_every_location(self):
+        """
+        Tests that a write to a world-wide key cancels the speculations of every location.
+        """
+        self.turn("search the cranes")
+        self.world_manager.set_state("weather", "storm")
+        self.assertEqual(self.speculator.locations(), set())
+
+    def test_speculations_are_stamped_with_the_state_they_were_built_from(self):
+        """
+        Tests that a write landing while speculative prompts are built leaves them stale rather than
+        stamped with the newer state.
+        """
+        writes = []
+
+        def write_once():
+            if len(writes) == 1:
+                # The turn's own prompt is built first; write while the speculations are built
+                self.world_manager.state.unsubscribe(self.generator._on_world_state_change)
+                self.world_manager.set_state("tide", "high", location_name="Old Docks")
+            writes.append(None)
+
+        self.characters.before_prompt = write_once
+        self.turn("search the cranes")
+        self.characters.before_prompt = None
+        text = self.generator.generate_narrative("hide", "Old Docks", session_id="session")
+        self.assertFalse(text.startswith("narrative for"))
+        self.assertEqual(self.speculator.metrics.stale, 1)
+
+
+
+class CachingIntegration:
+    """
+    Stand-in for LLMIntegration that streams each response in two chunks and answers repeated prompts
+    from a cache, recording the prompts that reached the "LLM".
+    """
+
+    def __init__(self):
+        self.cache = {}
+        self.sent = []
+
+    def _respond(self, prompt):
+        self.sent.append(prompt.suffix)
+        return f"The LLM narrates: {prompt.suffix}"
+
+    def generate_prompt(self, prompt):
+        if prompt.text not in self.cache:
+            self.cache[prompt.text] = self._respond(prompt)
+        return self.cache[prompt.text]
+
+    async def stream_prompt(self, prompt):
+        if prompt.text in self.cache:
+            yield self.cache[prompt.text]
+            return
+        text = self._respond(prompt)
+        middle = len(text) // 2
+        for chunk in (text[:middle], text[middle:]):
+            yield chunk
+        self.cache[prompt.text] = text
+
+
+class TestNarrativeGeneratorLLM(unittest.TestCase):
+
+    def setUp(self):
+        self.integration = CachingIntegration()
+        self.generator = NarrativeGenerator(StandInStructuring(), StandInCharacters(), WorldManager(LOCATIONS),
+                                            llm_integration=self.integration)
+
+    def stream(self, action, location="Old Docks"):
+        async def scenario():
+            return [chunk async for chunk in self.generator.stream_narrative(action, location)]
+
+        return asyncio.run(scenario())
+
+    def test_blocking_and_streamed_narrative_come_from_the_llm(self):
+        """
+        Tests that generate_narrative and stream_narrative both send the prompt through the
+        integration and give the same text for the same action, sharing its cache.
+        """
+        text = self.generator.generate_narrative("search the cranes", "Old Docks")
+        self.assertTrue(text.startswith("The LLM narrates:"))
+        self.assertEqual(self.stream("search the cranes"), [text])
+        self.assertEqual(len(self.integration.sent), 1)
+
+    def test_streamed_narrative_arrives_in_chunks(self):
+        """
+        Tests that an uncached streamed narrative is yielded chunk by chunk, and that the blocking
+        path then answers the same action from the cache.
+        """
+        chunks = self.stream("hide")
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(self.generator.generate_narrative("hide", "Old Docks"), "".join(chunks))
+        self.assertEqual(len(self.integration.sent), 1)
+
+    def test_without_an_integration_both_paths_give_the_placeholder(self):
+        """
+        Tests that without an integration both entry points give the same placeholder narrative.
+        """
+        generator = NarrativeGenerator(StandInStructuring(), StandInCharacters(), WorldManager(LOCATIONS))
+
+        async def scenario():
+            return [chunk async for chunk in generator.stream_narrative("hide", "Old Docks")]
+
+        self.assertEqual(asyncio.run(scenario()), [generator.generate_narrative("hide", "Old Docks")])
+
+
+if __name__ == '__main__':
+    unittest.main()
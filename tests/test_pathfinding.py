@@ -0,0 +1,112 @@
+# tests/test_pathfinding.py
+
+import math
+import unittest
+
+import numpy as np
+
+from core.data_management.map_manager import MapSchema, TERRAIN_PROPERTIES, generate_map
+from core.data_management.pathfinding import Pathfinder
+
+
+def build_map(rows):
+    """
+    Builds a map from strings where '.' is plain, 'f' forest and '~' water.
+    """
+    types = {'.': 'plain', 'f': 'forest', '~': 'water'}
+    game_map = MapSchema("Test Map", len(rows[0]), len(rows))
+    for y, row in enumerate(rows):
+        for x, symbol in enumerate(row):
+            game_map.add_terrain(x, y, types[symbol], TERRAIN_PROPERTIES[types[symbol]])
+    return game_map
+
+
+class TestPathfinder(unittest.TestCase):
+
+    def setUp(self):
+        self.map = build_map([
+            ".....",
+            ".~~~.",
+            ".~.~.",
+            ".~~~.",
+            "..f.."
+        ])
+        self.pathfinder = Pathfinder(self.map)
+
+    def test_path_avoids_water_and_prefers_cheap_terrain(self):
+        """
+        Tests that A* walks around water and that its cost matches the distance field.
+        """
+        path = self.pathfinder.find_path((0, 2), (4, 2))
+        self.assertEqual(path[0], (0, 2))
+        self.assertEqual(path[-1], (4, 2))
+        costs = self.pathfinder.cost_array()
+        self.assertTrue(all(costs[y, x] > 0 for x, y in path))
+        path_cost = sum(costs[y, x] for x, y in path[1:])
+        self.assertEqual(path_cost, self.pathfinder.distance_field((4, 2)).distance(0, 2))
+
+    def test_unreachable_goal_returns_none(self):
+        """
+        Tests that an enclosed cell cannot be reached.
+        """
+        self.assertIsNone(self.pathfinder.find_path((0, 0), (2, 2)))
+        self.assertEqual(self.pathfinder.distance_field((0, 0)).distance(2, 2), math.inf)
+
+    def test_cached_field_is_repaired_after_terrain_changes(self):
+        """
+        Tests that incremental repair gives the same distances as computing a field from scratch.
+        """
+        field = self.pathfinder.distance_field((2, 2))
+        self.map.add_terrain(2, 1, 'plain', TERRAIN_PROPERTIES['plain'])  # Open the enclosure
+        self.assertEqual(field.distance(0, 0), 4)
+        self.map.add_terrain(2, 0, 'water', TERRAIN_PROPERTIES['water'])  # Block the way in again
+        self.map.add_terrain(1, 0, 'forest', TERRAIN_PROPERTIES['forest'])
+
+        fresh = Pathfinder(self.map).distance_field((2, 2)).as_array()
+        self.assertTrue(np.array_equal(field.as_array(), fresh))
+        self.assertIs(self.pathfinder.distance_field((2, 2)), field)
+
+    def test_repair_matches_recomputation_on_random_edits(self):
+        """
+        Tests incremental repair against recomputation over many random terrain edits.
+        """
+        game_map = generate_map("Random", 30, 20, {}, seed=8, noise_scale=None)
+        game_map.add_terrain(15, 10, 'plain', TERRAIN_PROPERTIES['plain'])
+        pathfinder = Pathfinder(game_map, diagonal=True)
+        field = pathfinder.distance_field((15, 10))
+        rng = np.random.default_rng(1)
+        types = list(TERRAIN_PROPERTIES)
+        for _ in range(100):
+            x, y = int(rng.integers(30)), int(rng.integers(20))
+            if (x, y) == (15, 10):
+                continue
+            terrain_type = types[int(rng.integers(len(types)))]
+            game_map.add_terrain(x, y, terrain_type, TERRAIN_PROPERTIES[terrain_type])
+        fresh = Pathfinder(game_map, diagonal=True).distance_field((15, 10)).as_array()
+        self.assertTrue(np.allclose(field.as_array(), fresh, equal_nan=True))
+
+    def test_flow_field_moves_agents_to_the_goal(self):
+        """
+        Tests that agents following a flow field all arrive at the goal.
+        """
+        flow = self.pathfinder.flow_field((4, 4))
+        xs, ys = np.array([0, 4, 0]), np.array([0, 0, 4])
+        for _ in range(10):
+            xs, ys = flow.step(xs, ys)
+        self.assertTrue(np.all(xs == 4) and np.all(ys == 4))
+
+    def test_patrol_route_visits_waypoints_in_a_loop(self):
+        """
+        Tests that a patrol route joins the legs between waypoints and returns to the start.
+        """
+        route = self.pathfinder.patrol_route([(0, 0), (4, 0), (4, 4)])
+        self.assertEqual(route[0], (0, 0))
+        self.assertEqual(route[-1], (0, 0))
+        self.assertIn((4, 0), route)
+        self.assertIn((4, 4), route)
+        for (x0, y0), (x1, y1) in zip(route, route[1:]):
+            self.assertEqual(abs(x1 - x0) + abs(y1 - y0), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+# tests/test_prompt_manager.py
+
+import unittest
+from collections import namedtuple
+
+from core.utils.text_processing import estimate_tokens
+from narrative.lore.lore_index import LoreIndex
+
+from narrative.generation.PromptManager import PromptManager
+
+Character = namedtuple("Character", ["name"])
+
+STATE = {
+    "location": "Old Docks",
+    "action_description": "searches the rusting cranes",
+    "character_backstories": {"Reggie": {}, "Arthur": {}},
+    "recent_actions": ["picked a lock", "hid from a patrol", "bribed a guard"],
+    "active_events": ["curfew"]
+}
+
+
+class TestPromptManagerPrefix(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = PromptManager(None, {})
+
+    def test_prefix_is_reused_across_actions(self):
+        """
+        Tests that prompts for different actions share the same memoized lore preamble.
+        """
+        first = self.manager.create_prompt_parts("action", Character("Glitch"), {"action_description": "hides"})
+        second = self.manager.create_prompt_parts("dialogue", Character("Glitch"), {"dialogue": "Who's there?"})
+        self.assertIs(first.prefix, second.prefix)
+        self.assertTrue(first.prefix.startswith("World rules to consider: "))
+        self.assertNotEqual(first.suffix, second.suffix)
+        self.assertEqual(first.text, first.prefix + first.suffix)
+
+    def test_prefix_is_rebuilt_when_lore_changes(self):
+        """
+        Tests that a lore change invalidates the memoized preamble.
+        """
+        before = self.manager.create_prompt_parts("action", Character("Glitch"), {}).prefix
+        self.manager.lore.set_world_rule("weather", "Acid rain falls every night.")
+        after = self.manager.create_prompt_parts("action", Character("Glitch"), {}).prefix
+        self.assertNotIn("Acid rain", before)
+        self.assertIn("Acid rain falls every night.", after)
+        self.assertIs(after, self.manager.create_prompt_parts("action", Character("Glitch"), {}).prefix)
+
+
+class TestPromptManagerBudget(unittest.TestCase):
+
+    def assertWithinBudget(self, manager, state):
+        for budget in range(0, 160, 3):
+            manager.token_budget = budget
+            parts = manager.create_prompt_parts("action", Character("Glitch"), state)
+            kept_tokens = estimate_tokens(parts.text)
+            # Only the fixed text (preamble and scenario) may exceed a budget too small to hold it
+            manager.token_budget = 0
+            fixed_tokens = estimate_tokens(manager.create_prompt_parts("action", Character("Glitch"), state).text)
+            self.assertLessEqual(kept_tokens, max(budget, fixed_tokens), budget)
+
+    def test_prompt_stays_within_budget(self):
+        """
+        Tests that packed prompts never exceed the token budget, with world rules in the preamble.
+        """
+        self.assertWithinBudget(PromptManager(None, {}), STATE)
+
+    def test_prompt_with_lore_index_stays_within_budget(self):
+        """
+        Tests that packed prompts never exceed the token budget when lore is retrieved instead.
+        """
+        self.assertWithinBudget(PromptManager(None, {}, lore_index=LoreIndex()), STATE)
+
+    def test_lore_index_prompts_do_not_reserve_the_world_rules_heading(self):
+        """
+        Tests that a budget just large enough for the whole prompt keeps all context when the world
+        rules section is left out of the preamble.
+        """
+        manager = PromptManager(None, {}, lore_index=LoreIndex())
+        state = {"location": "Old Docks", "action_description": "waits", "active_events": ["curfew"]}
+        unlimited = manager.create_prompt_parts("action", Character("Glitch"), state)
+        self.assertNotIn("World rules to consider", unlimited.prefix)
+
+        # The one context item costs its tokens plus one for its separator
+        manager.token_budget = estimate_tokens(unlimited.text) + 1
+        parts = manager.create_prompt_parts("action", Character("Glitch"), state)
+        self.assertEqual(parts, unlimited)
+        self.assertEqual(parts.dropped, ())
+
+    def test_tight_budget_drops_lowest_ranked_context(self):
+        """
+        Tests that backstories of other characters are dropped before recent actions and events.
+        """
+        manager = PromptManager(None, {}, token_budget=90)
+        parts = manager.create_prompt_parts("action", Character("Glitch"), STATE)
+        dropped_kinds = {item.kind for item in parts.dropped}
+        self.assertIn("backstory", dropped_kinds)
+        self.assertNotIn("world_rule", dropped_kinds)
+        self.assertIn("Ongoing event: curfew.", parts.suffix)
+
+
+class TestPromptManagerLoreIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = PromptManager(None, {}, lore_index=LoreIndex(), lore_top_k=3)
+
+    def test_relevant_lore_replaces_world_rules(self):
+        """
+        Tests that prompts include retrieved lore relevant to the action instead of every world rule.
+        """
+        state = {"location": "vault", "action_description": "studies the ancient artifacts"}
+        parts = self.manager.create_prompt_parts("action", Character("Glitch"), state)
+        self.assertNotIn("World rules to consider", parts.prefix)
+        self.assertIn("magic: Magic is real but only accessible through ancient artifacts.", parts.suffix)
+        self.assertNotIn("social classes", parts.suffix)
+
+    def test_index_follows_lore_changes(self):
+        """
+        Tests that lore added after the manager was created is retrieved.
+        """
+        self.manager.lore.set_world_rule("weather", "Acid rain falls over the docks every night.")
+        parts = self.manager.create_prompt_parts("action", Character("Glitch"), {"action_description": "acid rain"})
+        self.assertIn("Acid rain falls over the docks every night.", parts.suffix)
+
+    def test_own_and_present_backstories_are_not_retrieved_twice(self):
+        """
+        Tests that backstories already in the prompt, for the character or others present, are not
+        retrieved again as lore.
+        """
+        reggie = self.manager.lore.get_character_backstory("Reggie")["backstory"]
+        glitch = self.manager.lore.get_character_backstory("Glitch")["backstory"]
+        state = {"action_description": "detective justice hacker professor mysterious past"}
+
+        alone = self.manager.create_prompt_parts("action", Character("Glitch"), state)
+        self.assertEqual(alone.text.count(reggie), 1)
+        self.assertEqual(alone.text.count(glitch), 1)
+
+        state["character_backstories"] = {"Reggie": {}}
+        together = self.manager.create_prompt_parts("action", Character("Glitch"), state)
+        self.assertEqual(together.text.count(reggie), 1)
+        self.assertIn(f"Reggie's background: {reggie}", together.suffix)
+        self.assertEqual(together.text.count(glitch), 1)
+
+    def test_present_characters_motivations_are_not_retrieved(self):
+        """
+        Tests that no fragment of a present character's backstory, motivations included, is retrieved
+        as lore, while another character's motivations still are.
+        """
+        state = {"action_description": "maintaining order seeking redemption preserving stability",
+                 "character_backstories": {"Reggie": {}}}
+        parts = self.manager.create_prompt_parts("action", Character("Glitch"), state)
+        self.assertNotIn("Reggie: maintaining order", parts.suffix)
+        self.assertNotIn("Reggie: seeking redemption", parts.suffix)
+        self.assertIn("Arthur: preserving stability", parts.suffix)
+
+
+if __name__ == '__main__':
+    unittest.main()
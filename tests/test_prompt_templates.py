@@ -0,0 +1,68 @@
+# tests/test_prompt_templates.py
+
+import unittest
+
+from narrative.generation.prompt_templates import CompiledTemplate
+
+LORE_FIELDS = {"world_rules": "magic is rare", "key_events": "The Collapse.", "world_facts": "sky: red"}
+
+
+class TestCompiledTemplate(unittest.TestCase):
+
+    def assertRendersLikeFormat(self, source, values):
+        compiled = CompiledTemplate(source, LORE_FIELDS, lore_version=0)
+        self.assertEqual(compiled.render(values), source.format(**LORE_FIELDS, **values))
+        return compiled
+
+    def test_lore_fields_are_substituted_at_compile_time(self):
+        """
+        Tests that lore fields are filled in when compiling and only the other fields remain.
+        """
+        compiled = self.assertRendersLikeFormat(
+            "Rules: {world_rules}. {character_name} ({mood}) at 100% effort.",
+            {"character_name": "Glitch", "mood": "curious"}
+        )
+        self.assertEqual(compiled.fields, frozenset({"character_name", "mood"}))
+
+    def test_lore_fields_with_conversion_or_format_spec(self):
+        """
+        Tests that lore fields with a conversion or format spec are resolved at compile time too.
+        """
+        for source in ("{world_rules!s}", "{world_rules!r}", "[{world_rules:>20}]", "{key_events!r:^30}"):
+            with self.subTest(source=source):
+                compiled = self.assertRendersLikeFormat(source + " {action}", {"action": "waits"})
+                self.assertEqual(compiled.fields, frozenset({"action"}))
+
+    def test_value_fields_with_conversion_and_format_spec(self):
+        """
+        Tests conversions and format specs on fields filled at render time.
+        """
+        self.assertRendersLikeFormat(
+            "{name!r} has {health:03d} health, {ratio:.1%} of {location!s:>8}",
+            {"name": "Glitch", "health": 7, "ratio": 0.25, "location": "Core"}
+        )
+
+    def test_attribute_lookups_fall_back_to_format(self):
+        """
+        Tests that templates with attribute or index lookups still render, with lore fields available.
+        """
+        class Character:
+            name = "Glitch"
+
+        compiled = self.assertRendersLikeFormat(
+            "{character.name} knows {world_rules}; {items[0]}",
+            {"character": Character(), "items": ["a map"]}
+        )
+        self.assertEqual(compiled.fields, frozenset({"character", "world_rules", "items"}))
+
+    def test_missing_value_raises_key_error(self):
+        """
+        Tests that rendering without a value for a non-lore field raises KeyError.
+        """
+        compiled = CompiledTemplate("{world_rules} {action}", LORE_FIELDS, lore_version=0)
+        with self.assertRaises(KeyError):
+            compiled.render({})
+
+
+if __name__ == '__main__':
+    unittest.main()
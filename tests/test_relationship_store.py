@@ -0,0 +1,123 @@
+# tests/test_relationship_store.py
+
+import unittest
+
+import numpy as np
+
+from core.data_management.character_manager import Character
+from core.data_management.character_store import CharacterStore
+from core.data_management.relationship_store import RelationshipStore
+
+
+class TestRelationshipStore(unittest.TestCase):
+
+    def setUp(self):
+        self.relationships = RelationshipStore(capacity=2)
+        for target, value in [(1, 5), (2, -3), (3, 8), (4, -9), (5, 1)]:
+            self.relationships.adjust(0, target, value)
+        self.relationships.adjust(1, 0, 4)
+        self.relationships.adjust(3, 6, 7)
+
+    def test_adjust_and_top_k(self):
+        """
+        Tests pair updates and the strongest allies and enemies.
+        """
+        self.assertEqual(self.relationships.adjust(0, 1, 2), 7)
+        self.assertEqual(self.relationships.get(0, 1), 7)
+        self.assertEqual(self.relationships.get(1, 2), 0)
+        self.assertEqual(self.relationships.top_allies(0, k=2), [(3, 8.0), (1, 7.0)])
+        self.assertEqual(self.relationships.top_enemies(0), [(4, -9.0), (2, -3.0)])
+        sources, values = self.relationships.incoming(0)
+        self.assertEqual((list(sources), list(values)), ([1], [4.0]))
+
+    def test_decay_prunes_weak_pairs(self):
+        """
+        Tests that decay scales every value and removes the ones that become negligible.
+        """
+        removed = self.relationships.decay(0.5, prune_below=1.0)
+        self.assertEqual(removed, 1)
+        self.assertEqual(len(self.relationships), 6)
+        self.assertEqual(self.relationships.get(0, 3), 4.0)
+        self.assertEqual(self.relationships.get(0, 5), 0.0)
+        targets, _ = self.relationships.outgoing(0)
+        self.assertEqual(sorted(targets), [1, 2, 3, 4])
+
+    def test_neighbourhood_and_removal(self):
+        """
+        Tests neighbourhood extraction and removing a character's relationships.
+        """
+        edges = self.relationships.neighbourhood(0, depth=2, min_strength=4)
+        self.assertEqual(sorted(edges), [(0, 1, 5.0), (0, 3, 8.0), (0, 4, -9.0), (1, 0, 4.0), (3, 6, 7.0)])
+        self.relationships.remove_character(3)
+        self.assertEqual(self.relationships.get(0, 3), 0)
+        self.assertEqual(self.relationships.neighbourhood(3), [])
+        self.assertEqual(len(self.relationships), 5)
+
+    def test_changes_between_rebuilds(self):
+        """
+        Tests that queries stay exact while pairs are added and characters removed between rebuilds,
+        and that a few changes do not rebuild the orderings.
+        """
+        relationships = RelationshipStore(rebuild_after=16)
+        generator = np.random.default_rng(3)
+        expected = {}
+        for source, target in generator.integers(0, 40, (300, 2)).tolist():
+            relationships.adjust(source, target, 1)
+            expected[(source, target)] = expected.get((source, target), 0) + 1
+        relationships.outgoing(0)
+        orderings = relationships._orderings
+
+        relationships.remove_character(7)
+        relationships.adjust(7, 8, 2)
+        relationships.adjust(41, 7, 3)
+        self.assertIs(relationships._orderings, orderings)
+        expected = {pair: value for pair, value in expected.items() if 7 not in pair}
+        expected.update({(7, 8): 2, (41, 7): 3})
+
+        for step in range(60):
+            if step % 3 == 0:
+                row = int(generator.integers(0, 42))
+                relationships.remove_character(row)
+                expected = {pair: value for pair, value in expected.items() if row not in pair}
+            else:
+                source, target = generator.integers(0, 42, 2).tolist()
+                relationships.adjust(source, target, 1)
+                expected[(source, target)] = expected.get((source, target), 0) + 1
+            for character in range(42):
+                targets, values = relationships.outgoing(character)
+                self.assertEqual(
+                    sorted(zip(targets.tolist(), values.tolist())),
+                    sorted((target, value) for (source, target), value in expected.items() if source == character)
+                )
+                sources, _ = relationships.incoming(character)
+                self.assertEqual(
+                    sorted(sources.tolist()),
+                    sorted(source for source, target in expected if target == character)
+                )
+        self.assertEqual(len(relationships), len(expected))
+
+    def test_characters_share_the_store_matrix(self):
+        """
+        Tests that Character relationships go through the store's matrix by row ID.
+        """
+        store = CharacterStore()
+        alice = Character("Alice", {"friendly": True}, store=store)
+        bob = Character("Bob", {"hostile": True}, store=store)
+        carol = Character("Carol", {}, store=store)
+        alice.adjust_relationship("Bob", 10)
+        alice.adjust_relationship("Carol", -4)
+        bob.adjust_relationship("Alice", -5)
+        self.assertEqual(alice.relationships, {"Bob": 10.0, "Carol": -4.0})
+        self.assertEqual(alice.allies(), [("Bob", 10.0)])
+        self.assertEqual(alice.enemies(), [("Carol", -4.0)])
+        store.remove(bob.row)
+        self.assertEqual(alice.relationships, {"Carol": -4.0})
+        # A relationship with a name no longer in the store adds a character with that name
+        carol.adjust_relationship("Bob", 1)
+        self.assertEqual(carol.relationships, {"Bob": 1.0})
+        self.assertEqual(len(store), 3)
+        self.assertTrue(np.isclose(store.relationships.get(carol.row, alice.row), 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+# tests/test_single_flight.py
+
+import asyncio
+import unittest
+
+from narrative.generation.single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_identical_calls_share_one_call(self):
+        """
+        Tests that concurrent calls with the same key run the factory once and all get its result,
+        while a different key gets its own call.
+        """
+        started = []
+
+        async def generate(prompt):
+            started.append(prompt)
+            await asyncio.sleep(0.02)
+            return f"echo: {prompt}"
+
+        async def scenario():
+            flight = SingleFlight()
+            results = await asyncio.gather(
+                *(flight.do("rain", lambda: generate("rain")) for _ in range(5)),
+                flight.do("fog", lambda: generate("fog"))
+            )
+            return results, flight.stats()
+
+        results, stats = asyncio.run(scenario())
+        self.assertEqual(results, ["echo: rain"] * 5 + ["echo: fog"])
+        self.assertEqual(sorted(started), ["fog", "rain"])
+        self.assertEqual(stats, {"leaders": 2, "followers": 4, "in_flight": 0})
+
+    def test_follower_timeout_does_not_poison_others(self):
+        """
+        Tests that a caller timing out leaves the shared call running for the other callers.
+        """
+        calls = []
+
+        async def generate():
+            calls.append(None)
+            await asyncio.sleep(0.05)
+            return "done"
+
+        async def scenario():
+            flight = SingleFlight()
+            leader = asyncio.ensure_future(flight.do("key", generate))
+            await asyncio.sleep(0)
+            with self.assertRaises(asyncio.TimeoutError):
+                await flight.do("key", generate, timeout=0.01)
+            follower = await flight.do("key", generate)
+            return await leader, follower, flight.in_flight()
+
+        self.assertEqual(asyncio.run(scenario()), ("done", "done", 0))
+        self.assertEqual(len(calls), 1)
+
+    def test_call_is_cancelled_once_every_caller_gives_up(self):
+        """
+        Tests that the shared call is cancelled when all its callers time out, and the next call starts afresh.
+        """
+        cancelled = []
+
+        async def generate():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(None)
+                raise
+            return "late"
+
+        async def scenario():
+            flight = SingleFlight()
+            results = await asyncio.gather(
+                *(flight.do("key", generate, timeout=0.01) for _ in range(3)), return_exceptions=True
+            )
+            await asyncio.sleep(0)
+            after = flight.in_flight()
+
+            async def quick():
+                return "fresh"
+
+            return results, after, await flight.do("key", quick)
+
+        results, after, fresh = asyncio.run(scenario())
+        self.assertTrue(all(isinstance(result, asyncio.TimeoutError) for result in results))
+        self.assertEqual(cancelled, [None])
+        self.assertEqual(after, 0)
+        self.assertEqual(fresh, "fresh")
+
+    def test_failures_reach_every_caller_and_are_not_remembered(self):
+        """
+        Tests that an exception is raised to every caller of the flight and the key can be retried.
+        """
+        attempts = []
+
+        async def generate():
+            attempts.append(None)
+            await asyncio.sleep(0.01)
+            if len(attempts) == 1:
+                raise ConnectionError("service unavailable")
+            return "ok"
+
+        async def scenario():
+            flight = SingleFlight()
+            failures = await asyncio.gather(*(flight.do("key", generate) for _ in range(3)), return_exceptions=True)
+            return failures, await flight.do("key", generate)
+
+        failures, retried = asyncio.run(scenario())
+        self.assertTrue(all(isinstance(failure, ConnectionError) for failure in failures))
+        self.assertEqual(retried, "ok")
+        self.assertEqual(len(attempts), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+# tests/test_speculation.py
+
+import asyncio
+import threading
+import unittest
+from collections import namedtuple
+
+from narrative.generation.speculation import SpeculativeGenerator
+
+Prompt = namedtuple("Prompt", ["prefix", "suffix"])
+
+
+class StandInIntegration:
+    """
+    Stand-in for LLMIntegration whose requests answer after a delay, or only once released.
+    """
+
+    def __init__(self, delay=0.0, max_in_flight=8):
+        self.delay = delay
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.cancelled = []
+        self.release = None
+
+    def has_idle_capacity(self, fraction):
+        return self.in_flight < fraction * self.max_in_flight
+
+    async def generate_prompt_async(self, prompt, timeout=None):
+        self.in_flight += 1
+        try:
+            if self.release is not None:
+                await self.release.wait()
+            await asyncio.sleep(self.delay)
+            return f"narrative for {prompt.suffix}"
+        except asyncio.CancelledError:
+            self.cancelled.append(prompt.suffix)
+            raise
+        finally:
+            self.in_flight -= 1
+
+
+def candidates(*actions):
+    return [(action, "Old Docks", Prompt("lore ", action)) for action in actions]
+
+
+class TestSpeculativeGenerator(unittest.TestCase):
+
+    def test_hit(self):
+        """
+        Tests that a finished speculation for the predicted action is served, matching action names loosely.
+        """
+        async def scenario():
+            speculator = SpeculativeGenerator(StandInIntegration())
+            speculator.schedule("session", candidates("find_shelter", "hide"), fingerprint=1)
+            await asyncio.sleep(0.01)
+            return speculator.take("session", "Find shelter", "Old Docks", fingerprint=1), speculator.metrics.snapshot()
+
+        text, metrics = asyncio.run(scenario())
+        self.assertEqual(text, "narrative for find_shelter")
+        self.assertEqual((metrics["started"], metrics["hits"], metrics["misses"]), (2, 1, 0))
+        self.assertEqual(metrics["used_tokens"], 3)
+
+    def test_miss(self):
+        """
+        Tests that an unpredicted action, or one whose speculation has not finished, is a miss, and the
+        unfinished speculation is cancelled.
+        """
+        async def scenario():
+            client = StandInIntegration(delay=1)
+            speculator = SpeculativeGenerator(client)
+            speculator.schedule("session", candidates("hide"), fingerprint=1)
+            unpredicted = speculator.take("session", "run", "Old Docks", fingerprint=1)
+            await asyncio.sleep(0)
+            pending = speculator.take("session", "hide", "Old Docks", fingerprint=1)
+            await asyncio.sleep(0.01)
+            return unpredicted, pending, client.cancelled, speculator.metrics.snapshot()
+
+        unpredicted, pending, cancelled, metrics = asyncio.run(scenario())
+        self.assertIsNone(unpredicted)
+        self.assertIsNone(pending)
+        self.assertEqual(cancelled, ["hide"])
+        self.assertEqual((metrics["hits"], metrics["misses"], metrics["cancelled"]), (0, 2, 1))
+
+    def test_stale_fingerprint(self):
+        """
+        Tests that a speculation generated against an older world state is discarded, not served.
+        """
+        async def scenario():
+            speculator = SpeculativeGenerator(StandInIntegration())
+            speculator.schedule("session", candidates("hide"), fingerprint=1)
+            await asyncio.sleep(0.01)
+            stale = speculator.take("session", "hide", "Old Docks", fingerprint=2)
+            return stale, speculator.metrics.snapshot()
+
+        stale, metrics = asyncio.run(scenario())
+        self.assertIsNone(stale)
+        self.assertEqual((metrics["hits"], metrics["misses"], metrics["stale"]), (0, 1, 1))
+        self.assertEqual(metrics["wasted_tokens"], 3)
+
+    def test_no_speculation_without_idle_capacity(self):
+        """
+        Tests that speculation is skipped while the client is busy with real requests.
+        """
+        async def scenario():
+            client = StandInIntegration(max_in_flight=4)
+            client.in_flight = 2
+            speculator = SpeculativeGenerator(client, idle_fraction=0.5)
+            speculator.schedule("session", candidates("hide", "run"), fingerprint=1)
+            return speculator.metrics.snapshot()
+
+        metrics = asyncio.run(scenario())
+        self.assertEqual((metrics["started"], metrics["skipped_busy"]), (0, 2))
+
+    def test_take_and_invalidate_from_another_thread(self):
+        """
+        Tests that pending speculations can be discarded from a thread other than the event loop's.
+        """
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            client = StandInIntegration()
+            speculator = SpeculativeGenerator(client)
+
+            async def schedule():
+                client.release = asyncio.Event()
+                speculator.schedule("first", candidates("hide"), fingerprint=1)
+                speculator.schedule("second", candidates("run"), fingerprint=1)
+
+            asyncio.run_coroutine_threadsafe(schedule(), loop).result(timeout=1)
+            self.assertIsNone(speculator.take("first", "hide", "Old Docks", fingerprint=1))
+            speculator.invalidate()
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0.01), loop).result(timeout=1)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=1)
+            loop.close()
+
+        self.assertEqual(sorted(client.cancelled), ["hide", "run"])
+        self.assertEqual(speculator.metrics.cancelled, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+# tests/test_visibility.py
+
+import unittest
+
+import numpy as np
+
+from core.data_management.map_manager import MapSchema, TERRAIN_PROPERTIES
+from core.data_management.visibility import VisibilityEngine
+
+WALL = {'movement_cost': 0, 'visibility': 0.0}
+
+
+class TestVisibilityEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.map = MapSchema("Test Map", 11, 11)
+        plain = self.map.terrain_code('plain', TERRAIN_PROPERTIES['plain'])
+        self.map.set_terrain_codes(np.full((11, 11), plain, dtype=np.uint8))
+        self.map.add_terrain(7, 5, 'wall', WALL)
+        self.engine = VisibilityEngine(self.map)
+
+    def test_walls_cast_shadows_within_the_radius(self):
+        """
+        Tests that cells behind an opaque cell and cells beyond the radius are not visible.
+        """
+        observer = (5, 5, 4)
+        self.assertTrue(self.engine.can_see(observer, 7, 5))  # The wall itself is seen
+        self.assertFalse(self.engine.can_see(observer, 8, 5))  # Behind the wall
+        self.assertTrue(self.engine.can_see(observer, 5, 9))
+        self.assertFalse(self.engine.can_see(observer, 5, 10))  # Out of range
+
+    def test_partial_visibility_accumulates_along_the_ray(self):
+        """
+        Tests that one mountain can be seen through but two in a row block the view.
+        """
+        self.map.add_terrain(5, 4, 'mountain', TERRAIN_PROPERTIES['mountain'])
+        self.assertTrue(self.engine.can_see((5, 5, 5), 5, 2))
+        self.map.add_terrain(5, 3, 'mountain', TERRAIN_PROPERTIES['mountain'])
+        self.assertFalse(self.engine.can_see((5, 5, 5), 5, 1))
+
+    def test_masks_are_cached_until_terrain_in_range_changes(self):
+        """
+        Tests that repeated queries hit the cache and nearby terrain changes invalidate it.
+        """
+        observers = [(2, 2, 3), (9, 9, 1)]
+        self.engine.compute(observers)
+        self.engine.compute(observers)
+        self.assertEqual(self.engine.stats()["hits"], 2)
+
+        self.map.add_terrain(3, 2, 'wall', WALL)
+        self.assertFalse(self.engine.can_see((2, 2, 3), 4, 2))
+        self.assertEqual(self.engine.stats()["cached"], 2)  # The far observer's mask was kept
+
+    def test_changes_to_several_cells_invalidate_only_masks_in_range(self):
+        """
+        Tests that a change to cells at opposite corners drops the masks near either corner but not
+        the masks between them, inside the cells' bounding box.
+        """
+        observers = [(1, 1, 1), (5, 5, 2), (9, 9, 1)]
+        self.engine.compute(observers)
+        self.engine._on_terrain_changed([(0, 0), (10, 10)])
+        self.assertEqual(list(self.engine._cache), [(5, 5, 2)])
+
+    def test_large_radii_are_evaluated_in_smaller_chunks(self):
+        """
+        Tests that the chunk size shrinks with the radius to respect the memory limit, without
+        changing the masks.
+        """
+        engine = VisibilityEngine(self.map, max_chunk_bytes=64 * 1024)
+        self.assertEqual(engine._chunk_size(1), 256)
+        self.assertLess(engine._chunk_size(6), engine._chunk_size(3))
+        self.assertEqual(VisibilityEngine(self.map, max_chunk_bytes=1)._chunk_size(6), 1)
+
+        observers = [(x, y, 6) for x in range(11) for y in range(0, 11, 2)]
+        expected = self.engine.compute(observers)
+        for mask, reference in zip(engine.compute(observers), expected):
+            np.testing.assert_array_equal(mask, reference)
+
+    def test_coverage_and_detection(self):
+        """
+        Tests the union of several fields of view and line-of-sight detection by dynamic elements.
+        """
+        seen = self.engine.coverage([(1, 1, 1), (9, 9, 1)])
+        self.assertEqual(int(seen.sum()), 10)  # Two plus-shaped fields of five cells
+        self.map.add_dynamic_element(4, 5, 'Surveillance Drone', {'detection_range': 5})
+        self.assertEqual(len(self.engine.elements_detecting(6, 5)), 1)
+        self.assertEqual(self.engine.elements_detecting(8, 5), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+# tests/test_world_state.py
+
+import threading
+import unittest
+
+from core.data_management.world_manager import WorldManager
+from core.data_management.world_state import PersistentMap, WorldState
+
+
+class TestPersistentMap(unittest.TestCase):
+
+    def test_updates_leave_old_versions_unchanged(self):
+        """
+        Tests that set, update and delete return new maps and keep the original intact.
+        """
+        original = PersistentMap({f"key{number}": number for number in range(1000)})
+        changed = original.set("key1", -1).update({"new": 1, "key2": -2}).delete("key3")
+        self.assertEqual(len(original), 1000)
+        self.assertEqual((original["key1"], original["key2"], original["key3"]), (1, 2, 3))
+        self.assertEqual(len(changed), 1000)
+        self.assertEqual((changed["key1"], changed["key2"], changed["new"]), (-1, -2, 1))
+        self.assertNotIn("key3", changed)
+        self.assertEqual(dict(original), {f"key{number}": number for number in range(1000)})
+        with self.assertRaises(KeyError):
+            changed.delete("key3")
+
+    def test_unchanged_branches_are_shared(self):
+        """
+        Tests that an update copies only the branch it changes.
+        """
+        original = PersistentMap({number: number for number in range(1000)})
+        changed = original.set(0, "zero")
+        shared = sum(new is old for new, old in zip(changed._root, original._root))
+        self.assertEqual(shared, len(original._root) - 1)
+
+
+class TestWorldState(unittest.TestCase):
+
+    def test_snapshots_are_isolated_from_later_writes(self):
+        """
+        Tests that a snapshot keeps its version while the live state advances.
+        """
+        state = WorldState({"alert_level": "low"})
+        before = state.snapshot()
+        version = state.set("alert_level", "high")
+        self.assertEqual((before.version, before["alert_level"]), (0, "low"))
+        self.assertEqual((version, state.snapshot()["alert_level"]), (1, "high"))
+
+    def test_concurrent_readers_see_consistent_versions(self):
+        """
+        Tests that readers never see a half-applied multi-key update.
+        """
+        state = WorldState({"left": 0, "right": 0})
+        torn = []
+
+        def write():
+            for number in range(1, 2001):
+                state.update({"left": number, "right": number})
+
+        def read():
+            for _ in range(2000):
+                snapshot = state.snapshot()
+                if snapshot["left"] != snapshot["right"]:
+                    torn.append(snapshot.version)
+
+        threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(torn, [])
+        self.assertEqual(state.version, 2000)
+
+    def test_listeners_see_every_write(self):
+        """
+        Tests that subscribed listeners get the version and keys of each write, and failed writes are not reported.
+        """
+        state = WorldState({"weather": "rain"})
+        seen = []
+        state.subscribe(lambda version, keys: seen.append((version, keys)))
+        state.set("weather", "smog")
+        state.update({"curfew": True, ("Old Docks", "weather"): "fog"})
+        with self.assertRaises(KeyError):
+            state.delete("missing")
+        state.delete("curfew")
+        self.assertEqual(seen, [(1, ("weather",)), (2, ("curfew", ("Old Docks", "weather"))), (3, ("curfew",))])
+
+    def test_world_manager_location_state(self):
+        """
+        Tests that location keys hide world-wide keys in WorldManager's location view.
+        """
+        world_manager = WorldManager({"locations": {
+            "The City Core": {"description": "Towering skyscrapers.", "connections": []},
+            "Old Street Enclave": {"description": "A fortified zone.", "connections": []}
+        }})
+        world_manager.set_state("weather", "rain")
+        world_manager.set_state("weather", "smog", location_name="Old Street Enclave")
+        snapshot = world_manager.snapshot()
+        world_manager.set_state("weather", "storm")
+
+        core = world_manager.get_world_state("The City Core", snapshot)
+        enclave = world_manager.get_world_state("Old Street Enclave", snapshot)
+        self.assertEqual(core["location_description"], "Towering skyscrapers.")
+        self.assertEqual((core["weather"], enclave["weather"]), ("rain", "smog"))
+        self.assertEqual(dict(enclave), {"location_description": "A fortified zone.", "weather": "smog"})
+        self.assertEqual(world_manager.get_world_state("The City Core")["weather"], "storm")
+
+
+if __name__ == '__main__':
+    unittest.main()